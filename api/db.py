@@ -1,16 +1,100 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
 import mysql.connector
+from mysql.connector import pooling
 from config import Config
 
-def get_db_connection():
-    """Establishes and returns a connection to the MySQL database."""
+# mysql.connector refuses pools larger than this
+_MAX_POOL_SIZE = pooling.CNX_POOL_MAXSIZE
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def _connection_args():
+    return {
+        "host": Config.DB_HOST,
+        "user": Config.DB_USER,
+        "password": Config.DB_PASSWORD,
+        "database": Config.DB_NAME,
+    }
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use.
+    A forked child (e.g. an ingest worker) gets its own pool instead of sharing sockets."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name=f"{Config.DB_NAME}_{pid}",
+                    pool_size=max(1, min(Config.DB_POOL_SIZE, _MAX_POOL_SIZE)),
+                    pool_reset_session=True,
+                    **_connection_args()
+                )
+                _pool_pid = pid
+    return _pool
+
+def _checkout():
+    """
+    Takes a connection from the pool, waiting up to DB_POOL_TIMEOUT seconds
+    when all of them are in use. The pool pings each connection on checkout
+    and reconnects it if the server dropped it; a connection that still
+    fails the health check is retried once before giving up.
+    """
+    pool = get_pool()
+    deadline = time.monotonic() + Config.DB_POOL_TIMEOUT
+    retried = False
+    while True:
+        try:
+            return pool.get_connection()
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+        except mysql.connector.errors.InterfaceError:
+            # Health check reconnect failed; the server may have just restarted
+            if retried:
+                raise
+            retried = True
+
+def get_db_connection(**options):
+    """Returns a connection to the MySQL database.
+    Without options this is a pooled connection: close() hands it back to the pool.
+    Extra keyword options (e.g. allow_local_infile) need their own session settings,
+    so they get a dedicated connection instead."""
     try:
-        connection = mysql.connector.connect(
-            host=Config.DB_HOST,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            database=Config.DB_NAME
-        )
-        return connection
+        if options:
+            return mysql.connector.connect(**_connection_args(), **options)
+        return _checkout()
     except mysql.connector.Error as err:
         print(f"Error connecting to database: {err}")
         raise err
+
+@contextmanager
+def db_connection():
+    """Borrows a pooled connection for the duration of a with-block.
+    Uncommitted work is rolled back if the block raises."""
+    conn = get_db_connection()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+@contextmanager
+def db_cursor(commit=False, **cursor_options):
+    """Like db_connection, but yields a cursor and optionally commits on success."""
+    with db_connection() as conn:
+        cursor = conn.cursor(**cursor_options)
+        try:
+            yield cursor
+            if commit:
+                conn.commit()
+        finally:
+            cursor.close()
@@ -0,0 +1,255 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import contextlib
+from datetime import datetime, timedelta
+import numpy as np
+from ingestor import LogIngestor
+from traffic_generator import TrafficGenerator
+from attack_profiles import AttackSimulator
+from log_domains import DomainGenerator
+from pattern_manager import PatternManager
+from detection.engine import DETECTORS, run_detection_pipeline, run_stateful_detection, get_detection_config, StreamState
+from detection.dns import calculate_entropy
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+# Timings only compare on the machine that recorded them, so the baseline is
+# not committed: each machine or CI runner creates its own (--update_baseline)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_SEED = 1337
+
+# Share of each generator in a corpus
+CORPUS_MIX = {"baseline": 0.55, "domains": 0.20, "attacks": 0.15, "patterns": 0.10}
+
+# Detectors timed on fewer logs than this are too noisy to compare
+MIN_COMPARE_LOGS = 1000
+
+# Rows per DataFrame handed to detect_batch (like csv_loader chunks)
+BATCH_CHUNK_ROWS = 50_000
+
+# Fixed simulation start so corpora do not depend on the clock
+CORPUS_START = datetime(2026, 1, 1)
+
+def _take(generate, count):
+    """Calls generate() until it has produced `count` logs."""
+    logs = []
+    while len(logs) < count:
+        batch = generate()
+        if not batch:
+            break
+        logs.extend(batch)
+    return logs[:count]
+
+def build_corpus(size, seed=DEFAULT_SEED, config_path=CONFIG_PATH):
+    """
+    A reproducible list of `size` normalized logs: baseline traffic, the
+    log_domains generators, the attack profiles and pattern/ payloads, mixed
+    per CORPUS_MIX and ordered by timestamp. Same size and seed, same corpus.
+    """
+    random.seed(seed)
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    # The dataset directory would make source IPs depend on local files
+    config.setdefault("dataset", {})["enabled"] = False
+
+    counts = {name: int(size * share) for name, share in CORPUS_MIX.items()}
+    counts["baseline"] += size - sum(counts.values())
+
+    # The generators report progress on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        traffic = TrafficGenerator(config_path)
+        traffic.config = config
+        traffic.device_categories = ["workstation", "iot_camera", "printer", "server"]
+        logs = _take(lambda: traffic.generate_baseline(CORPUS_START, 1), counts["baseline"])
+
+        domains = DomainGenerator()
+        kinds = [domains.generate_network_log, domains.generate_auth_log, domains.generate_endpoint_log,
+                 domains.generate_web_log, domains.generate_asset_log, domains.generate_security_alert,
+                 domains.generate_dns_log, domains.generate_cloud_log]
+        for _ in range(counts["domains"]):
+            ts = CORPUS_START + timedelta(seconds=random.uniform(0, 3600))
+            logs.append(random.choice(kinds)(ts).to_dict())
+
+        attacker = AttackSimulator(config)
+        profiles = [
+            lambda: attacker.generate_iot_bruteforce(CORPUS_START, 1),
+            lambda: attacker.generate_dns_tunneling(CORPUS_START, 1),
+            lambda: attacker.generate_beaconing(CORPUS_START, 24),
+        ]
+        per_profile = counts["attacks"] // len(profiles)
+        for i, profile in enumerate(profiles):
+            share = per_profile if i < len(profiles) - 1 else counts["attacks"] - per_profile * (len(profiles) - 1)
+            logs.extend(_take(profile, share))
+
+        patterns = PatternManager(os.path.join(os.path.dirname(os.path.abspath(config_path)), "pattern"))
+        names = sorted(patterns.get_available_patterns())
+        if names:
+            logs.extend(_take(lambda: patterns.generate_logs(random.choice(names), 100, CORPUS_START), counts["patterns"]))
+        else:
+            logs.extend(_take(lambda: traffic.generate_baseline(CORPUS_START, 1), counts["patterns"]))
+
+    logs.sort(key=lambda log: log["timestamp"])
+    ingestor = LogIngestor()
+    # In place, so the raw and normalized copies of a 1M corpus are not both kept
+    for i, log in enumerate(logs):
+        logs[i] = ingestor.normalize_log(log)
+    return [log for log in logs if log]
+
+def _stats(latencies_ns):
+    """logs/s over the summed call time, plus per-call percentiles in microseconds."""
+    if len(latencies_ns) == 0:
+        return {"logs": 0, "logs_per_sec": None, "p50_us": None, "p99_us": None}
+    latencies_ns = np.asarray(latencies_ns, dtype=np.float64)
+    total = latencies_ns.sum() / 1e9
+    return {
+        "logs": int(len(latencies_ns)),
+        "logs_per_sec": round(len(latencies_ns) / total, 1) if total else None,
+        "p50_us": round(float(np.percentile(latencies_ns, 50)) / 1e3, 2),
+        "p99_us": round(float(np.percentile(latencies_ns, 99)) / 1e3, 2),
+    }
+
+def _time_calls(fn, items):
+    clock = time.perf_counter_ns
+    latencies = np.empty(len(items), dtype=np.int64)
+    for i, item in enumerate(items):
+        start = clock()
+        fn(item)
+        latencies[i] = clock() - start
+    return latencies
+
+def benchmark_corpus(corpus, warmup=1000):
+    """
+    Times run_detection_pipeline, each registered detector (on the logs
+    routed to it), the stateful detectors and, when pandas is available,
+    detect_batch over `corpus`. Returns {name: stats}.
+    """
+    config = get_detection_config()
+    # Also builds one-time state (rule packs, the public suffix trie) outside the timings
+    warm_state = StreamState()
+    for log in corpus[:warmup]:
+        run_stateful_detection(log, warm_state, run_detection_pipeline(log))
+
+    results = {}
+    calculate_entropy.cache_clear()
+    detections = []
+    results["pipeline"] = _stats(_time_calls(lambda log: detections.append(run_detection_pipeline(log)), corpus))
+
+    calculate_entropy.cache_clear()
+    for detector in DETECTORS.detectors:
+        if detector.enabled is not None and not detector.enabled(config):
+            continue
+        routed = []
+        for log in corpus:
+            if detector in DETECTORS.route(log)[0] and all(log.get(f) for f in detector.requires):
+                content = str(log.get('msg', '')) + " " + str(log.get('raw_log', '')) if detector.uses_content else None
+                routed.append((log, content))
+        results[detector.name] = _stats(_time_calls(lambda pair: detector.run(pair[0], config, pair[1]), routed))
+
+    state = StreamState()
+    results["stateful"] = _stats(_time_calls(lambda pair: run_stateful_detection(pair[0], state, pair[1]),
+                                             list(zip(corpus, detections))))
+
+    try:
+        import pandas as pd
+        from detection.batch import detect_batch
+    except ImportError:
+        pd = None
+    if pd is not None:
+        calculate_entropy.cache_clear()
+        elapsed = 0.0
+        for first in range(0, len(corpus), BATCH_CHUNK_ROWS):
+            frame = pd.DataFrame(corpus[first:first + BATCH_CHUNK_ROWS])
+            start = time.perf_counter()
+            detect_batch(frame)
+            elapsed += time.perf_counter() - start
+        # One call per chunk, so no per-log percentiles
+        results["batch"] = {"logs": len(corpus), "logs_per_sec": round(len(corpus) / elapsed, 1) if elapsed else None,
+                            "p50_us": None, "p99_us": None}
+    return results
+
+def run_benchmarks(sizes, seed=DEFAULT_SEED):
+    """Builds each corpus and benchmarks it. Returns the JSON-ready report."""
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": {},
+    }
+    for size in sizes:
+        print(f"[*] Building corpus of {size} logs (seed {seed})...")
+        start = time.perf_counter()
+        corpus = build_corpus(size, seed)
+        print(f"[*] Corpus ready in {time.perf_counter() - start:.1f}s, running detection...")
+        results = benchmark_corpus(corpus)
+        report["results"][str(size)] = results
+        for name, stats in results.items():
+            p50 = "-" if stats["p50_us"] is None else f"{stats['p50_us']:.1f}us"
+            p99 = "-" if stats["p99_us"] is None else f"{stats['p99_us']:.1f}us"
+            rate = "-" if stats["logs_per_sec"] is None else f"{stats['logs_per_sec']:,.0f}"
+            print(f"    {name:<16} {stats['logs']:>9} logs  {rate:>12} logs/s  p50 {p50:>9}  p99 {p99:>9}")
+    return report
+
+def compare_results(report, baseline, tolerance=0.25):
+    """
+    Lists regressions of `report` against `baseline` for the sizes and
+    detectors present in both: throughput or p50 worse by more than
+    `tolerance`, or p99 worse by more than twice that (tail latency is noisier).
+    Entries timed on fewer than MIN_COMPARE_LOGS logs are skipped.
+    """
+    regressions = []
+    for size, results in report.get("results", {}).items():
+        for name, stats in results.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base or stats["logs"] < MIN_COMPARE_LOGS:
+                continue
+            if stats["logs_per_sec"] and base.get("logs_per_sec") and stats["logs_per_sec"] < base["logs_per_sec"] * (1 - tolerance):
+                regressions.append(f"{size}/{name}: {stats['logs_per_sec']:,.0f} logs/s vs baseline {base['logs_per_sec']:,.0f}")
+            for key, allowed in (("p50_us", tolerance), ("p99_us", 2 * tolerance)):
+                if stats.get(key) and base.get(key) and stats[key] > base[key] * (1 + allowed):
+                    regressions.append(f"{size}/{name}: {key} {stats[key]} vs baseline {base[key]}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark detection throughput on seeded synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Corpus sizes in logs")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed for the corpora")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs the baseline (0.25 = 25%%)")
+    parser.add_argument("--update_baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.seed)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[+] Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Baseline updated: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        recorded_on = baseline.get("meta", {}).get("platform")
+        if recorded_on != report["meta"]["platform"]:
+            print(f"[!] Baseline was recorded on {recorded_on}; refresh it on this machine with --update_baseline.")
+        regressions = compare_results(report, baseline, args.tolerance)
+        if regressions:
+            print(f"[!] {len(regressions)} regressions against {args.baseline}:")
+            for line in regressions:
+                print(f"    {line}")
+            sys.exit(1)
+        print(f"[+] No regressions against {args.baseline}")
+    else:
+        print(f"[*] No baseline at {args.baseline}; run with --update_baseline to create one.")
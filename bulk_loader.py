@@ -0,0 +1,232 @@
+import os
+import tempfile
+from datetime import datetime
+from ingestor import LogIngestor
+from detection.engine import format_alert_object, run_stateful_detection, StreamState
+from ingest_logs import ALLOWED_COLS, ALERT_SQL, COERCERS, DEFAULT_LOG_COLUMN_TYPES, alert_row, process_log
+from incidents import IncidentAggregator, ensure_incident_table, incident_target
+from storage import get_storage
+from config import Config
+
+# MySQL's default LOAD DATA escaping (FIELDS ESCAPED BY '\\')
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+_TSV_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r", "0": "\0"}
+TSV_NULL = "\\N"
+
+def _tsv_field(value):
+    if value is None:
+        return TSV_NULL
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value).translate(_TSV_ESCAPES)
+
+def _tsv_unescape(field):
+    if field == TSV_NULL:
+        return None
+    if "\\" not in field:
+        return field
+    out = []
+    i = 0
+    while i < len(field):
+        ch = field[i]
+        if ch == "\\" and i + 1 < len(field):
+            out.append(_TSV_UNESCAPES.get(field[i + 1], field[i + 1]))
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+def write_tsv(logs, cols, fh, column_types=None):
+    """
+    Writes logs as LOAD DATA compatible tab-separated rows projected onto cols.
+    Values of typed columns go through the same COERCERS as the row-by-row
+    writer, so junk in an int column loads as NULL instead of 0.
+    """
+    column_types = column_types or {}
+    coercions = [(i, COERCERS[column_types[c]]) for i, c in enumerate(cols) if column_types.get(c) in COERCERS]
+    for log in logs:
+        vals = [log.get(c) for c in cols]
+        for i, coerce in coercions:
+            vals[i] = coerce(vals[i])
+        fh.write("\t".join(_tsv_field(v) for v in vals))
+        fh.write("\n")
+
+def read_tsv(fh):
+    """Inverse of write_tsv, used by the SQLite target."""
+    for line in fh:
+        yield tuple(_tsv_unescape(f) for f in line.rstrip("\n").split("\t"))
+
+class MySQLBulkTarget:
+    """
+    Loads TSV chunks into MySQL with LOAD DATA LOCAL INFILE.
+
+    The new rows are mapped to their ids through LAST_INSERT_ID() and
+    ROW_COUNT() of the load itself. A LOAD DATA statement gets consecutive
+    ids under the traditional and consecutive auto-increment lock modes; in
+    interleaved mode (innodb_autoinc_lock_mode=2) concurrent inserts could
+    take ids inside its range, so the chunk's tables are locked for the load.
+    """
+
+    # Every table a chunk writes, locked together in interleaved mode
+    LOCKED_TABLES = ("logs", "alerts", "incidents", "incident_counted_logs")
+
+    def __init__(self, storage):
+        self.conn = storage.connect(allow_local_infile=True)
+        self.cursor = self.conn.cursor()
+        self.table_cols = None # assume the full ALLOWED_COLS schema
+        self.column_types = DEFAULT_LOG_COLUMN_TYPES
+        self.cursor.execute("SELECT @@innodb_autoinc_lock_mode")
+        self.lock_tables = int(self.cursor.fetchone()[0]) == 2
+
+    def begin(self):
+        if self.lock_tables:
+            self.cursor.execute("LOCK TABLES " + ", ".join(f"{t} WRITE" for t in self.LOCKED_TABLES))
+
+    def end(self):
+        if self.lock_tables:
+            self.cursor.execute("UNLOCK TABLES")
+
+    def load(self, tsv_path, cols):
+        """Loads the file; returns (first new log id, rows loaded)."""
+        # Forward slashes keep Windows temp paths valid inside the SQL literal
+        self.cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE logs "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({', '.join(cols)})",
+            (tsv_path.replace("\\", "/"),)
+        )
+        self.cursor.execute("SELECT LAST_INSERT_ID(), ROW_COUNT()")
+        first_id, loaded = self.cursor.fetchone()
+        return first_id, loaded
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
+
+class SQLiteBulkTarget:
+    """
+    SQLite has no LOAD DATA; replays the same TSV through one executemany()
+    per chunk. The connection holds the database write lock for the whole
+    statement, so its rows always get consecutive ids.
+    """
+
+    def __init__(self, storage):
+        self.conn = storage.connect()
+        self.cursor = self.conn.cursor()
+        storage.ensure_columns(self.cursor, "logs", ALLOWED_COLS, DEFAULT_LOG_COLUMN_TYPES)
+        self.column_types = storage.describe_columns(self.cursor, "logs")
+        self.table_cols = set(self.column_types)
+
+    def begin(self):
+        pass
+
+    def end(self):
+        pass
+
+    def load(self, tsv_path, cols):
+        """Loads the file; returns (first new log id, rows loaded)."""
+        sql = f"INSERT INTO logs ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))})"
+        with open(tsv_path, "r", encoding="utf-8", newline="") as fh:
+            self.cursor.executemany(sql, read_tsv(fh))
+        return self.cursor.lastrowid, self.cursor.rowcount
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
+
+def _load_chunk(target, chunk, incidents):
+    """
+    Loads one chunk of (log, detections) pairs, counts their alerts into
+    `incidents` and writes its changes (plus alerts rows with
+    Config.STORE_ALERT_ROWS) in the same transaction. Returns
+    (logs_loaded, alerts_written).
+    """
+    # Project onto the columns actually present in this chunk
+    present = set()
+    for log, _ in chunk:
+        present.update(log.keys())
+    cols = [c for c in ALLOWED_COLS if c in present]
+    if target.table_cols is not None:
+        cols = [c for c in cols if c in target.table_cols]
+    if not cols:
+        return 0, 0
+
+    cursor = target.cursor
+    target.begin()
+    try:
+        fd, tsv_path = tempfile.mkstemp(suffix=".tsv")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as fh:
+                write_tsv((log for log, _ in chunk), cols, fh, target.column_types)
+            first_id, loaded = target.load(tsv_path, cols)
+        finally:
+            os.remove(tsv_path)
+
+        # Rows land in file order on the load's own consecutive id range
+        if loaded != len(chunk):
+            raise RuntimeError(f"Expected {len(chunk)} rows to load, the database took {loaded}")
+
+        alert_rows = []
+        for log_id, (log, detections) in enumerate(chunk, first_id):
+            incidents.count_logs(log_id)
+            for d in detections:
+                alert_data = format_alert_object(d, log, log_id)
+                alert_rows.append(alert_row(alert_data))
+                incidents.add(alert_data, incident_target(log), log_id)
+        if alert_rows and Config.STORE_ALERT_ROWS:
+            cursor.executemany(ALERT_SQL, alert_rows)
+        incidents.write(cursor)
+        target.conn.commit()
+    except Exception:
+        target.conn.rollback()
+        raise
+    finally:
+        target.end()
+    return len(chunk), len(alert_rows)
+
+def bulk_ingest(file_path, chunk_rows=None):
+    """
+    Backfill mode: normalizes and runs detection on every log, then loads them
+    into `logs` chunk by chunk through a temporary TSV file.
+    """
+    print(f"[*] Starting bulk load for {file_path}")
+    if not os.path.exists(file_path):
+        print(f"[!] Error: {file_path} not found.")
+        return
+
+    chunk_rows = chunk_rows or Config.BULK_CHUNK_ROWS
+    storage = get_storage()
+    target = SQLiteBulkTarget(storage) if storage.name == "sqlite" else MySQLBulkTarget(storage)
+    ensure_incident_table(storage, target.cursor)
+    incidents = IncidentAggregator()
+
+    ingestor = LogIngestor()
+    stream_state = StreamState()
+    logs_loaded = 0
+    alerts_generated = 0
+    chunk = []
+
+    try:
+        for log in ingestor.iter_log_file(file_path):
+            processed = process_log(log)
+            if processed is None:
+                continue
+            processed[1][:] = run_stateful_detection(log, stream_state, processed[1])
+
+            chunk.append(processed)
+            if len(chunk) >= chunk_rows:
+                loaded, alerts = _load_chunk(target, chunk, incidents)
+                logs_loaded += loaded
+                alerts_generated += alerts
+                print(f"[*] Loaded {logs_loaded} logs...")
+                chunk = []
+
+        if chunk:
+            loaded, alerts = _load_chunk(target, chunk, incidents)
+            logs_loaded += loaded
+            alerts_generated += alerts
+    finally:
+        target.close()
+
+    print(f"[+] Bulk load complete: {logs_loaded} logs loaded, {alerts_generated} alerts generated.")
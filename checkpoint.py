@@ -0,0 +1,94 @@
+import hashlib
+import os
+
+# Bytes hashed to recognise a file independently of its path
+FINGERPRINT_BYTES = 4096
+
+CHECKPOINT_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+        fingerprint CHAR(40) PRIMARY KEY,
+        file_path TEXT,
+        byte_offset BIGINT NOT NULL DEFAULT 0,
+        last_log_id INT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ingest_batches (
+        fingerprint CHAR(40) NOT NULL,
+        batch_hash CHAR(40) NOT NULL,
+        log_count INT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (fingerprint, batch_hash)
+    )
+    """,
+]
+
+def file_fingerprint(file_path, head_bytes=FINGERPRINT_BYTES):
+    """SHA-1 of the first bytes of a file, used as its identity across runs."""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read(head_bytes)).hexdigest()
+
+def batch_hash(logs):
+    """Content hash of a batch of normalized logs, based on their raw_log text."""
+    h = hashlib.sha1()
+    for log in logs:
+        h.update(str(log.get('raw_log', '')).encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+class IngestCheckpoint:
+    """
+    Durable ingestion watermark for one source file.
+
+    The checkpoint row lives in the same database as the logs and is written
+    inside the same transaction as each batch, so after a crash it always
+    matches what was actually committed.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.fingerprint = file_fingerprint(file_path)
+        self.byte_offset = 0
+        self.last_log_id = None
+
+    @staticmethod
+    def ensure_tables(cursor):
+        for ddl in CHECKPOINT_TABLES:
+            cursor.execute(ddl)
+
+    def load(self, cursor):
+        """Reads the saved watermark. Returns the byte offset to resume from."""
+        cursor.execute(
+            "SELECT byte_offset, last_log_id FROM ingest_checkpoints WHERE fingerprint = %s",
+            (self.fingerprint,)
+        )
+        row = cursor.fetchone()
+        if row:
+            self.byte_offset, self.last_log_id = row
+            # A file shorter than the watermark was truncated and rewritten
+            if self.byte_offset > os.path.getsize(self.file_path):
+                self.byte_offset, self.last_log_id = 0, None
+        return self.byte_offset
+
+    def save(self, cursor, byte_offset, last_log_id):
+        cursor.execute(
+            "INSERT INTO ingest_checkpoints (fingerprint, file_path, byte_offset, last_log_id) VALUES (%s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE file_path = VALUES(file_path), byte_offset = VALUES(byte_offset), last_log_id = VALUES(last_log_id)",
+            (self.fingerprint, self.file_path, byte_offset, last_log_id)
+        )
+        self.byte_offset = byte_offset
+        self.last_log_id = last_log_id
+
+    def claim_batch(self, cursor, content_hash, log_count):
+        """
+        Records a batch's content hash. Returns False if the same batch of
+        this file was already ingested, in which case it must be skipped.
+        Equal batches of different files are both ingested.
+        """
+        cursor.execute(
+            "INSERT IGNORE INTO ingest_batches (batch_hash, fingerprint, log_count) VALUES (%s, %s, %s)",
+            (content_hash, self.fingerprint, log_count)
+        )
+        return cursor.rowcount == 1
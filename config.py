@@ -5,6 +5,39 @@ class Config:
     DB_USER = os.environ.get('DB_USER', 'root')
     DB_PASSWORD = os.environ.get('DB_PASSWORD', 'password123') # Ensure you set your local MySQL password here
     DB_NAME = os.environ.get('DB_NAME', 'iot_security')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8)) # shared connections per process (max 32)
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10)) # seconds to wait for a free connection
+
+    # Storage backend: 'mysql' or 'sqlite' (embedded, no database server needed)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mysql')
+    SQLITE_PATH = os.environ.get('SQLITE_PATH', 'iot_security.db')
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 30)) # seconds to wait on a locked database
+    SQLITE_CACHE_KB = int(os.environ.get('SQLITE_CACHE_KB', 65536)) # page cache per connection
+
+    # Ingestion batching
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 1000))
+    INGEST_COMMIT_INTERVAL = int(os.environ.get('INGEST_COMMIT_INTERVAL', 10)) # batches per commit
+    BULK_CHUNK_ROWS = int(os.environ.get('BULK_CHUNK_ROWS', 100000)) # rows per LOAD DATA file
+    CSV_CHUNK_ROWS = int(os.environ.get('CSV_CHUNK_ROWS', 50000)) # rows per pandas chunk in CSV mode
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 1)) # >1 enables the multi-process pipeline
+    INGEST_CHUNK_SIZE = int(os.environ.get('INGEST_CHUNK_SIZE', 2000)) # raw logs per worker task
+    FOLLOW_MAX_BATCH = int(os.environ.get('FOLLOW_MAX_BATCH', 500)) # lines per follow-mode micro-batch
+    FOLLOW_MAX_LATENCY = float(os.environ.get('FOLLOW_MAX_LATENCY', 2.0)) # seconds before a partial batch is flushed
+    FOLLOW_POLL_INTERVAL = float(os.environ.get('FOLLOW_POLL_INTERVAL', 0.5))
+    BACKFILL_CHUNK_ROWS = int(os.environ.get('BACKFILL_CHUNK_ROWS', 5000)) # logs per keyset page in detect_backfill
+    BACKFILL_WORKERS = int(os.environ.get('BACKFILL_WORKERS', os.cpu_count() or 1)) # detection processes in detect_backfill
+
+    # Alert aggregation
+    INCIDENT_WINDOW = int(os.environ.get('INCIDENT_WINDOW', 300)) # seconds per incident window (log time)
+    INCIDENT_SAMPLE_IDS = int(os.environ.get('INCIDENT_SAMPLE_IDS', 5)) # log ids kept per incident
+    INCIDENT_MAX_OPEN = int(os.environ.get('INCIDENT_MAX_OPEN', 50000)) # open incidents held in memory
+    STORE_ALERT_ROWS = os.environ.get('STORE_ALERT_ROWS', 'false').lower() in ('1', 'true', 'yes') # also write one alerts row per detection
+
+    # Detection
+    DETECTION_CONFIG_CHECK_INTERVAL = float(os.environ.get('DETECTION_CONFIG_CHECK_INTERVAL', 1.0)) # seconds between config.json change checks
+    SIGMA_RULES_DIR = os.environ.get('SIGMA_RULES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pattern'))
+    SIGMA_CACHE_PATH = os.environ.get('SIGMA_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sigma_rules_cache.json'))
+    PUBLIC_SUFFIX_LIST = os.environ.get('PUBLIC_SUFFIX_LIST', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'detection', 'public_suffix_list.dat'))
 
     # Flask Configuration
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-prod')
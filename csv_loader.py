@@ -0,0 +1,166 @@
+import os
+from datetime import datetime
+import pandas as pd
+from fortigate_parser import FIELD_MAP
+from ingest_logs import ALLOWED_COLS, LogBatchWriter, process_log
+from detection.batch import detect_batch
+from storage import get_storage
+from config import Config
+
+_INT_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+_DATETIME_TYPES = {"datetime", "timestamp"}
+
+# The generator's CSV has no time columns, only the JSON raw_log
+_RAW_LOG_TIMESTAMP = r'"timestamp(?:_iso)?": "([^"]+)"'
+
+def _rename_vendor_fields(frame):
+    """Applies the FortiGate -> internal field mapping column-wise; internal columns win."""
+    renames = {}
+    for vendor, internal in FIELD_MAP.items():
+        if vendor not in frame.columns:
+            continue
+        if internal in frame.columns:
+            frame[internal] = frame[internal].fillna(frame[vendor])
+            frame = frame.drop(columns=vendor)
+        else:
+            renames[vendor] = internal
+    return frame.rename(columns=renames) if renames else frame
+
+def _build_timestamps(frame):
+    """
+    Column-wise counterpart of TimestampParser: FortiGate date + time, then
+    timestamp_iso / timestamp, then the timestamp inside raw_log. Returns
+    (timestamps, unparsed_count); unparsed rows get the ingest time.
+    """
+    ts = pd.Series(pd.NaT, index=frame.index, dtype="datetime64[ns]")
+    if "date" in frame.columns and "time" in frame.columns:
+        ts = ts.fillna(pd.to_datetime(frame["date"] + " " + frame["time"], format="%Y-%m-%d %H:%M:%S", errors="coerce"))
+    for col in ("timestamp_iso", "timestamp"):
+        if col in frame.columns:
+            ts = ts.fillna(pd.to_datetime(frame[col], format="ISO8601", errors="coerce"))
+    if "raw_log" in frame.columns and ts.isna().any():
+        embedded = frame["raw_log"].str.extract(_RAW_LOG_TIMESTAMP, expand=False)
+        ts = ts.fillna(pd.to_datetime(embedded, format="ISO8601", errors="coerce"))
+
+    unparsed = int(ts.isna().sum())
+    if unparsed:
+        ts = ts.fillna(pd.Timestamp(datetime.now()))
+    return ts, unparsed
+
+def _to_int_column(series):
+    # Same rules as ingest_logs._to_int: junk and non-integral values become NULL
+    numeric = pd.to_numeric(series, errors="coerce")
+    numeric = numeric.where(numeric == numeric.round())
+    return numeric.astype("Int64")
+
+def prepare_chunk(frame, column_types):
+    """
+    Normalizes a CSV chunk with column operations only: vendor field renames,
+    timestamps and type coercion for the typed `logs` columns.
+    Returns (frame, unparsed_timestamps).
+    """
+    frame = _rename_vendor_fields(frame)
+    frame["timestamp"], unparsed = _build_timestamps(frame)
+
+    for col in frame.columns:
+        kind = column_types.get(col)
+        if kind in _INT_TYPES:
+            frame[col] = _to_int_column(frame[col])
+        elif kind in _DATETIME_TYPES and col != "timestamp":
+            frame[col] = pd.to_datetime(frame[col], format="ISO8601", errors="coerce")
+
+    if "raw_log" not in frame.columns:
+        frame["raw_log"] = frame.drop(columns="timestamp").to_json(orient="records", lines=True).splitlines()
+    return frame, unparsed
+
+def _to_python(frame):
+    """
+    Object frame holding plain Python values (int, str, datetime, None), which
+    both database drivers accept and detection code expects.
+    """
+    out = frame.astype(object)
+    for col in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[col]):
+            out[col] = pd.Series(list(frame[col].dt.to_pydatetime()), index=frame.index, dtype=object)
+    return out.where(frame.notna(), None)
+
+def csv_ingest(file_path, chunk_rows=None, batch_size=None, commit_interval=None):
+    """
+    Ingests a CSV export (e.g. LogWriter.write_csv output) chunk by chunk.
+    Each chunk is normalized column-wise and written through
+    LogBatchWriter.write_rows as pre-built row tuples.
+    """
+    print(f"[*] Starting CSV ingestion for {file_path}")
+    if not os.path.exists(file_path):
+        print(f"[!] Error: {file_path} not found.")
+        return
+
+    chunk_rows = chunk_rows or Config.CSV_CHUNK_ROWS
+    storage = get_storage()
+    conn = storage.connect()
+    writer = LogBatchWriter(conn, batch_size=batch_size or Config.INGEST_BATCH_SIZE,
+                            commit_interval=commit_interval or Config.INGEST_COMMIT_INTERVAL, storage=storage)
+
+    parsed = 0
+    unparsed_total = 0
+    dropped = 0
+    try:
+        # Integer columns are parsed by the C reader; everything else stays text
+        header = pd.read_csv(file_path, nrows=0).columns
+        text_cols = {c: str for c in header if writer.column_types.get(FIELD_MAP.get(c, c)) not in _INT_TYPES}
+        reader = pd.read_csv(file_path, dtype=text_cols, keep_default_na=False, na_values=[""], chunksize=chunk_rows)
+        for chunk in reader:
+            parsed += len(chunk)
+            frame, unparsed = prepare_chunk(chunk, writer.column_types)
+            unparsed_total += unparsed
+
+            cols = [c for c in ALLOWED_COLS if c in frame.columns]
+            if writer.table_cols is not None:
+                cols = [c for c in cols if c in writer.table_cols]
+
+            values = _to_python(frame)
+            # Detection still sees one dict per log (zip is much cheaper than to_dict)
+            columns = list(values.columns)
+            logs = [dict(zip(columns, row)) for row in values.itertuples(index=False, name=None)]
+            try:
+                # Column-wise detection; same alerts as process_log on each row
+                detections = detect_batch(values, logs)
+                keep = list(range(len(logs)))
+            except Exception as e:
+                print(f"[!] Batch detection failed ({e}), falling back to per-log detection.")
+                keep = []
+                detections = []
+                for i, log in enumerate(logs):
+                    processed = process_log(log)
+                    if processed is None:
+                        dropped += 1
+                        continue
+                    keep.append(i)
+                    detections.append(processed[1])
+
+            for i, dets in zip(keep, detections):
+                writer.detect_stateful(logs[i], dets)
+
+            kept = values.iloc[keep]
+            # Like the per-dict route, fields missing from a row are left out of its
+            # INSERT so column defaults apply: rows are grouped by non-null pattern
+            present = kept[cols].notna()
+            for key, positions in present.groupby(cols, sort=False).indices.items():
+                key = key if isinstance(key, tuple) else (key,)
+                group_cols = [c for c, has_value in zip(cols, key) if has_value]
+                if not group_cols:
+                    writer.skipped += len(positions)
+                    continue
+                rows = list(kept[group_cols].iloc[positions].itertuples(index=False, name=None))
+                writer.write_rows(group_cols, rows, [logs[keep[i]] for i in positions], [detections[i] for i in positions])
+            print(f"[*] {writer.logs_written} logs written...")
+    finally:
+        writer.close()
+        conn.close()
+
+    print(f"[*] Parsed {parsed} rows from {file_path}.")
+    if unparsed_total:
+        print(f"[!] {unparsed_total} rows had unparseable timestamps (ingest time used).")
+    print(f"[+] CSV ingestion complete: {writer.logs_written} logs processed, {writer.alerts_written} alerts generated.")
+    if writer.failed_batches or dropped:
+        print(f"[!] {writer.failed_batches} batches ({writer.failed_logs} logs) failed, {dropped} logs failed detection.")
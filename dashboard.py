@@ -8,16 +8,9 @@ import random
 import time
 import subprocess
 import json
-from sqlalchemy import create_engine, text
 
-# Database Connection (Using SQLAlchemy for Pandas compatibility)
-from config import Config
-DB_URL = f"mysql+mysqlconnector://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}/{Config.DB_NAME}"
-engine = create_engine(DB_URL)
-
-def get_db_connection():
-    # Helper to return engine for pandas
-    return engine
+# Database Connection (configured storage backend, pooled for MySQL)
+from storage import get_storage
 
 # --- 1. PAGE CONFIGURATION ---
 st.set_page_config(
@@ -410,10 +403,10 @@ if gen_btn:
 # --- 5.1 CLEAR LOGS LOGIC ---
 if clear_btn:
     try:
-        with engine.connect() as conn:
-            conn.execute(text("DELETE FROM alerts"))
-            conn.execute(text("DELETE FROM logs"))
-            conn.commit()
+        with get_storage().cursor(commit=True) as cursor:
+            cursor.execute("DELETE FROM alerts")
+            cursor.execute("DELETE FROM incidents")
+            cursor.execute("DELETE FROM logs")
         st.toast("Access Logs Cleared Successfully")
         time.sleep(1)
         st.cache_data.clear()
@@ -427,7 +420,7 @@ def show_log_details_dialog(log_record):
     # Compact Header
     st.markdown(f"**Timestamp:** {log_record['timestamp']}")
     
-4    # Compact Columns using HTML for tighter control unlike st.metric
+    # Compact Columns using HTML for tighter control unlike st.metric
     # Dynamic Header Fields Logic
     # Slot 1: Source
     if log_record.get('src_ip'):
@@ -489,12 +482,13 @@ def show_log_details_dialog(log_record):
 # --- 6. DATA FETCHING ---
 @st.cache_data(ttl=5)
 def get_data():
-    conn = get_db_connection()
-    conn = get_db_connection()
     try:
         # Fetch detailed logs
         print("DEBUG: Fetching data from DB...")
-        df = pd.read_sql("SELECT * FROM logs ORDER BY timestamp DESC LIMIT 1000", conn)
+        with get_storage().cursor() as cursor:
+            cursor.execute("SELECT * FROM logs ORDER BY timestamp DESC LIMIT 1000")
+            columns = [col[0] for col in cursor.description]
+            df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
         print(f"DEBUG: Data fetched. Shape: {df.shape}")
         if not df.empty:
             print(f"DEBUG: Columns: {df.columns.tolist()}")
@@ -0,0 +1,288 @@
+import argparse
+import multiprocessing
+from collections import deque
+from detection.engine import format_alert_object, get_detection_config, run_stateful_detection, StreamState
+from detection.beacon import epoch_seconds
+from ingest_logs import ALERT_SQL, alert_row, process_log
+from incidents import IncidentAggregator, counted_log_ids, ensure_incident_table, incident_target
+from storage import get_storage, use_storage, SQLiteStorage
+from config import Config
+
+BACKFILL_TABLE = """
+CREATE TABLE IF NOT EXISTS backfill_progress (
+    job VARCHAR(100) PRIMARY KEY,
+    last_log_id INT NOT NULL DEFAULT 0,
+    end_log_id INT,
+    logs_scanned BIGINT NOT NULL DEFAULT 0,
+    alerts_found BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+"""
+
+# Logs columns that are bookkeeping rather than log fields
+_ROW_ONLY_COLS = ("id", "created_at")
+
+# Keeps the oldest alert of each (raw_log_reference, detection_type) so the unique index can be built
+_DEDUPE_ALERTS_SQL = (
+    "DELETE FROM alerts WHERE raw_log_reference IS NOT NULL AND alert_id NOT IN ("
+    "SELECT keep_id FROM (SELECT MIN(alert_id) AS keep_id FROM alerts GROUP BY raw_log_reference, detection_type) AS keep)"
+)
+
+def ensure_alert_key(storage, conn):
+    """
+    Makes (raw_log_reference, detection_type) unique in `alerts`, which
+    ALERT_SQL relies on to upsert. Databases created before the key existed
+    may hold duplicates from earlier re-ingestion; those are removed first.
+    """
+    cursor = conn.cursor()
+    try:
+        storage.ensure_index(cursor, "alerts", "uq_alerts_log_type", ["raw_log_reference", "detection_type"], unique=True)
+    except storage.Error:
+        conn.rollback()
+        cursor.execute(_DEDUPE_ALERTS_SQL)
+        print(f"[!] Removed {cursor.rowcount} duplicate alerts before adding the (raw_log_reference, detection_type) key.")
+        storage.ensure_index(cursor, "alerts", "uq_alerts_log_type", ["raw_log_reference", "detection_type"], unique=True)
+    conn.commit()
+    cursor.close()
+
+class BackfillProgress:
+    """
+    Durable watermark of one backfill job: the last log id whose alerts are
+    committed and the id the job stops at. Saved in the same transaction as
+    each chunk's alerts, so a restarted job resumes exactly after them.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.last_log_id = 0
+        self.end_log_id = None
+        self.logs_scanned = 0
+        self.alerts_found = 0
+
+    @staticmethod
+    def ensure_table(cursor):
+        cursor.execute(BACKFILL_TABLE)
+
+    def load(self, cursor):
+        """Reads the saved state; returns True if the job had progress."""
+        cursor.execute(
+            "SELECT last_log_id, end_log_id, logs_scanned, alerts_found FROM backfill_progress WHERE job = %s",
+            (self.job,)
+        )
+        row = cursor.fetchone()
+        if row:
+            self.last_log_id, self.end_log_id, self.logs_scanned, self.alerts_found = row
+        return bool(row)
+
+    def save(self, cursor):
+        cursor.execute(
+            "INSERT INTO backfill_progress (job, last_log_id, end_log_id, logs_scanned, alerts_found) VALUES (%s, %s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE last_log_id = VALUES(last_log_id), end_log_id = VALUES(end_log_id), "
+            "logs_scanned = VALUES(logs_scanned), alerts_found = VALUES(alerts_found)",
+            (self.job, self.last_log_id, self.end_log_id, self.logs_scanned, self.alerts_found)
+        )
+
+def row_to_log(row):
+    """A `logs` row as the normalized log dictionary detection expects (NULL columns left out)."""
+    return {k: v for k, v in row.items() if v is not None and k not in _ROW_ONLY_COLS}
+
+def iter_log_chunks(cursor, after_id, end_id, chunk_rows):
+    """
+    Keyset pagination over `logs`: yields lists of rows with after_id < id <= end_id
+    in id order. Each query seeks on the primary key, so every chunk costs the same
+    however deep into the table it is, and no long-running read is held open.
+    """
+    while after_id < end_id:
+        cursor.execute(
+            f"SELECT * FROM logs WHERE id > %s AND id <= %s ORDER BY id LIMIT {int(chunk_rows)}",
+            (after_id, end_id)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1]["id"]
+
+def _detect_chunk(rows):
+    """Worker: stateless detection for a chunk of rows. Returns [(log_id, log, detections)]."""
+    results = []
+    for row in rows:
+        log = row_to_log(row)
+        processed = process_log(log)
+        results.append((row["id"], log, processed[1] if processed is not None else []))
+    return results
+
+def _iter_detected(chunks, workers):
+    """Runs _detect_chunk over `chunks`, in a pool when workers > 1; yields results in order."""
+    if workers <= 1:
+        for rows in chunks:
+            yield _detect_chunk(rows)
+        return
+
+    with multiprocessing.Pool(processes=workers) as pool:
+        in_flight = deque()
+        for rows in chunks:
+            in_flight.append(pool.apply_async(_detect_chunk, (rows,)))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().get()
+        while in_flight:
+            yield in_flight.popleft().get()
+
+def _known_alerts(cursor, first_id, last_id):
+    """(raw_log_reference, detection_type) of the alerts rows already stored for a log id range."""
+    cursor.execute(
+        "SELECT raw_log_reference, detection_type FROM alerts WHERE raw_log_reference >= %s AND raw_log_reference <= %s",
+        (first_id, last_id)
+    )
+    return set(cursor.fetchall())
+
+def _stateful_lookback():
+    """Seconds of history the stateful detectors keep: the longest of their windows."""
+    config = get_detection_config()
+    return max(config.beacon["flow_ttl"], config.dns["volume_window"], config.ssh["bruteforce_window"])
+
+def warm_state(reader, state, before_id, chunk_rows):
+    """
+    Replays the logs preceding `before_id` through the stateful detectors,
+    discarding their alerts, so a job that resumes or starts mid-table sees
+    the beacon, subdomain and SSH burst state a run from the start would.
+    Goes back (in id order) until logs are older than the longest detector
+    window before the last one. Returns the number of logs replayed.
+    """
+    lookback = _stateful_lookback()
+    after_id = newest = None
+    cursor_id = before_id
+    while after_id is None:
+        reader.execute(
+            f"SELECT id, timestamp FROM logs WHERE id < %s ORDER BY id DESC LIMIT {int(chunk_rows)}",
+            (cursor_id,)
+        )
+        rows = reader.fetchall()
+        if not rows:
+            after_id = 0
+            break
+        for row in rows:
+            seen = epoch_seconds(row["timestamp"])
+            if seen is None:
+                continue
+            if newest is None:
+                newest = seen
+            elif seen < newest - lookback:
+                after_id = row["id"]
+                break
+        cursor_id = rows[-1]["id"]
+
+    replayed = 0
+    for rows in iter_log_chunks(reader, after_id, before_id - 1, chunk_rows):
+        for _, log, detections in _detect_chunk(rows):
+            run_stateful_detection(log, state, detections)
+        replayed += len(rows)
+    return replayed
+
+def detect_backfill(job="default", from_id=None, until_id=None, chunk_rows=None, workers=None, restart=False):
+    """
+    Re-runs detection over logs already in the database. Like ingestion,
+    alerts are counted into `incidents`, and with Config.STORE_ALERT_ROWS also
+    upserted into `alerts` by (raw_log_reference, detection_type), which never
+    duplicates them.
+
+    Each log is counted into `incidents` once: logs already counted (by
+    ingestion or an earlier backfill, see incident_counted_logs) are skipped,
+    so reruns, --restart and overlapping ranges leave the counts unchanged.
+    With alerts rows stored, detections a counted log did not have before
+    (e.g. from new rules) are still added.
+
+    The job scans `logs` in keyset-paginated id chunks up to the highest id
+    present when it started (logs ingested later were already detected live),
+    runs the stateless pipeline in a pool of `workers` processes and feeds the
+    stateful detectors in id order. Every chunk is committed with the job's
+    watermark in a short transaction, so live ingestion is never blocked and
+    an interrupted job continues where it stopped. `restart` discards saved
+    progress. A job that resumes, or starts past the first log, first warms
+    the stateful detectors with the logs before it (see warm_state).
+    """
+    chunk_rows = chunk_rows or Config.BACKFILL_CHUNK_ROWS
+    workers = workers or Config.BACKFILL_WORKERS
+    storage = get_storage()
+    conn = storage.connect()
+
+    store_alert_rows = Config.STORE_ALERT_ROWS
+    if store_alert_rows:
+        ensure_alert_key(storage, conn)
+    cursor = conn.cursor()
+    ensure_incident_table(storage, cursor)
+    incidents = IncidentAggregator()
+    BackfillProgress.ensure_table(cursor)
+    progress = BackfillProgress(job)
+    resumed = progress.load(cursor) and not restart
+    if not resumed:
+        progress = BackfillProgress(job)
+    if from_id is not None:
+        progress.last_log_id = max(from_id - 1, 0)
+    if until_id is not None:
+        progress.end_log_id = until_id
+    elif progress.end_log_id is None:
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM logs")
+        progress.end_log_id = cursor.fetchone()[0]
+    progress.save(cursor)
+    conn.commit()
+
+    if resumed:
+        print(f"[*] Resuming backfill '{job}' after log id {progress.last_log_id} ({progress.logs_scanned} logs done)")
+    print(f"[*] Backfilling detection for logs {progress.last_log_id + 1}..{progress.end_log_id} "
+          f"({chunk_rows} per chunk, {workers} workers)")
+
+    reader = conn.cursor(dictionary=True)
+    state = StreamState()
+    try:
+        if progress.last_log_id > 0:
+            replayed = warm_state(reader, state, progress.last_log_id + 1, chunk_rows)
+            print(f"[*] Warmed stateful detectors with {replayed} earlier logs")
+        chunks = iter_log_chunks(reader, progress.last_log_id, progress.end_log_id, chunk_rows)
+        for results in _iter_detected(chunks, workers):
+            first_id, last_id = results[0][0], results[-1][0]
+            counted = counted_log_ids(cursor, first_id, last_id)
+            known = _known_alerts(cursor, first_id, last_id) if store_alert_rows else ()
+            alert_rows = []
+            for log_id, log, detections in results:
+                is_counted = log_id in counted
+                for d in run_stateful_detection(log, state, detections):
+                    alert_data = format_alert_object(d, log, log_id)
+                    alert_rows.append(alert_row(alert_data))
+                    if not is_counted or (store_alert_rows and (log_id, alert_data['detection_type']) not in known):
+                        incidents.add(alert_data, incident_target(log), log_id)
+                if not is_counted:
+                    incidents.count_logs(log_id)
+            if alert_rows and store_alert_rows:
+                cursor.executemany(ALERT_SQL, alert_rows)
+            # Incident counts, counted log ids and the watermark commit together
+            progress.last_log_id = results[-1][0]
+            progress.logs_scanned += len(results)
+            progress.alerts_found += len(alert_rows)
+            incidents.write(cursor)
+            progress.save(cursor)
+            conn.commit()
+            print(f"[*] {progress.logs_scanned} logs rescored (up to id {progress.last_log_id}), {progress.alerts_found} alerts found...")
+    finally:
+        reader.close()
+        cursor.close()
+        conn.close()
+
+    print(f"[+] Backfill '{job}' complete: {progress.logs_scanned} logs, {progress.alerts_found} alerts found.")
+    return progress
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run detection over logs already in the database")
+    parser.add_argument("--job", default="default", help="Progress is saved under this name; rerunning a job resumes it")
+    parser.add_argument("--from_id", type=int, help="First log id to rescore (default: where the job stopped, else 1)")
+    parser.add_argument("--until_id", type=int, help="Last log id to rescore (default: highest id when the job started)")
+    parser.add_argument("--chunk_rows", type=int, default=Config.BACKFILL_CHUNK_ROWS, help="Logs per keyset page / worker task")
+    parser.add_argument("--workers", type=int, default=Config.BACKFILL_WORKERS, help="Detection worker processes (1 = in-process)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the job's saved progress")
+    parser.add_argument("--sqlite", metavar="DB_PATH", help="Use this SQLite database instead of MySQL (same as STORAGE_BACKEND=sqlite)")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        use_storage(SQLiteStorage(args.sqlite))
+    detect_backfill(args.job, from_id=args.from_id, until_id=args.until_id, chunk_rows=args.chunk_rows,
+                    workers=args.workers, restart=args.restart)
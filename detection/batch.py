@@ -0,0 +1,287 @@
+import numpy as np
+import pandas as pd
+from detection.dns import detect_dns_tunneling, calculate_entropies
+from detection.ssh import detect_ssh_abuse, SUSPICIOUS_IOT_TYPES
+from detection.signatures import detect_web_attacks
+from detection.sigma import get_rule_pack, CONTENT_FIELD, rule_alert
+from detection.engine import get_detection_config, DETECTORS
+
+# Leading columns of the frame returned by run_detection_batch
+ALERT_COLUMNS = ["row", "type", "severity", "indicators", "mitre_tactic", "mitre_technique"]
+
+_IOT_TYPES = "|".join(SUSPICIOUS_IOT_TYPES)
+
+_ABSENT = object()
+
+def _is_missing(value):
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value)
+
+def _is_absent(value):
+    """
+    NaN / NA / NaT is how pandas and Arrow fill a key a log did not have;
+    None is a key the log held with a None value (e.g. a CSV loader row).
+    """
+    return value is not None and _is_missing(value)
+
+def _values(frame, col):
+    """
+    A column as an object Series of the values the per-log path sees. Integer
+    columns with missing values come out of pandas / Arrow as float64, so
+    integral floats are turned back into ints.
+    """
+    column = frame[col]
+    if pd.api.types.is_float_dtype(column.dtype):
+        numbers = column.to_numpy(dtype=np.float64)
+        values = numbers.astype(object)
+        # 22.0 -> 22, as the per-log dictionary held it
+        integral = np.isfinite(numbers) & (numbers == np.floor(numbers)) & (np.abs(numbers) < 2.0 ** 63)
+        values[integral] = numbers[integral].astype(np.int64).astype(object)
+        return pd.Series(values, index=column.index, dtype=object)
+    return column
+
+def _text(frame, col, lower=False):
+    """
+    A column rendered the way run_detection_pipeline renders a field with
+    str(log.get(col, '')): '' where the log did not have the key (the column
+    is absent or the value is NaN / NA) and 'None' for a None value.
+    """
+    if col not in frame.columns:
+        return pd.Series("", index=frame.index, dtype=object)
+    values = _values(frame, col)
+    text = values.astype("string").fillna("")
+    if values.dtype == object:
+        # Only object columns can hold None
+        is_none = np.fromiter((v is None for v in values.tolist()), dtype=bool, count=len(values))
+        if is_none.any():
+            text[is_none] = "None"
+    if lower:
+        text = text.str.lower()
+    return text.astype(object)
+
+def _mask(series):
+    return series.to_numpy(dtype=bool)
+
+def _factorize(values, mask):
+    """pd.factorize over the rows in `mask`; the other rows get code -1."""
+    if mask.all():
+        return pd.factorize(values)
+    codes = np.full(len(mask), -1)
+    masked_codes, uniques = pd.factorize(values[mask])
+    codes[mask] = masked_codes
+    return codes, uniques
+
+def _spread(frame_codes, unique_results):
+    """Yields (position, result) for every row whose unique value produced a result."""
+    has_result = np.array([bool(r) for r in unique_results] + [False])
+    # Code -1 (missing) indexes the trailing False
+    for pos in np.flatnonzero(has_result[frame_codes]):
+        yield pos, unique_results[frame_codes[pos]]
+
+class _Rows:
+    """Read access to single rows for the few rows a detector needs, built on demand."""
+
+    def __init__(self, frame, logs=None):
+        self._frame = frame
+        self._logs = logs
+        self._columns = {}
+
+    def value(self, col, pos, default=None):
+        values = self._columns.get(col)
+        if values is None:
+            if col not in self._frame.columns:
+                return default
+            values = self._columns[col] = _values(self._frame, col).tolist()
+        value = values[pos]
+        if _is_absent(value):
+            return default
+        return None if _is_missing(value) else value
+
+    def __getitem__(self, pos):
+        if self._logs is not None:
+            return self._logs[pos]
+        return _RowView(self, pos)
+
+class _RowView:
+    """The dict.get() interface the detectors use, over one row of the frame."""
+    __slots__ = ("_rows", "_pos")
+
+    def __init__(self, rows, pos):
+        self._rows = rows
+        self._pos = pos
+
+    def get(self, col, default=None):
+        return self._rows.value(col, self._pos, default)
+
+    def __getitem__(self, col):
+        value = self._rows.value(col, self._pos, _ABSENT)
+        if value is _ABSENT:
+            raise KeyError(col)
+        return value
+
+class _Batch:
+    """One detect_batch call: the frame, its rendered columns and the per-row results."""
+
+    def __init__(self, frame, logs, config):
+        self.frame = frame
+        self.rows = _Rows(frame, logs)
+        self.config = config
+        self.results = [[] for _ in range(len(frame))]
+        self._texts = {}
+        self._content = None
+        self._content_codes = None # factorized content of every row
+
+    def text(self, col, lower=False):
+        key = (col, lower)
+        text = self._texts.get(key)
+        if text is None:
+            text = self._texts[key] = _text(self.frame, col, lower)
+        return text
+
+    def present(self, col):
+        """Rows where log.get(col) is truthy, as Detector.requires checks it."""
+        if col not in self.frame.columns:
+            return np.zeros(len(self.frame), dtype=bool)
+        column = self.frame[col]
+        # Typed columns hold no None: missing and 0 / '' are the falsy values
+        if pd.api.types.is_numeric_dtype(column.dtype):
+            return _mask(column.notna() & (column != 0))
+        if isinstance(column.dtype, pd.StringDtype):
+            return _mask(column.notna() & (column != ""))
+        values = column.tolist()
+        return np.fromiter((not _is_missing(v) and bool(v) for v in values), dtype=bool, count=len(values))
+
+    def content(self, mask):
+        """Factorized msg + " " + raw_log (the `content` detectors get) over the rows in `mask`."""
+        if self._content is None:
+            self._content = self.text('msg') + " " + self.text('raw_log')
+        if mask.all():
+            if self._content_codes is None:
+                self._content_codes = pd.factorize(self._content)
+            return self._content_codes
+        return _factorize(self._content, mask)
+
+def _batch_dns(batch, mask):
+    # Once per distinct query name
+    codes, uniques = _factorize(batch.frame['qname'].astype(object), mask)
+    entropies = calculate_entropies(uniques)
+    alerts = [detect_dns_tunneling(domain, batch.config.dns, entropy) for domain, entropy in zip(uniques, entropies)]
+    for pos, alert in _spread(codes, alerts):
+        batch.results[pos].append(dict(alert, indicators=list(alert['indicators'])))
+
+def _batch_ssh(batch, mask):
+    # Only rows from an IoT device or failing auth can alert
+    device = batch.text('device_type', lower=True)
+    action = batch.text('action', lower=True)
+    suspicious = device.str.contains(_IOT_TYPES) | action.str.contains('fail', regex=False) | (action == 'deny')
+    for pos in np.flatnonzero(mask & _mask(suspicious)):
+        alert = detect_ssh_abuse(batch.rows[pos], batch.config.ssh)
+        if alert:
+            batch.results[pos].append(alert)
+
+def _batch_web(batch, mask):
+    # Once per distinct content
+    codes, contents = batch.content(mask)
+    web = [detect_web_attacks(text) for text in contents]
+    for pos, alerts in _spread(codes, web):
+        batch.results[pos].extend(dict(a) for a in alerts)
+
+def _batch_sigma(batch, mask):
+    # Items are collected per distinct field value
+    pack = get_rule_pack()
+    frame = batch.frame
+    row_hits = {}
+    for field in pack.fields:
+        if field in frame.columns:
+            codes, uniques = _factorize(_values(frame, field), mask)
+            hits = [pack.value_hits(field, value) for value in uniques]
+            for pos, found in _spread(codes, hits):
+                row_hits.setdefault(pos, set()).update(found)
+    if pack.uses_content:
+        codes, contents = batch.content(mask)
+        hits = [pack.value_hits(CONTENT_FIELD, text) for text in contents]
+        for pos, found in _spread(codes, hits):
+            row_hits.setdefault(pos, set()).update(found)
+
+    # Rule outcomes only depend on the hits and on which absence fields are empty
+    absence_fields = sorted(pack.absence_fields)
+    outcomes = {}
+    positions = np.flatnonzero(mask) if pack.needs_every_log else sorted(row_hits)
+    for pos in positions:
+        hits = frozenset(row_hits.get(pos, ()))
+        row = batch.rows[pos]
+        key = (hits, tuple(row.get(f) in (None, "") for f in absence_fields))
+        matched = outcomes.get(key)
+        if matched is None:
+            matched = outcomes[key] = [rule_alert(rule) for rule in pack.evaluate(hits, row)]
+        batch.results[pos].extend(dict(alert) for alert in matched)
+
+# Column-wise versions of the built-in detectors, by Detector.name. Any other
+# detector (e.g. one added with register_detector) runs row by row.
+BATCH_DETECTORS = {
+    "dns_tunneling": _batch_dns,
+    "ssh_abuse": _batch_ssh,
+    "web_attacks": _batch_web,
+    "sigma_rules": _batch_sigma,
+}
+
+def detect_batch(frame, logs=None):
+    """
+    Column-wise equivalent of calling run_detection_pipeline on every row
+    of a DataFrame of normalized logs. Returns one list of alert
+    dictionaries per row, identical to what the per-log pipeline returns.
+    `logs` may pass the same rows as dictionaries when the caller has them.
+
+    Every distinct routing key (log_type, protocol, service, dst_port) is
+    routed once through the DETECTORS index, giving each detector a row
+    mask, narrowed by its `requires` fields. Detectors in BATCH_DETECTORS
+    then evaluate DNS tunneling, the web signatures and the Sigma field
+    matchers once per distinct value of the column they inspect, so
+    repeated domains, payloads and field values cost nothing extra.
+    """
+    if hasattr(frame, "to_pandas"):
+        # pyarrow.Table and friends
+        frame = frame.to_pandas()
+    config = get_detection_config()
+    batch = _Batch(frame, logs, config)
+    if not len(frame):
+        return batch.results
+
+    keys = [batch.text('log_type', lower=True), batch.text('protocol', lower=True),
+            batch.text('service', lower=True), batch.text('dst_port')]
+    key_codes, unique_keys = pd.MultiIndex.from_arrays(keys).factorize()
+    routed = [DETECTORS.route_key(key)[0] for key in unique_keys]
+
+    for detector in DETECTORS.detectors:
+        if detector.enabled is not None and not detector.enabled(config):
+            continue
+        mask = np.array([detector in detectors for detectors in routed])[key_codes]
+        for field in detector.requires:
+            mask &= batch.present(field)
+        if not mask.any():
+            continue
+        run = BATCH_DETECTORS.get(detector.name)
+        if run is not None:
+            run(batch, mask)
+            continue
+        content = batch.content(mask) if detector.uses_content else None
+        for pos in np.flatnonzero(mask):
+            text = content[1][content[0][pos]] if content is not None else None
+            batch.results[pos].extend(detector.run(batch.rows[pos], config, text))
+
+    return batch.results
+
+def run_detection_batch(frame):
+    """
+    Runs detection over a DataFrame (or Arrow table) of normalized logs.
+    Returns a frame with one row per alert; its `row` column holds the index
+    label of the log that raised it.
+    """
+    if hasattr(frame, "to_pandas"):
+        frame = frame.to_pandas()
+    records = []
+    for label, alerts in zip(frame.index, detect_batch(frame)):
+        records.extend(dict(alert, row=label) for alert in alerts)
+    if not records:
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+    alerts = pd.DataFrame.from_records(records)
+    return alerts[ALERT_COLUMNS + [c for c in alerts.columns if c not in ALERT_COLUMNS]]
@@ -1,4 +1,7 @@
+import math
 import statistics
+from collections import OrderedDict
+from datetime import datetime
 
 def detect_beaconing(timestamps, tolerance=0.1):
     """
@@ -44,3 +47,114 @@ def detect_beaconing(timestamps, tolerance=0.1):
         }
 
     return None
+
+# Streaming defaults, overridden by detection_rules.beaconing in config.json
+BEACON_DEFAULTS = {"enabled": True, "tolerance": 0.1, "min_events": 4, "max_flows": 100000, "flow_ttl": 3600.0}
+
+class _FlowStats:
+    """Welford running statistics over one flow's inter-arrival gaps."""
+    __slots__ = ("last", "events", "mean", "m2", "alerted")
+
+    def __init__(self, last):
+        self.last = last
+        self.events = 1
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.alerted = False
+
+    def add_gap(self, gap):
+        self.events += 1
+        n = self.events - 1
+        delta = gap - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (gap - self.mean)
+
+def epoch_seconds(timestamp):
+    """Seconds since the epoch for a datetime, ISO string or number; None if unusable."""
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, str):
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return None
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return None
+
+class BeaconTracker:
+    """
+    Online counterpart of detect_beaconing for logs arriving in time order.
+
+    Each (src_ip, dst_ip, dst_port) flow keeps only its last timestamp and
+    the running count / mean / M2 of its gaps, so an event costs O(1) and no
+    timestamp list is kept. Flows idle for more than `flow_ttl` seconds (log
+    time) are dropped, and the least recently seen flow is evicted beyond
+    `max_flows`. A flow alerts once when its coefficient of variation drops
+    below `tolerance`, and again only after it has gone back above it.
+    """
+
+    def __init__(self):
+        self.flows = OrderedDict()
+        self.evicted = 0
+
+    def observe(self, key, timestamp, config=None):
+        """Feeds one event of flow `key`; returns a "Beaconing Detected" alert or None."""
+        config = BEACON_DEFAULTS if config is None else config
+        now = epoch_seconds(timestamp)
+        if now is None:
+            return None
+
+        flows = self.flows
+        flow = flows.get(key)
+        if flow is None:
+            flow = flows[key] = _FlowStats(now)
+        else:
+            gap = now - flow.last
+            if gap < 0:
+                # Out of order; keep the statistics of the in-order events
+                return None
+            flow.add_gap(gap)
+            flow.last = now
+            flows.move_to_end(key)
+        self._evict(now, config)
+        return self._check(key, flow, config)
+
+    def observe_log(self, log_entry, config=None):
+        """observe() for a normalized log; logs without both addresses are ignored."""
+        src, dst = log_entry.get('src_ip'), log_entry.get('dst_ip')
+        if not src or not dst:
+            return None
+        return self.observe((src, dst, log_entry.get('dst_port')), log_entry.get('timestamp'), config)
+
+    def _evict(self, now, config):
+        flows = self.flows
+        oldest = now - config.get("flow_ttl", BEACON_DEFAULTS["flow_ttl"])
+        max_flows = config.get("max_flows", BEACON_DEFAULTS["max_flows"])
+        while flows and (len(flows) > max_flows or next(iter(flows.values())).last < oldest):
+            flows.popitem(last=False)
+            self.evicted += 1
+
+    def _check(self, key, flow, config):
+        gaps = flow.events - 1
+        if flow.events < max(config.get("min_events", 4), 3) or flow.mean <= 0:
+            return None
+        variance = flow.m2 / (gaps - 1)
+        cv = math.sqrt(max(variance, 0.0)) / flow.mean
+        if cv >= config.get("tolerance", 0.1):
+            flow.alerted = False
+            return None
+        if flow.alerted:
+            return None
+        flow.alerted = True
+        src, dst, port = key
+        return {
+            "type": "Beaconing Detected",
+            "severity": "Low",
+            "average_interval": flow.mean,
+            "variance": variance,
+            "events_count": flow.events,
+            "indicators": [f"Fixed-interval traffic {src} -> {dst}:{port} every {flow.mean:.1f}s (CV {cv:.3f} over {flow.events} events)"],
+            "mitre_tactic": "Command and Control (TA0011)",
+            "mitre_technique": "Application Layer Protocol (T1071)"
+        }
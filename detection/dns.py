@@ -1,18 +1,76 @@
 import math
-from collections import Counter
+from collections import Counter, OrderedDict
+from functools import lru_cache
+import numpy as np
+from detection.beacon import epoch_seconds
+from detection.hll import HyperLogLog, estimate_registers
+from detection.domains import parse_domain
 
+# Distinct query names whose entropy is remembered (DNS traffic repeats names constantly)
+ENTROPY_CACHE_SIZE = 65536
+
+_LOG2 = math.log(2.0)
+
+def _entropy_term(count, length):
+    p = float(count) / length
+    return p * math.log(p) / _LOG2
+
+@lru_cache(maxsize=ENTROPY_CACHE_SIZE)
 def calculate_entropy(string):
     """Calculates the Shannon entropy of a string."""
     if not string:
         return 0
-    prob = [float(string.count(c)) / len(string) for c in dict.fromkeys(list(string))]
-    entropy = - sum([p * math.log(p) / math.log(2.0) for p in prob])
+    # Counter keeps first-appearance order, so the terms are summed in the same order as before
+    length = len(string)
+    prob = [count / length for count in Counter(string).values()]
+    entropy = - sum([p * math.log(p) / _LOG2 for p in prob])
     return entropy
 
-def detect_dns_tunneling(domain, config=None):
+def calculate_entropies(strings):
+    """
+    Shannon entropy of every string in `strings`, identical to calling
+    calculate_entropy on each. Distinct ASCII names are scored together from
+    one vectorized byte histogram, and each distinct (count, length) term is
+    computed once.
+    """
+    strings = list(strings)
+    scores = {}
+    ascii_names = []
+    for s in dict.fromkeys(strings):
+        if isinstance(s, str) and s and s.isascii():
+            ascii_names.append(s)
+        else:
+            scores[s] = calculate_entropy(s)
+    if ascii_names:
+        scores.update(zip(ascii_names, _ascii_entropies(ascii_names)))
+    return [scores[s] for s in strings]
+
+def _ascii_entropies(names):
+    lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+    starts = np.cumsum(lengths) - lengths
+    data = np.frombuffer("".join(names).encode("ascii"), dtype=np.uint8)
+    rows = np.repeat(np.arange(len(names)), lengths)
+
+    # One histogram bin per (name, byte); return_index gives each bin's first occurrence
+    bins, first, counts = np.unique(rows * 128 + data, return_index=True, return_counts=True)
+    bin_rows = bins // 128
+    # Characters are summed in order of first appearance, like calculate_entropy
+    order = np.lexsort((first, bin_rows))
+    bin_rows, counts = bin_rows[order], counts[order]
+
+    bin_lengths = lengths[bin_rows]
+    pairs, inverse = np.unique(counts * (int(lengths.max()) + 1) + bin_lengths, return_inverse=True)
+    table = np.array([_entropy_term(*divmod(int(pair), int(lengths.max()) + 1)) for pair in pairs])
+    terms = table[inverse.ravel()].tolist()
+
+    bounds = np.searchsorted(bin_rows, np.arange(len(names) + 1)).tolist()
+    return [- sum(terms[bounds[i]:bounds[i + 1]]) for i in range(len(names))]
+
+def detect_dns_tunneling(domain, config=None, entropy=None):
     """
     Analyzes a domain string for signs of DNS tunneling.
     Returns a dictionary with detection details if suspicious, else None.
+    `entropy` may pass the domain's precomputed calculate_entropy score.
     """
     if config is None:
         config = {"entropy_threshold": 4.5, "max_length": 50}
@@ -33,7 +91,8 @@ def detect_dns_tunneling(domain, config=None):
         details.append(f"High query length ({len(domain)})")
 
     # Check 2: Entropy
-    entropy = calculate_entropy(domain)
+    if entropy is None:
+        entropy = calculate_entropy(domain)
     if entropy > HIGH_ENTROPY_THRESHOLD:
         details.append(f"High entropy ({entropy:.2f})")
 
@@ -68,9 +127,9 @@ def analyze_subdomain_volume(logs, threshold=None):
         if not domain:
             continue
         
-        parts = domain.split('.')
-        if len(parts) > 2:
-            parent = ".".join(parts[-2:])
+        parts = parse_domain(domain)
+        if parts and parts.subdomain:
+            parent = parts.registered_domain
             if parent not in parent_domains:
                 parent_domains[parent] = set()
             parent_domains[parent].add(domain)
@@ -87,3 +146,102 @@ def analyze_subdomain_volume(logs, threshold=None):
             })
             
     return alerts
+
+# Windowed subdomain volume defaults, overridden by detection_rules.dns in config.json
+VOLUME_DEFAULTS = {"volume_threshold": 10, "volume_window": 300.0, "volume_buckets": 5, "volume_max_parents": 10000}
+
+class _ParentWindow:
+    """HyperLogLog sketches of one parent domain's subdomains, one per time bucket."""
+    __slots__ = ("buckets", "older", "alerted")
+
+    def __init__(self):
+        self.buckets = {}
+        self.older = None # union of the window's buckets except the newest, rebuilt on demand
+        self.alerted = False
+
+class SubdomainVolumeTracker:
+    """
+    Sliding-window counterpart of analyze_subdomain_volume for logs arriving
+    in time order. Unique query names are counted per parent (registered)
+    domain, found with parse_domain, with a HyperLogLog per time bucket
+    (volume_window / volume_buckets seconds), and the window's estimate is
+    the union of its buckets. Each parent therefore
+    costs at most volume_buckets + 1 sketches whatever the query volume; the
+    least recently queried parents are evicted beyond volume_max_parents.
+
+    A parent alerts once when its estimate exceeds volume_threshold, and again
+    only after the estimate has fallen back under it.
+    """
+
+    def __init__(self, precision=10):
+        self.precision = precision
+        self.parents = OrderedDict()
+        self.evicted = 0
+
+    def observe(self, domain, timestamp, config=None):
+        """Feeds one query name; returns an "Excessive Unique Subdomains" alert or None."""
+        config = VOLUME_DEFAULTS if config is None else config
+        parts = parse_domain(domain)
+        now = epoch_seconds(timestamp)
+        if not parts or not parts.subdomain or now is None:
+            return None
+        parent = parts.registered_domain
+
+        buckets = max(1, int(config.get("volume_buckets", VOLUME_DEFAULTS["volume_buckets"])))
+        width = max(config.get("volume_window", VOLUME_DEFAULTS["volume_window"]) / buckets, 1e-6)
+        bucket = int(now // width)
+
+        state = self.parents.get(parent)
+        if state is None:
+            state = self.parents[parent] = _ParentWindow()
+            max_parents = config.get("volume_max_parents", VOLUME_DEFAULTS["volume_max_parents"])
+            while len(self.parents) > max_parents:
+                self.parents.popitem(last=False)
+                self.evicted += 1
+        else:
+            self.parents.move_to_end(parent)
+
+        newest = max(state.buckets, default=bucket)
+        if bucket > newest:
+            # The window slid: forget buckets that left it
+            state.buckets = {b: s for b, s in state.buckets.items() if b > bucket - buckets}
+            state.older = None
+            newest = bucket
+        elif bucket <= newest - buckets:
+            # Older than the window
+            return None
+
+        sketch = state.buckets.get(bucket)
+        if sketch is None:
+            sketch = state.buckets[bucket] = HyperLogLog(self.precision)
+        changed = sketch.add(domain)
+        if bucket != newest:
+            state.older = None
+        elif not changed and state.older is not None:
+            # Same registers, same estimate
+            return None
+
+        if state.older is None:
+            state.older = HyperLogLog.union((s for b, s in state.buckets.items() if b != newest), self.precision)
+        window = np.maximum(np.frombuffer(state.older.registers, dtype=np.uint8),
+                            np.frombuffer(state.buckets[newest].registers, dtype=np.uint8))
+        count = round(estimate_registers(window))
+        return self._check(parent, state, count, config)
+
+    def _check(self, parent, state, count, config):
+        threshold = config.get("volume_threshold", VOLUME_DEFAULTS["volume_threshold"])
+        if count <= threshold:
+            state.alerted = False
+            return None
+        if state.alerted:
+            return None
+        state.alerted = True
+        return {
+            "type": "Excessive Unique Subdomains",
+            "severity": "Medium",
+            "domain": parent,
+            "count": count,
+            "indicators": [f"~{count} unique subdomains of {parent} within {config.get('volume_window', VOLUME_DEFAULTS['volume_window']):g}s"],
+            "mitre_tactic": "Command and Control (TA0011)",
+            "mitre_technique": "Application Layer Protocol: DNS (T1071.004)"
+        }
@@ -0,0 +1,124 @@
+from collections import namedtuple
+from functools import lru_cache
+from config import Config
+
+# Distinct query names whose parse is remembered
+DOMAIN_CACHE_SIZE = 65536
+
+# registered_domain: the public suffix plus one label ("example.co.uk"), None when
+# the name is itself a public suffix. subdomain: everything left of it ('' if none).
+DomainParts = namedtuple("DomainParts", [
+    "name", "registered_domain", "public_suffix", "subdomain",
+    "labels", "subdomain_labels", "longest_label", "length",
+])
+
+class _Node:
+    __slots__ = ("children", "rule", "exception")
+
+    def __init__(self):
+        self.children = {}
+        self.rule = False
+        self.exception = False
+
+class SuffixTrie:
+    """
+    Public suffix rules compiled into a trie over reversed labels ("co.uk" is
+    uk -> co), so finding the public suffix of a name walks its labels from
+    the right once. Implements the publicsuffix.org algorithm: the longest
+    matching rule wins, "*" matches any one label, "!" exception rules end the
+    suffix one label earlier, and an unlisted TLD is a suffix on its own.
+    """
+
+    def __init__(self, rules=()):
+        self.root = _Node()
+        self.size = 0
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule):
+        exception = rule.startswith("!")
+        labels = rule.lstrip("!").lower().split(".")
+        node = self.root
+        for label in reversed(labels):
+            node = node.children.setdefault(label, _Node())
+        node.exception = exception
+        node.rule = not exception
+        self.size += 1
+
+    @classmethod
+    def from_file(cls, path):
+        """Compiles a public_suffix_list.dat file (IDN rules also in their xn-- form)."""
+        trie = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                rule = line.split(None, 1)[0] if line.strip() else ""
+                if not rule or rule.startswith("//"):
+                    continue
+                trie.add(rule)
+                if not rule.isascii():
+                    try:
+                        trie.add(".".join(label if label in ("*", "!") else label.encode("idna").decode("ascii")
+                                          for label in rule.split(".")))
+                    except UnicodeError:
+                        pass
+        return trie
+
+    def suffix_length(self, labels):
+        """Number of trailing `labels` (lowercase, left to right) that form the public suffix."""
+        match = 1
+        node = self.root
+        for depth, label in enumerate(reversed(labels), 1):
+            child = node.children.get(label)
+            if child is not None and child.exception:
+                return depth - 1
+            if "*" in node.children:
+                match = depth
+            if child is None:
+                break
+            if child.rule:
+                match = depth
+            node = child
+        return min(match, len(labels))
+
+_suffix_trie = None
+
+def get_suffix_trie():
+    """The bundled list (Config.PUBLIC_SUFFIX_LIST), compiled on first use."""
+    global _suffix_trie
+    if _suffix_trie is None:
+        _suffix_trie = SuffixTrie.from_file(Config.PUBLIC_SUFFIX_LIST)
+    return _suffix_trie
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def parse_domain(name):
+    """
+    Splits a query name into registered domain, public suffix and subdomain
+    plus its label statistics, in one pass. Names are lowercased and lose a
+    trailing dot. Returns None for an empty name.
+    """
+    name = str(name).strip().rstrip(".").lower() if name else ""
+    if not name:
+        return None
+    labels = name.split(".")
+    suffix_len = get_suffix_trie().suffix_length(labels)
+    public_suffix = ".".join(labels[len(labels) - suffix_len:])
+    if suffix_len >= len(labels):
+        registered, sub = None, []
+    else:
+        registered = ".".join(labels[len(labels) - suffix_len - 1:])
+        sub = labels[:len(labels) - suffix_len - 1]
+    return DomainParts(
+        name=name,
+        registered_domain=registered,
+        public_suffix=public_suffix,
+        subdomain=".".join(sub),
+        labels=len(labels),
+        subdomain_labels=len(sub),
+        longest_label=max(map(len, labels)),
+        length=len(name),
+    )
+
+def registered_domain(name):
+    """The registered domain of `name` ("a.b.example.co.uk" -> "example.co.uk"), or None."""
+    parts = parse_domain(name)
+    return parts.registered_domain if parts else None
@@ -1,89 +1,189 @@
 from detection.dns import detect_dns_tunneling
-from detection.ssh import detect_ssh_abuse
-# Beaconing usually requires state/multiple logs, so it might be triggered differently 
-# or via a periodic job. For single-log processing, we include stateless checks.
+from detection.ssh import detect_ssh_abuse, split_ssh_alert, SSHBruteForceTracker, BRUTEFORCE_DEFAULTS
+from detection.signatures import detect_web_attacks
+from detection.sigma import detect_sigma_rules
+from detection.registry import Detector, DetectorRegistry, Route
+# Beaconing, subdomain volume and SSH bursts need state across logs; they run
+# in run_stateful_detection, fed by the ingest writer
+from detection.beacon import BeaconTracker, BEACON_DEFAULTS
+from detection.dns import SubdomainVolumeTracker, VOLUME_DEFAULTS
 import json
 import os
+import threading
+import time
+from config import Config
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.json')
+
+# Detector defaults, used for any threshold config.json leaves out
+DNS_DEFAULTS = dict({"entropy_threshold": 4.5, "max_length": 50}, **VOLUME_DEFAULTS)
+SSH_DEFAULTS = dict({"check_iot_types": True, "fail_threshold_enabled": True}, **BRUTEFORCE_DEFAULTS)
+SIGMA_DEFAULTS = {"enabled": True}
+
+def _resolve(section, defaults):
+    """Merges a detection_rules section over the defaults, coercing each value to the default's type."""
+    resolved = dict(defaults)
+    for key, value in section.items():
+        kind = type(defaults.get(key, value))
+        try:
+            resolved[key] = kind(value)
+        except (TypeError, ValueError):
+            print(f"[!] Ignoring invalid detection setting {key}={value!r}")
+    return resolved
+
+class DetectionConfig:
+    """
+    The detection_rules section of config.json, cached in memory. The file is
+    re-read only when its mtime or size changes, and at most one stat() call
+    is made every `check_interval` seconds, so edits go live without a
+    restart while the per-log cost stays a clock read. Detector thresholds
+    are resolved against their defaults once per reload.
+    """
+
+    def __init__(self, path=CONFIG_PATH, check_interval=None):
+        self.path = path
+        self.check_interval = Config.DETECTION_CONFIG_CHECK_INTERVAL if check_interval is None else check_interval
+        self.rules = {}
+        self.dns = dict(DNS_DEFAULTS)
+        self.ssh = dict(SSH_DEFAULTS)
+        self.sigma = dict(SIGMA_DEFAULTS)
+        self.beacon = dict(BEACON_DEFAULTS)
+        self._stamp = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Returns self after reloading the file if it changed since the last check."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    self._reload_if_changed()
+        return self
+
+    def _reload_if_changed(self):
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp == self._stamp:
+            return
+        self._stamp = stamp
+
+        if stamp is None:
+            rules = {}
+        else:
+            try:
+                with open(self.path, 'r') as f:
+                    rules = json.load(f).get('detection_rules', {})
+            except (OSError, ValueError, AttributeError) as e:
+                # Typically a half-written file; keep the last good rules until the next change
+                print(f"[!] Could not reload {self.path}, keeping previous detection rules: {e}")
+                return
+        self.rules = rules
+        self.dns = _resolve(rules.get('dns', {}), DNS_DEFAULTS)
+        self.ssh = _resolve(rules.get('ssh', {}), SSH_DEFAULTS)
+        self.sigma = _resolve(rules.get('sigma', {}), SIGMA_DEFAULTS)
+        self.beacon = _resolve(rules.get('beaconing', {}), BEACON_DEFAULTS)
+
+_detection_config = DetectionConfig()
+
+def get_detection_config():
+    """Returns the shared, up-to-date DetectionConfig."""
+    return _detection_config.current()
 
 def load_detection_config():
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.json')
-    try:
-        with open(config_path, 'r') as f:
-            return json.load(f).get('detection_rules', {})
-    except:
-        return {}
+    """Returns the raw detection_rules section of config.json (cached)."""
+    return get_detection_config().rules
+
+def _run_dns(log_entry, config, content):
+    dns_alert = detect_dns_tunneling(log_entry['qname'], config.dns)
+    return [dns_alert] if dns_alert else []
+
+def _run_ssh(log_entry, config, content):
+    ssh_alert = detect_ssh_abuse(log_entry, config.ssh)
+    return [ssh_alert] if ssh_alert else []
+
+def _run_web(log_entry, config, content):
+    return detect_web_attacks(content)
+
+def _run_sigma(log_entry, config, content):
+    return detect_sigma_rules(log_entry, content)
+
+_TCP = frozenset({'6', 'tcp'})
+
+# Stateless detectors in alert order, with the logs each one applies to
+DETECTORS = DetectorRegistry([
+    # 1. DNS: UDP (17) or DNS service or port 53, with a query name
+    Detector("dns_tunneling", _run_dns, requires=('qname',),
+             routes=[Route(protocols={'17'}), Route(services=('dns',)), Route(ports={'53'})]),
+    # 2. SSH: TCP (6) AND (SSH service OR port 22)
+    Detector("ssh_abuse", _run_ssh,
+             routes=[Route(protocols=_TCP, services=('ssh',)), Route(protocols=_TCP, ports={'22'})]),
+    # 3. Web / database / shell signatures over msg + raw_log. Every log carries
+    # raw_log, so this runs everywhere; its literal prefilter keeps flows cheap
+    Detector("web_attacks", _run_web, uses_content=True),
+    # 4. Sigma rule pack compiled from pattern/ (stateless rules only, indexed by field)
+    Detector("sigma_rules", _run_sigma, uses_content=True, enabled=lambda config: config.sigma["enabled"]),
+])
+
+def register_detector(detector):
+    """Adds a stateless detector (see detection.registry.Detector) after the built-in ones."""
+    DETECTORS.register(detector)
 
 def run_detection_pipeline(log_entry):
     """
     Runs all applicable stateless detection rules on a single normalized log entry.
+    Only the detectors routed to the log (by log_type, protocol, service and
+    dst_port) are run.
+    """
+    # Live config; re-read only after config.json changes
+    config = get_detection_config()
+    return DETECTORS.run(log_entry, config)
+
+class StreamState:
+    """Per-run state of the stateful detectors (one per ingest writer)."""
+
+    def __init__(self):
+        self.beacon = BeaconTracker()
+        self.subdomains = SubdomainVolumeTracker()
+        self.ssh = SSHBruteForceTracker()
+
+def run_stateful_detection(log_entry, state, detections=()):
+    """
+    Runs the detectors that keep state across logs (held in a StreamState)
+    over a log and its run_detection_pipeline `detections`. Returns the
+    log's final alert list. Must be called once per log, in arrival order,
+    by the single process writing them.
     """
     alerts_found = []
+    config = get_detection_config()
+
+    # 0. SSH authentication failures are folded into one escalating alert per
+    # burst; IoT exposure is still reported per log
+    for alert in detections:
+        if alert.get('type') == "SSH Abuse" and config.ssh["bruteforce_enabled"]:
+            alert, failure = split_ssh_alert(alert)
+            if alert:
+                alerts_found.append(alert)
+            alert = state.ssh.observe(log_entry, failure, config.ssh) if failure else None
+        if alert:
+            alerts_found.append(alert)
+
+    # 1. Beaconing: running interval statistics per (src_ip, dst_ip, dst_port)
+    if config.beacon["enabled"]:
+        beacon_alert = state.beacon.observe_log(log_entry, config.beacon)
+        if beacon_alert:
+            alerts_found.append(beacon_alert)
 
-    # Load live config
-    config = load_detection_config()
-
-    # 1. DNS Detection
-    # Check for UDP (17) or DNS service or Port 53
-    proto = str(log_entry.get('protocol', '')).lower()
-    svc = str(log_entry.get('service', '')).lower()
-    port = str(log_entry.get('dst_port', ''))
-    
-    if (proto == '17' or 'dns' in svc or port == '53') and log_entry.get('qname'):
-        dns_alert = detect_dns_tunneling(log_entry['qname'], config.get('dns', {}))
-        if dns_alert:
-            alerts_found.append(dns_alert)
-
-    # 2. SSH Detection
-    # Check for TCP (6) AND (SSH service OR Port 22)
-    if (proto == '6' or proto == 'tcp') and ('ssh' in svc or port == '22'):
-        ssh_alert = detect_ssh_abuse(log_entry, config.get('ssh', {}))
-        if ssh_alert:
-            alerts_found.append(ssh_alert)
-
-    # 3. Generic Keyword Detection (Web / Database / Shell)
-    # Checks 'msg' or 'raw_log' for common attack signatures
-    import re
-    content = str(log_entry.get('msg', '')) + " " + str(log_entry.get('raw_log', ''))
-    
-    # SQL Injection via Regex (Handles newlines and multiple spaces)
-    # detecting: select *, drop table, union select, truncate table, delete from
-    if re.search(r"select\s+\*", content, re.IGNORECASE) or \
-       re.search(r"drop\s+table", content, re.IGNORECASE) or \
-       re.search(r"union\s+select", content, re.IGNORECASE) or \
-       re.search(r"truncate\s+table", content, re.IGNORECASE) or \
-       re.search(r"delete\s+from", content, re.IGNORECASE):
-        alerts_found.append({
-            "type": "SQL Injection Attempt",
-            "severity": "high",
-            "mitre_tactic": "Initial Access",
-            "mitre_technique": "T1190",
-            "indicators": "Suspicious SQL patterns detected (Regex Match)"
-        })
-        
-    # XSS / Web Injection
-    # detecting: <script>, alert(...), onerror=, onload=, and URL encoded variants (%3Cscript)
-    if re.search(r"<script", content, re.IGNORECASE) or \
-       re.search(r"%3Cscript", content, re.IGNORECASE) or \
-       re.search(r"alert\s*\(", content, re.IGNORECASE) or \
-       re.search(r"on\w+\s*=", content, re.IGNORECASE) or \
-       re.search(r"javascript:", content, re.IGNORECASE):
-        alerts_found.append({
-            "type": "Cross-Site Scripting (XSS)",
-            "severity": "medium",
-            "mitre_tactic": "Initial Access",
-            "mitre_technique": "T1190",
-            "indicators": "XSS payload detected (Regex Match)"
-        })
-        
-    # Path Traversal
-    if re.search(r"\.\.[/|\\]", content) or "/etc/passwd" in content:
-        alerts_found.append({
-            "type": "Directory Traversal",
-            "severity": "high",
-            "mitre_tactic": "Initial Access",
-            "mitre_technique": "T1190",
-            "indicators": "Path traversal sequence detected"
-        })
+    # 2. Unique subdomains per parent domain over a sliding window
+    qname = log_entry.get('qname')
+    if qname and isinstance(qname, str):
+        volume_alert = state.subdomains.observe(qname, log_entry.get('timestamp'), config.dns)
+        if volume_alert:
+            alerts_found.append(volume_alert)
 
     return alerts_found
 
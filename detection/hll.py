@@ -0,0 +1,60 @@
+import hashlib
+import math
+import numpy as np
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality sketch: 2**precision one-byte registers, so its
+    size is fixed however many distinct values are added (1 KB and about 3%
+    standard error at the default precision of 10). Sketches of the same
+    precision merge with a register-wise max, which is exactly the sketch of
+    the union.
+    """
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision=10, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision) if registers is None else registers
+
+    def add(self, value):
+        """Adds a string; returns True if the sketch changed."""
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "big")
+        bits = 64 - self.precision
+        index = h >> bits
+        # Position of the leftmost 1 in the remaining bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        """Folds `other` into this sketch."""
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        np.maximum(registers, np.frombuffer(other.registers, dtype=np.uint8), out=registers)
+
+    @classmethod
+    def union(cls, sketches, precision=10):
+        """A new sketch of the union of `sketches`."""
+        merged = cls(precision)
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+    def estimate(self):
+        """Estimated number of distinct values added."""
+        return estimate_registers(self.registers)
+
+def estimate_registers(registers):
+    """Cardinality estimate from a register array or buffer (see HyperLogLog)."""
+    registers = np.frombuffer(registers, dtype=np.uint8)
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[m]
+    raw = alpha * m * m / float(np.ldexp(1.0, -registers.astype(np.int32)).sum())
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        # Small range correction: linear counting is more accurate here
+        return m * math.log(m / zeros)
+    return float(raw)
@@ -0,0 +1,95 @@
+from collections import namedtuple
+
+# A condition a log must meet for a detector to apply. Every given field of a
+# route must hold; a detector applies when any of its routes does.
+#   protocols: lowercased protocol names/numbers, services: substrings of the
+#   lowercased service, ports: dst_port values as strings, log_types: log_type values
+Route = namedtuple("Route", ["protocols", "services", "ports", "log_types"], defaults=(None, None, None, None))
+
+class Detector:
+    """
+    A per-log detector and the logs it can fire on.
+
+    `run(log_entry, config, content)` returns a list of alerts; `content` is
+    msg + " " + raw_log, built once per log when a routed detector sets
+    uses_content. `routes=None` means every log. `requires` lists fields that
+    must be non-empty, and `enabled(config)` switches the detector at runtime.
+    """
+
+    def __init__(self, name, run, routes=None, requires=(), enabled=None, uses_content=False):
+        self.name = name
+        self.run = run
+        self.routes = None if routes is None else tuple(routes)
+        self.requires = tuple(requires)
+        self.enabled = enabled
+        self.uses_content = uses_content
+
+    def applies_to(self, log_type, proto, svc, port):
+        if self.routes is None:
+            return True
+        return any(_route_matches(route, log_type, proto, svc, port) for route in self.routes)
+
+def _route_matches(route, log_type, proto, svc, port):
+    if route.protocols is not None and proto not in route.protocols:
+        return False
+    if route.services is not None and not any(s in svc for s in route.services):
+        return False
+    if route.ports is not None and port not in route.ports:
+        return False
+    if route.log_types is not None and log_type not in route.log_types:
+        return False
+    return True
+
+class DetectorRegistry:
+    """
+    Ordered detectors plus a dispatch index from a log's routing key
+    (log_type, protocol, service, dst_port) to the detectors whose routes
+    match it. Logs repeat a small set of keys, so routing is one dict lookup
+    per log and only the matching detectors run; alerts keep registration
+    order. The index is rebuilt whenever a detector is registered.
+    """
+
+    # Distinct routing keys remembered before the index starts over
+    MAX_KEYS = 4096
+
+    def __init__(self, detectors=()):
+        self.detectors = []
+        self._index = {}
+        for detector in detectors:
+            self.register(detector)
+
+    def register(self, detector):
+        self.detectors.append(detector)
+        self._index = {}
+
+    def route(self, log_entry):
+        """Returns (detectors, uses_content) for a log."""
+        return self.route_key((
+            str(log_entry.get('log_type', '')).lower(),
+            str(log_entry.get('protocol', '')).lower(),
+            str(log_entry.get('service', '')).lower(),
+            str(log_entry.get('dst_port', '')),
+        ))
+
+    def route_key(self, key):
+        """Returns (detectors, uses_content) for a routing key as route() builds it."""
+        routed = self._index.get(key)
+        if routed is None:
+            if len(self._index) >= self.MAX_KEYS:
+                self._index = {}
+            detectors = tuple(d for d in self.detectors if d.applies_to(*key))
+            routed = self._index[key] = (detectors, any(d.uses_content for d in detectors))
+        return routed
+
+    def run(self, log_entry, config):
+        """Runs the detectors routed to `log_entry`; returns their alerts in registration order."""
+        detectors, uses_content = self.route(log_entry)
+        content = str(log_entry.get('msg', '')) + " " + str(log_entry.get('raw_log', '')) if uses_content else None
+        alerts_found = []
+        for detector in detectors:
+            if detector.requires and not all(log_entry.get(f) for f in detector.requires):
+                continue
+            if detector.enabled is not None and not detector.enabled(config):
+                continue
+            alerts_found.extend(detector.run(log_entry, config, content))
+        return alerts_found
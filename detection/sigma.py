@@ -0,0 +1,525 @@
+import os
+import re
+import itertools
+import json
+import hashlib
+import yaml
+from detection.signatures import SignatureMatcher
+from config import Config
+
+# Bump when the cached rule format changes
+CACHE_VERSION = 2
+
+# Sigma / ECS / W3C field names -> keys of a normalized log entry
+FIELD_ALIASES = {
+    "source.ip": "src_ip", "source_ip": "src_ip", "c-ip": "src_ip",
+    "destination.ip": "dst_ip", "destination_ip": "dst_ip",
+    "source.port": "src_port", "source_port": "src_port",
+    "destination.port": "dst_port", "destination_port": "dst_port",
+    "network.protocol": "protocol", "network.transport": "protocol",
+    "cs-method": "http_method", "request_method": "http_method", "http.request.method": "http_method",
+    "request_uri": "url", "cs-uri-stem": "url", "cs-uri-query": "url", "uri_query": "url", "url.original": "url",
+    "cs-user-agent": "user_agent", "user_agent.original": "user_agent",
+    "http_status": "status_code", "http.status": "status_code", "http.response.status": "status_code", "sc-status": "status_code",
+    "message": "msg", "log_message": "msg",
+    "user.name": "user",
+    "bytes_sent": "sentbyte", "source.bytes": "sentbyte",
+    "dns.question.name": "qname",
+}
+
+# Pseudo field for keyword selections: the log's msg + raw_log text
+CONTENT_FIELD = "_content"
+
+_COMPARISONS = {"gt": float.__gt__, "gte": float.__ge__, "lt": float.__lt__, "lte": float.__le__}
+_STRING_MODIFIERS = {"contains", "startswith", "endswith"}
+
+_MITRE_TACTICS = {
+    "reconnaissance", "resource-development", "initial-access", "execution", "persistence",
+    "privilege-escalation", "defense-evasion", "credential-access", "discovery",
+    "lateral-movement", "collection", "command-and-control", "exfiltration", "impact",
+}
+
+class UnsupportedRule(Exception):
+    """A rule this compiler cannot turn into a stateless matcher."""
+
+# ---------------------------------------------------------------------------
+# Loading and normalization (the output is plain JSON, see load_rule_pack)
+# ---------------------------------------------------------------------------
+
+def _read_yaml(path):
+    """
+    Parses a rule file. Some files in pattern/ start with a bare title line
+    that is not YAML; when parsing fails, leading lines up to the first
+    `key:` line are dropped and parsing is retried.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError:
+        lines = text.splitlines()
+        start = next((i for i, line in enumerate(lines) if re.match(r"[\w.-]+:", line)), 0)
+        if start == 0:
+            raise
+        return yaml.safe_load("\n".join(lines[start:]))
+
+def _text(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value if isinstance(value, str) else str(value)
+
+def _glob_to_regex(value):
+    """Sigma wildcards: * and ? (a backslash escapes the next character)."""
+    out = []
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char == "\\" and i + 1 < len(value):
+            out.append(re.escape(value[i + 1]))
+            i += 2
+            continue
+        if char == "*":
+            out.append(r"[\s\S]*")
+        elif char == "?":
+            out.append(r"[\s\S]")
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "^" + "".join(out) + r"\Z"
+
+def _normalize_item(key, values):
+    """Turns one `field|modifier: value(s)` entry into a list of item dicts (ANDed)."""
+    field, *modifiers = key.split("|")
+    field = FIELD_ALIASES.get(field, field)
+    require_all = "all" in modifiers
+    modifiers = [m for m in modifiers if m != "all"]
+    if len(modifiers) > 1:
+        raise UnsupportedRule(f"modifier chain {key!r}")
+    op = modifiers[0] if modifiers else "eq"
+    if op not in _STRING_MODIFIERS and op not in _COMPARISONS and op not in ("eq", "re"):
+        raise UnsupportedRule(f"modifier {op!r}")
+
+    values = values if isinstance(values, list) else [values]
+    if op == "eq" and values == [None]:
+        return [{"field": field, "op": "absent"}]
+    if any(isinstance(v, (dict, list)) or v is None for v in values):
+        raise UnsupportedRule(f"nested or null values in {key!r}")
+    if op in _COMPARISONS:
+        try:
+            values = [float(v) for v in values]
+        except (TypeError, ValueError):
+            raise UnsupportedRule(f"non-numeric {key!r}")
+    else:
+        values = [_text(v) for v in values]
+    if op == "re":
+        for value in values:
+            try:
+                re.compile(value)
+            except re.error as e:
+                raise UnsupportedRule(f"bad regex in {key!r}: {e}")
+    if require_all:
+        return [{"field": field, "op": op, "values": [v]} for v in values]
+    return [{"field": field, "op": op, "values": values}]
+
+def _normalize_selection(selection):
+    """A selection is a list of alternatives (ORed); each is a list of items (ANDed)."""
+    if isinstance(selection, dict):
+        selection = [selection]
+    if not isinstance(selection, list) or not selection:
+        raise UnsupportedRule("empty or scalar selection")
+    if all(not isinstance(entry, (dict, list)) for entry in selection):
+        # Keyword list: any of the strings anywhere in the log text
+        return [[{"field": CONTENT_FIELD, "op": "contains", "values": [_text(v) for v in selection]}]]
+    alternatives = []
+    for entry in selection:
+        if not isinstance(entry, dict):
+            raise UnsupportedRule("mixed keyword and field selection")
+        items = []
+        for key, values in entry.items():
+            items.extend(_normalize_item(str(key), values))
+        alternatives.append(items)
+    return alternatives
+
+_CONDITION_TOKEN = re.compile(r"\(|\)|[^\s()]+")
+
+def _parse_condition(condition, names):
+    """
+    Parses a Sigma condition (and / or / not, parentheses, `1 of x*`,
+    `all of them`) into nested lists: ["sel", name], ["not", node],
+    ["and", [nodes]], ["or", [nodes]]. Aggregations such as
+    `count(...) > n within 5m` need state across logs and are rejected.
+    """
+    if not isinstance(condition, str):
+        raise UnsupportedRule("condition list")
+    tokens = _CONDITION_TOKEN.findall(condition)
+    pos = 0
+
+    def peek():
+        return tokens[pos].lower() if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or():
+        nodes = [parse_and()]
+        while peek() == "or":
+            take()
+            nodes.append(parse_and())
+        return nodes[0] if len(nodes) == 1 else ["or", nodes]
+
+    def parse_and():
+        nodes = [parse_not()]
+        while peek() == "and":
+            take()
+            nodes.append(parse_not())
+        return nodes[0] if len(nodes) == 1 else ["and", nodes]
+
+    def parse_not():
+        if peek() == "not":
+            take()
+            return ["not", parse_not()]
+        return parse_atom()
+
+    def parse_atom():
+        token = peek()
+        if token is None:
+            raise UnsupportedRule(f"truncated condition {condition!r}")
+        if token == "(":
+            take()
+            node = parse_or()
+            if peek() != ")":
+                raise UnsupportedRule(f"unbalanced condition {condition!r}")
+            take()
+            return node
+        if token in ("1", "all") and pos + 1 < len(tokens) and tokens[pos + 1].lower() == "of":
+            quantifier = take().lower()
+            take()
+            if peek() is None:
+                raise UnsupportedRule(f"truncated condition {condition!r}")
+            target = take()
+            pattern = re.compile(_glob_to_regex("*" if target.lower() == "them" else target))
+            matched = [["sel", n] for n in names if pattern.match(n)]
+            if not matched:
+                raise UnsupportedRule(f"no selection matches {target!r}")
+            return ["or" if quantifier == "1" else "and", matched]
+        name = take()
+        if name not in names:
+            raise UnsupportedRule(f"unsupported condition {condition!r}")
+        return ["sel", name]
+
+    node = parse_or()
+    if pos != len(tokens):
+        raise UnsupportedRule(f"unsupported condition {condition!r}")
+    return node
+
+def _mitre(tags):
+    tactic = technique = None
+    for tag in tags or []:
+        tag = str(tag).lower()
+        if not tag.startswith("attack."):
+            continue
+        name = tag[len("attack."):]
+        if re.fullmatch(r"t\d{4}(\.\d{3})?", name) and technique is None:
+            technique = name.upper()
+        elif name in _MITRE_TACTICS and tactic is None:
+            tactic = name.replace("-", " ").title().replace("And", "and")
+    return tactic, technique
+
+def normalize_rule(doc, source):
+    """
+    Converts one parsed rule document into the cached JSON form. Handles
+    plain Sigma files and the `rule:`-wrapped variant used in parts of
+    pattern/. Raises UnsupportedRule for anything without a stateless
+    Sigma detection block.
+    """
+    if isinstance(doc, dict) and isinstance(doc.get("rule"), dict):
+        doc = doc["rule"]
+    if not isinstance(doc, dict) or not isinstance(doc.get("detection"), dict):
+        raise UnsupportedRule("no Sigma detection block")
+
+    detection = dict(doc["detection"])
+    condition = detection.pop("condition", None)
+    if condition is None:
+        raise UnsupportedRule("no condition")
+    selections = {str(name): _normalize_selection(body) for name, body in detection.items()}
+    tactic, technique = _mitre(doc.get("tags"))
+    return {
+        "id": str(doc.get("id") or source),
+        "title": str(doc.get("title") or doc.get("name") or source),
+        "level": str(doc.get("level") or doc.get("severity") or "medium").lower(),
+        "source": source,
+        "mitre_tactic": tactic,
+        "mitre_technique": technique,
+        "selections": selections,
+        "condition": _parse_condition(condition, list(selections)),
+    }
+
+def _rule_files(rules_dir):
+    files = []
+    for root, dirs, names in os.walk(rules_dir):
+        dirs.sort()
+        files.extend(os.path.join(root, n) for n in sorted(names) if n.endswith((".yml", ".yaml")))
+    return files
+
+def compile_rules(rules_dir):
+    """Parses and normalizes every rule file. Returns (rules, skipped) where skipped lists (source, reason)."""
+    rules, skipped = [], []
+    for path in _rule_files(rules_dir):
+        source = os.path.relpath(path, rules_dir)
+        try:
+            doc = _read_yaml(path)
+            rules.append(normalize_rule(doc, source))
+        except (yaml.YAMLError, UnsupportedRule, OSError, UnicodeDecodeError) as e:
+            skipped.append((source, str(e).splitlines()[0] if str(e) else type(e).__name__))
+    return rules, skipped
+
+def rules_fingerprint(rules_dir):
+    """Changes whenever a rule file is added, removed or modified."""
+    h = hashlib.sha1(f"v{CACHE_VERSION}".encode())
+    for path in _rule_files(rules_dir):
+        st = os.stat(path)
+        h.update(f"{os.path.relpath(path, rules_dir)}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+    return h.hexdigest()
+
+# ---------------------------------------------------------------------------
+# Matching
+# ---------------------------------------------------------------------------
+
+class _FieldIndex:
+    """All items that inspect one log field, evaluated together."""
+
+    def __init__(self):
+        self.equals = {}       # casefolded value -> [item ids]
+        self.signatures = []   # SignatureMatcher input: one category per item
+        self.regexes = []      # (item id, compiled |re pattern)
+        self.comparisons = []  # (item id, op, bound)
+        self.matcher = None
+
+    def add(self, item_id, item):
+        op = item["op"]
+        if op == "eq":
+            patterns = []
+            for value in item["values"]:
+                if "*" in value or "?" in value:
+                    patterns.append(_glob_to_regex(value))
+                else:
+                    self.equals.setdefault(value.casefold(), []).append(item_id)
+            if patterns:
+                self.signatures.append({"category": item_id, "ignore_case": True, "patterns": patterns})
+        elif op in _STRING_MODIFIERS:
+            escaped = [re.escape(v) for v in item["values"]]
+            if op == "startswith":
+                escaped = ["^" + v for v in escaped]
+            elif op == "endswith":
+                escaped = [v + r"\Z" for v in escaped]
+            self.signatures.append({"category": item_id, "ignore_case": True, "patterns": escaped})
+        elif op == "re":
+            for value in item["values"]:
+                self.regexes.append((item_id, re.compile(value)))
+        else:
+            for value in item["values"]:
+                self.comparisons.append((item_id, _COMPARISONS[op], value))
+
+    def finish(self):
+        if self.signatures:
+            self.matcher = SignatureMatcher(self.signatures)
+
+    def collect(self, value, hits):
+        text = value if type(value) is str else _text(value)
+        if self.equals:
+            ids = self.equals.get(text.casefold())
+            if ids:
+                hits.update(ids)
+        if self.matcher is not None:
+            hits.update(self.matcher.scan(text))
+        for item_id, pattern in self.regexes:
+            if item_id not in hits and pattern.search(text):
+                hits.add(item_id)
+        if self.comparisons:
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                return
+            for item_id, compare, bound in self.comparisons:
+                if compare(number, bound):
+                    hits.add(item_id)
+
+def _has_not(node):
+    if node[0] == "not":
+        return True
+    return node[0] in ("and", "or") and any(_has_not(n) for n in node[1])
+
+class RulePack:
+    """
+    Executable form of a set of normalized rules. Every item of every rule
+    is indexed by the field it inspects, so one pass over the indexed fields
+    of a log (one combined scan per field) yields all satisfied items; only
+    rules with a satisfied item then have their condition evaluated.
+    """
+
+    def __init__(self, rules, skipped=()):
+        self.rules = rules
+        self.skipped = list(skipped)
+        self._fields = {}
+        self._item_rules = {}
+        self._always = []
+        self._compiled = []
+        self.absence_fields = set()
+        for index, rule in enumerate(rules):
+            selections = {}
+            for name, alternatives in rule["selections"].items():
+                compiled = []
+                for items in alternatives:
+                    positive, absent = [], []
+                    for item in items:
+                        if item["op"] == "absent":
+                            absent.append(item["field"])
+                            self.absence_fields.add(item["field"])
+                            continue
+                        item_id = f"i{len(self._item_rules)}"
+                        self._item_rules[item_id] = index
+                        self._fields.setdefault(item["field"], _FieldIndex()).add(item_id, item)
+                        positive.append(item_id)
+                    compiled.append((positive, absent))
+                selections[name] = compiled
+            self._compiled.append(selections)
+            if self._fires_without_hits(rule["condition"], selections):
+                self._always.append(index)
+        for field_index in self._fields.values():
+            field_index.finish()
+        self._content_index = self._fields.pop(CONTENT_FIELD, None)
+
+    def _fires_without_hits(self, condition, selections):
+        """
+        Whether the condition can hold while none of the rule's items matched
+        (through NOT or absence checks); such rules are evaluated for every log.
+        """
+        fields = sorted({f for alts in selections.values() for _, absent in alts for f in absent})
+        if len(fields) > 8:
+            return True
+        for present in itertools.product((False, True), repeat=len(fields)):
+            log = {f: "x" for f, is_present in zip(fields, present) if is_present}
+            if self._evaluate(condition, selections, set(), log):
+                return True
+        return False
+
+    def _selection(self, selection, hits, log):
+        for positive, absent in selection:
+            if all(item in hits for item in positive) and all(log.get(f) in (None, "") for f in absent):
+                return True
+        return False
+
+    def _evaluate(self, node, selections, hits, log):
+        kind = node[0]
+        if kind == "sel":
+            return self._selection(selections[node[1]], hits, log)
+        if kind == "not":
+            return not self._evaluate(node[1], selections, hits, log)
+        if kind == "and":
+            return all(self._evaluate(n, selections, hits, log) for n in node[1])
+        return any(self._evaluate(n, selections, hits, log) for n in node[1])
+
+    @property
+    def fields(self):
+        """Log fields inspected by at least one rule (the keyword pseudo field excluded)."""
+        return list(self._fields)
+
+    @property
+    def uses_content(self):
+        return self._content_index is not None
+
+    @property
+    def needs_every_log(self):
+        """True when some rule can fire without any item matching (see evaluate)."""
+        return bool(self._always)
+
+    def value_hits(self, field, value, hits=None):
+        """Adds the items satisfied by one value of `field` to `hits` (a set) and returns it."""
+        hits = set() if hits is None else hits
+        field_index = self._content_index if field == CONTENT_FIELD else self._fields.get(field)
+        if field_index is not None and value is not None and value != "":
+            field_index.collect(value, hits)
+        return hits
+
+    def evaluate(self, hits, log_entry):
+        """
+        Rules whose condition holds, given the satisfied items of a log. The
+        result depends only on `hits` and on which of absence_fields the log
+        leaves empty (read through log_entry.get).
+        """
+        if not hits and not self._always:
+            return []
+        candidates = set(self._always)
+        candidates.update(self._item_rules[item] for item in hits)
+        return [self.rules[i] for i in sorted(candidates)
+                if self._evaluate(self.rules[i]["condition"], self._compiled[i], hits, log_entry)]
+
+    def match(self, log_entry, content=None):
+        """Returns the rules matching one normalized log entry, in rule order."""
+        hits = set()
+        fields = self._fields
+        for field in fields.keys() & log_entry.keys():
+            value = log_entry[field]
+            if value is not None and value != "":
+                fields[field].collect(value, hits)
+        if self._content_index is not None:
+            if content is None:
+                content = str(log_entry.get('msg', '')) + " " + str(log_entry.get('raw_log', ''))
+            self._content_index.collect(content, hits)
+        return self.evaluate(hits, log_entry)
+
+def rule_alert(rule):
+    """Alert dictionary for a matched rule, in the shape the other detectors return."""
+    return {
+        "type": rule["title"],
+        "severity": rule["level"],
+        "indicators": f"Sigma rule {rule['id']} ({rule['source']})",
+        "rule_id": rule["id"],
+        "mitre_tactic": rule["mitre_tactic"],
+        "mitre_technique": rule["mitre_technique"],
+    }
+
+def load_rule_pack(rules_dir=None, cache_path=None):
+    """
+    Loads the rule pack for `rules_dir`, from the JSON cache when it matches
+    the current rule files and by parsing the YAML (then refreshing the
+    cache) otherwise.
+    """
+    rules_dir = rules_dir or Config.SIGMA_RULES_DIR
+    cache_path = cache_path or Config.SIGMA_CACHE_PATH
+    fingerprint = rules_fingerprint(rules_dir)
+
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get("fingerprint") == fingerprint:
+            return RulePack(cached["rules"], cached["skipped"])
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+
+    rules, skipped = compile_rules(rules_dir)
+    print(f"[*] Compiled {len(rules)} Sigma rules from {rules_dir} ({len(skipped)} files skipped).")
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": fingerprint, "rules": rules, "skipped": skipped}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[!] Could not write Sigma rule cache {cache_path}: {e}")
+    return RulePack(rules, skipped)
+
+_packs = {}
+
+def get_rule_pack(rules_dir=None):
+    """Per-process rule pack, loaded on first use."""
+    rules_dir = rules_dir or Config.SIGMA_RULES_DIR
+    pack = _packs.get(rules_dir)
+    if pack is None:
+        pack = _packs[rules_dir] = load_rule_pack(rules_dir)
+    return pack
+
+def detect_sigma_rules(log_entry, content=None, rules_dir=None):
+    """Runs the compiled pattern/ rule pack against one log entry."""
+    return [rule_alert(rule) for rule in get_rule_pack(rules_dir).match(log_entry, content)]
@@ -0,0 +1,164 @@
+import re
+
+# Web attack signatures checked against each log's msg + raw_log, in alert order.
+# Patterns must not contain capturing groups (each category is one named group).
+WEB_SIGNATURES = [
+    {
+        # detecting: select *, drop table, union select, truncate table, delete from
+        "category": "sqli",
+        "ignore_case": True,
+        "patterns": [r"select\s+\*", r"drop\s+table", r"union\s+select", r"truncate\s+table", r"delete\s+from"],
+        "alert": {
+            "type": "SQL Injection Attempt",
+            "severity": "high",
+            "mitre_tactic": "Initial Access",
+            "mitre_technique": "T1190",
+            "indicators": "Suspicious SQL patterns detected (Regex Match)"
+        },
+    },
+    {
+        # detecting: <script>, alert(...), onerror=, onload=, and URL encoded variants (%3Cscript)
+        "category": "xss",
+        "ignore_case": True,
+        "patterns": [r"<script", r"%3Cscript", r"alert\s*\(", r"on\w+\s*=", r"javascript:"],
+        "alert": {
+            "type": "Cross-Site Scripting (XSS)",
+            "severity": "medium",
+            "mitre_tactic": "Initial Access",
+            "mitre_technique": "T1190",
+            "indicators": "XSS payload detected (Regex Match)"
+        },
+    },
+    {
+        "category": "traversal",
+        "ignore_case": False,
+        "patterns": [r"\.\.[/|\\]", re.escape("/etc/passwd")],
+        "alert": {
+            "type": "Directory Traversal",
+            "severity": "high",
+            "mitre_tactic": "Initial Access",
+            "mitre_technique": "T1190",
+            "indicators": "Path traversal sequence detected"
+        },
+    },
+]
+
+# Leading run of literal characters (plain or backslash-escaped punctuation)
+_LITERAL_PREFIX = re.compile(r"(?:[\w<%:/=-]|\\[^\w\s])*")
+_CHARACTER_CLASS = re.compile(r"\[(?:\\.|[^\]])*\]")
+
+# Non-ASCII characters re.IGNORECASE treats as equal to an ASCII letter
+# (besides the Turkish i's, which never start a casefolded literal)
+_CASE_VARIANTS = {"k": "\u212a", "s": "\u017f"}
+
+def _required_literal(pattern, ignore_case):
+    """
+    A literal every match of `pattern` must contain, for the prefilter, or ''
+    when none can be derived safely. Case-insensitive literals are casefolded
+    and reduced to their longest run without an 'i': re.IGNORECASE also
+    matches the Turkish dotted and dotless i there, which casefold() does not
+    map to 'i'.
+    """
+    if "|" in _CHARACTER_CLASS.sub("", pattern):
+        return ""
+    if pattern.startswith("^"):
+        pattern = pattern[1:]
+    prefix = _LITERAL_PREFIX.match(pattern).group()
+    if prefix and pattern[len(prefix):len(prefix) + 1] in ("*", "?", "{"):
+        # The last character is optional
+        prefix = prefix[:-2] if prefix[-2:-1] == "\\" else prefix[:-1]
+    literal = re.sub(r"\\(.)", r"\1", prefix)
+    if ignore_case:
+        literal = max(literal.casefold().split("i"), key=len)
+    return literal
+
+class SignatureMatcher:
+    """
+    Matches every signature category in one left-to-right scan.
+
+    A literal prefilter first drops the patterns whose required literal (e.g.
+    "select", "<scr") does not occur in the content; those substring tests run
+    at C speed over the casefolded content. The remaining patterns are
+    compiled into a single alternation with one named group per category
+    (cached per candidate set). Once a category has matched, the scan
+    continues from that match's start with the other categories only, so
+    each category is reported if it matches anywhere in the content.
+    """
+
+    def __init__(self, signatures):
+        self.categories = [sig["category"] for sig in signatures]
+        # (category, branch regex, required literal, literal is casefolded)
+        self._patterns = []
+        for sig in signatures:
+            ignore_case = bool(sig.get("ignore_case"))
+            for pattern in sig["patterns"]:
+                branch = f"(?i:{pattern})" if ignore_case else pattern
+                self._patterns.append((sig["category"], branch, _required_literal(pattern, ignore_case), ignore_case))
+        self._compiled = {}
+
+    def _pattern_for(self, candidates):
+        pattern = self._compiled.get(candidates)
+        if pattern is None:
+            # Categories keep definition order, which decides ties at the same offset
+            branches = {}
+            for i in candidates:
+                category, branch = self._patterns[i][:2]
+                branches.setdefault(category, []).append(branch)
+            pattern = "|".join(f"(?P<{c}>{'|'.join(b)})" for c, b in branches.items())
+            first = self._first_characters(candidates)
+            if first:
+                # Cheap guard so the alternation is only tried where a literal starts
+                pattern = f"(?=[{re.escape(first)}])(?:{pattern})"
+            pattern = re.compile(pattern)
+            self._compiled[candidates] = pattern
+        return pattern
+
+    def _first_characters(self, candidates):
+        """Every character a match of the candidates can start with, or '' if unknown."""
+        chars = set()
+        for i in candidates:
+            _, _, literal, casefolded = self._patterns[i]
+            if not literal or not literal[0].isascii():
+                return ""
+            first = literal[0]
+            chars.add(first)
+            if casefolded:
+                chars.add(first.upper())
+                chars.update(_CASE_VARIANTS.get(first, ""))
+        return "".join(sorted(chars))
+
+    def scan(self, content):
+        """Returns the categories matching `content`, in definition order."""
+        folded = None
+        candidates = []
+        for i, (_, _, literal, casefolded) in enumerate(self._patterns):
+            if literal:
+                if casefolded:
+                    if folded is None:
+                        folded = content.casefold()
+                    if literal not in folded:
+                        continue
+                elif literal not in content:
+                    continue
+            candidates.append(i)
+
+        found = set()
+        start = 0
+        while candidates:
+            match = self._pattern_for(tuple(candidates)).search(content, start)
+            if match is None:
+                break
+            found.add(match.lastgroup)
+            candidates = [i for i in candidates if self._patterns[i][0] != match.lastgroup]
+            start = match.start()
+        return [c for c in self.categories if c in found]
+
+_web_matcher = SignatureMatcher(WEB_SIGNATURES)
+_web_alerts = {sig["category"]: sig["alert"] for sig in WEB_SIGNATURES}
+
+def detect_web_attacks(content):
+    """
+    Scans log content for SQL injection, XSS and path traversal signatures.
+    Returns one alert dictionary per matching category.
+    """
+    return [dict(_web_alerts[category]) for category in _web_matcher.scan(content)]
@@ -1,3 +1,11 @@
+from collections import OrderedDict
+from detection.beacon import epoch_seconds
+
+# IoT Device Types often targeted or used as jump hosts
+SUSPICIOUS_IOT_TYPES = ['camera', 'dvr', 'nvr', 'printer', 'router', 'thermostat']
+
+AUTH_FAILURE = "SSH Authentication Failure"
+
 def detect_ssh_abuse(log_entry, config=None):
     """
     Analyzes a single log entry for SSH abuse from IoT devices.
@@ -6,9 +14,6 @@ def detect_ssh_abuse(log_entry, config=None):
     if config is None:
         config = {"check_iot_types": True, "fail_threshold_enabled": True}
     
-    # IoT Device Types often targeted or used as jump hosts
-    SUSPICIOUS_IOT_TYPES = ['camera', 'dvr', 'nvr', 'printer', 'router', 'thermostat']
-    
     device_type = str(log_entry.get('device_type', '')).lower()
     protocol = str(log_entry.get('protocol', '')).lower()
     action = str(log_entry.get('action', '')).lower()
@@ -28,12 +33,12 @@ def detect_ssh_abuse(log_entry, config=None):
     # Check 2: Failed Login Attempts
     if config.get("fail_threshold_enabled", True):
         if 'fail' in action or action == 'deny':
-             detections.append("SSH Authentication Failure")
+             detections.append(AUTH_FAILURE)
 
     if detections:
         # Determine severity
         severity = "Medium"
-        if "Authentication Failure" in detections and len(detections) > 1:
+        if AUTH_FAILURE in detections and len(detections) > 1:
             severity = "High" # IoT device failing auth is very suspicious
             
         return {
@@ -47,3 +52,141 @@ def detect_ssh_abuse(log_entry, config=None):
         }
 
     return None
+
+def split_ssh_alert(alert):
+    """
+    Splits a detect_ssh_abuse alert into (exposure, failure). The IoT exposure
+    part stands on its own for a single log; an authentication failure only
+    counts as part of a burst, so `failure` (the whole alert) is what goes to
+    SSHBruteForceTracker. Either may be None.
+    """
+    indicators = alert.get('indicators', [])
+    if AUTH_FAILURE not in indicators:
+        return alert, None
+    exposure = [i for i in indicators if i != AUTH_FAILURE]
+    if not exposure:
+        return None, alert
+    return dict(alert, indicators=exposure, severity="Medium"), alert
+
+# Burst counting defaults, overridden by detection_rules.ssh in config.json
+BRUTEFORCE_DEFAULTS = {"bruteforce_enabled": True, "bruteforce_threshold": 10, "bruteforce_window": 60.0, "bruteforce_max_pairs": 50000}
+
+# Window resolution and the severity of each escalation level
+_WINDOW_BUCKETS = 6
+_LEVEL_SEVERITY = {1: "Medium", 2: "High", 3: "Critical"}
+_SEVERITY_RANK = {"Low": 0, "Medium": 1, "High": 2, "Critical": 3}
+
+class _PairWindow:
+    """Ring of per-bucket attempt counts for one src -> dst pair, plus its burst state."""
+    __slots__ = ("counts", "newest", "last", "attempts", "level", "indicators", "severity")
+
+    def __init__(self, bucket, now):
+        self.counts = [0] * _WINDOW_BUCKETS
+        self.newest = bucket
+        self.last = now
+        self.attempts = 0
+        self.level = 0
+        self.indicators = []
+        self.severity = "Low"
+
+    def advance(self, bucket):
+        """Moves the ring to `bucket`; returns False if the whole window was idle (burst over)."""
+        gap = bucket - self.newest
+        if gap <= 0:
+            return True
+        if gap >= _WINDOW_BUCKETS:
+            self.counts = [0] * _WINDOW_BUCKETS
+            self.newest = bucket
+            return False
+        for b in range(self.newest + 1, bucket + 1):
+            self.counts[b % _WINDOW_BUCKETS] = 0
+        self.newest = bucket
+        return True
+
+class SSHBruteForceTracker:
+    """
+    Folds the per-log SSH authentication failures of each src_ip -> dst_ip
+    pair into bursts. Attempts are counted over a sliding window of bruteforce_window
+    seconds (a ring of time buckets per pair). The first alert of a burst is
+    raised when the window holds bruteforce_threshold attempts, and it
+    escalates at 10x and 100x that many attempts; nothing else is emitted
+    until the pair has been quiet for a whole window. Pairs idle for longer
+    than the window are dropped, and at most bruteforce_max_pairs are kept.
+    """
+
+    def __init__(self):
+        self.pairs = OrderedDict()
+        self.evicted = 0
+
+    def observe(self, log_entry, alert, config=None):
+        """
+        Feeds one per-log SSH alert. Returns the alert to emit for this log:
+        a "SSH Brute Force" burst alert, None, or `alert` itself when the log
+        has no usable timestamp.
+        """
+        config = BRUTEFORCE_DEFAULTS if config is None else config
+        now = epoch_seconds(log_entry.get('timestamp'))
+        if now is None:
+            return alert
+        window = max(float(config.get("bruteforce_window", BRUTEFORCE_DEFAULTS["bruteforce_window"])), 1e-3)
+        bucket = int(now // (window / _WINDOW_BUCKETS))
+        key = (log_entry.get('src_ip'), log_entry.get('dst_ip'))
+
+        pairs = self.pairs
+        pair = pairs.get(key)
+        if pair is None:
+            pair = pairs[key] = _PairWindow(bucket, now)
+        else:
+            pairs.move_to_end(key)
+            if not pair.advance(bucket):
+                pair.attempts = pair.level = 0
+                pair.indicators = []
+                pair.severity = "Low"
+        pair.last = max(pair.last, now)
+        self._evict(now, window, config)
+
+        if bucket <= pair.newest - _WINDOW_BUCKETS:
+            # Older than the window
+            return None
+        pair.counts[bucket % _WINDOW_BUCKETS] += 1
+        pair.attempts += 1
+        for indicator in alert.get('indicators', []):
+            if indicator not in pair.indicators:
+                pair.indicators.append(indicator)
+        if _SEVERITY_RANK.get(alert.get('severity'), 0) > _SEVERITY_RANK[pair.severity]:
+            pair.severity = alert['severity']
+        return self._check(key, pair, alert, config)
+
+    def _evict(self, now, window, config):
+        pairs = self.pairs
+        max_pairs = config.get("bruteforce_max_pairs", BRUTEFORCE_DEFAULTS["bruteforce_max_pairs"])
+        while pairs and (len(pairs) > max_pairs or next(iter(pairs.values())).last < now - window):
+            pairs.popitem(last=False)
+            self.evicted += 1
+
+    def _check(self, key, pair, alert, config):
+        threshold = max(1, int(config.get("bruteforce_threshold", BRUTEFORCE_DEFAULTS["bruteforce_threshold"])))
+        if pair.level >= len(_LEVEL_SEVERITY):
+            return None
+        if pair.level == 0:
+            if sum(pair.counts) < threshold:
+                return None
+        elif pair.attempts < threshold * 10 ** pair.level:
+            return None
+        pair.level += 1
+
+        severity = _LEVEL_SEVERITY[pair.level]
+        if _SEVERITY_RANK[pair.severity] > _SEVERITY_RANK[severity]:
+            severity = pair.severity
+        src, dst = key
+        return {
+            "type": "SSH Brute Force",
+            "severity": severity,
+            "indicators": [f"{pair.attempts} suspicious SSH attempts {src} -> {dst} (level {pair.level})"] + pair.indicators,
+            "src_ip": src,
+            "dst_ip": dst,
+            "attempts": pair.attempts,
+            "device_type": alert.get('device_type'),
+            "mitre_tactic": "Credential Access (TA0006)",
+            "mitre_technique": "Brute Force (T1110)"
+        }
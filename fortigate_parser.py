@@ -0,0 +1,46 @@
+import re
+
+# FortiGate field names -> internal schema (see ALLOWED_COLS in ingest_logs.py).
+# Fields without an entry keep their FortiGate name.
+FIELD_MAP = {
+    "srcip": "src_ip",
+    "dstip": "dst_ip",
+    "srcport": "src_port",
+    "dstport": "dst_port",
+    "proto": "protocol",
+    "type": "log_type",
+    "srccountry": "src_country",
+    "dstcountry": "dst_country",
+    "devtype": "device_type",
+    "srcname": "hostname",
+    "srcmac": "mac_address",
+    "osname": "os",
+    "osversion": "os_version",
+    "agent": "user_agent",
+    "method": "http_method",
+    "qtype": "query_type",
+    "attack": "alert_name",
+}
+
+# One key=value pair. A quoted value only ends at a quote followed by the next
+# key or the end of the line, so values holding unescaped quotes (e.g. the JSON
+# raw_log written by FortiLogBuilder.format_kv_string) stay in one piece. The
+# quoted branch is an unrolled loop, scanning runs of non-quote characters
+# without backtracking.
+_KV_TOKEN = re.compile(r'(\w+)=(?:"([^"]*(?:"(?!\s+\w+=|\s*$)[^"]*)*)"|(\S*))')
+
+def parse_kv_line(line):
+    """
+    Tokenizes one FortiGate key=value log line in a single regex pass and
+    maps vendor field names onto the internal schema. All values are strings.
+    A field already given under its internal name wins over the vendor alias.
+    """
+    raw = {}
+    for key, quoted, bare in _KV_TOKEN.findall(line):
+        value = bare or quoted
+        internal = FIELD_MAP.get(key)
+        if internal is None:
+            raw[key] = value
+        elif internal not in raw:
+            raw[internal] = value
+    return raw
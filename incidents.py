@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from config import Config
+from detection.domains import parse_domain
+
+INCIDENT_TABLE = """
+CREATE TABLE IF NOT EXISTS incidents (
+    incident_id INT AUTO_INCREMENT PRIMARY KEY,
+    detection_type VARCHAR(100) NOT NULL,
+    src_ip VARCHAR(45) NOT NULL,
+    target VARCHAR(255) NOT NULL DEFAULT '',
+    window_start DATETIME NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    device VARCHAR(100),
+    mitre_tactic VARCHAR(100),
+    mitre_technique VARCHAR(100),
+    alert_count INT NOT NULL DEFAULT 0,
+    first_seen DATETIME NOT NULL,
+    last_seen DATETIME NOT NULL,
+    sample_log_ids VARCHAR(255),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE (detection_type, src_ip, target, window_start)
+)
+"""
+
+_SEVERITY_RANK = {"low": 1, "medium": 2, "high": 3, "critical": 4}
+
+def _severity_rank_sql(expr):
+    cases = " ".join(f"WHEN '{name}' THEN {rank}" for name, rank in _SEVERITY_RANK.items())
+    return f"(CASE LOWER({expr}) {cases} ELSE 0 END)"
+
+def _id_count_sql(expr):
+    return f"(LENGTH({expr}) - LENGTH(REPLACE({expr}, ',', '')))"
+
+# Writes are deltas: a window flushed in several pieces (commits, eviction, reruns) adds up.
+# The stored severity only ever rises, and the longer sample list wins: an aggregator's
+# list for an incident only grows, so samples are never replaced by fewer.
+INCIDENT_SQL = (
+    "INSERT INTO incidents (detection_type, src_ip, target, window_start, severity, device, mitre_tactic, mitre_technique, "
+    "alert_count, first_seen, last_seen, sample_log_ids) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE "
+    f"severity = CASE WHEN {_severity_rank_sql('VALUES(severity)')} > {_severity_rank_sql('severity')} "
+    "THEN VALUES(severity) ELSE severity END, "
+    "alert_count = alert_count + VALUES(alert_count), "
+    "first_seen = LEAST(first_seen, VALUES(first_seen)), last_seen = GREATEST(last_seen, VALUES(last_seen)), "
+    "sample_log_ids = CASE WHEN sample_log_ids IS NULL "
+    f"OR {_id_count_sql('VALUES(sample_log_ids)')} > {_id_count_sql('sample_log_ids')} "
+    "THEN VALUES(sample_log_ids) ELSE sample_log_ids END"
+)
+_EPOCH = datetime(1970, 1, 1)
+
+# Log id ranges whose alerts are counted in `incidents`. Writers record them in the
+# same transaction as the counts, so re-detection can tell which logs are already in.
+COUNTED_TABLE = """
+CREATE TABLE IF NOT EXISTS incident_counted_logs (
+    first_log_id INT NOT NULL,
+    last_log_id INT NOT NULL,
+    PRIMARY KEY (first_log_id, last_log_id)
+)
+"""
+
+COUNTED_SQL = "INSERT IGNORE INTO incident_counted_logs (first_log_id, last_log_id) VALUES (%s, %s)"
+
+def ensure_incident_table(storage, cursor):
+    cursor.execute(INCIDENT_TABLE)
+    storage.ensure_index(cursor, "incidents", "idx_incidents_last_seen", ["last_seen"])
+    cursor.execute(COUNTED_TABLE)
+    storage.ensure_index(cursor, "incident_counted_logs", "idx_counted_last_log_id", ["last_log_id"])
+
+def counted_log_ids(cursor, first_id, last_id):
+    """Ids from first_id to last_id whose alerts are already counted in `incidents`."""
+    cursor.execute(
+        "SELECT first_log_id, last_log_id FROM incident_counted_logs WHERE last_log_id >= %s AND first_log_id <= %s",
+        (first_id, last_id)
+    )
+    ids = set()
+    for first, last in cursor.fetchall():
+        ids.update(range(max(first, first_id), min(last, last_id) + 1))
+    return ids
+
+def incident_target(log):
+    """What an incident is about besides its source: the queried parent domain, else dst_ip."""
+    parts = parse_domain(log.get('qname'))
+    if parts:
+        return parts.registered_domain or parts.name
+    return str(log.get('dst_ip') or '')
+
+def _as_datetime(timestamp):
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return None
+    if not isinstance(timestamp, datetime):
+        return None
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+class _Incident:
+    __slots__ = ("detection_type", "src_ip", "target", "window_start", "severity", "device", "mitre_tactic",
+                 "mitre_technique", "first_seen", "last_seen", "pending", "samples")
+
+    def __init__(self, key, alert, seen):
+        self.detection_type, self.src_ip, self.target, self.window_start = key
+        self.severity = alert['severity']
+        self.device = alert.get('device')
+        self.mitre_tactic = alert.get('mitre_tactic')
+        self.mitre_technique = alert.get('mitre_technique')
+        self.first_seen = self.last_seen = seen
+        self.pending = 0 # alerts not written yet
+        self.samples = []
+
+    def row(self):
+        return (self.detection_type, self.src_ip, self.target, self.window_start, self.severity, self.device,
+                self.mitre_tactic, self.mitre_technique, self.pending, self.first_seen, self.last_seen,
+                ",".join(str(i) for i in self.samples) or None)
+
+class IncidentAggregator:
+    """
+    Collapses alerts into incidents keyed by (detection_type, src_ip, target)
+    per tumbling time window of `window` seconds (log time). An incident keeps
+    its alert count, first / last seen, the highest severity and the first
+    `sample_ids` alert log ids, so a flood of identical detections costs one
+    incidents row per window instead of one alerts row each.
+
+    drain() returns a row for every incident that changed since the last
+    drain, carrying only the new alerts in its count; INCIDENT_SQL adds them
+    up, so the writer can drain on every commit and the table always matches
+    the committed logs. Windows that ended before the newest log seen are then
+    forgotten, and beyond `max_open` incidents the oldest is written early.
+
+    Writers also pass every log they counted (alerts or not) to count_logs();
+    write() stores those ids as ranges in `incident_counted_logs` together
+    with the incident rows.
+    """
+
+    def __init__(self, window=None, sample_ids=None, max_open=None):
+        self.window = max(1, int(window or Config.INCIDENT_WINDOW))
+        self.sample_ids = Config.INCIDENT_SAMPLE_IDS if sample_ids is None else sample_ids
+        self.max_open = max(1, max_open or Config.INCIDENT_MAX_OPEN)
+        self.open = OrderedDict()
+        self.watermark = None
+        self._evicted = []
+        self._counted = [] # [first_log_id, last_log_id] ranges not written yet
+
+    def add(self, alert, target, log_id=None):
+        """Counts one alert (a format_alert_object dictionary) against its incident."""
+        seen = _as_datetime(alert.get('timestamp'))
+        if seen is None:
+            # Untimed alerts land in the window of the newest log seen
+            seen = self.watermark or datetime.now().replace(microsecond=0)
+        elif self.watermark is None or seen > self.watermark:
+            self.watermark = seen
+
+        offset = int((seen - _EPOCH).total_seconds()) // self.window * self.window
+        key = (alert['detection_type'], str(alert.get('src_ip') or 'unknown'), target or '', _EPOCH + timedelta(seconds=offset))
+        incident = self.open.get(key)
+        if incident is None:
+            incident = self.open[key] = _Incident(key, alert, seen)
+            while len(self.open) > self.max_open:
+                _, oldest = self.open.popitem(last=False)
+                if oldest.pending:
+                    self._evicted.append(oldest.row())
+        else:
+            incident.first_seen = min(incident.first_seen, seen)
+            incident.last_seen = max(incident.last_seen, seen)
+            if _SEVERITY_RANK.get(str(alert['severity']).lower(), 0) > _SEVERITY_RANK.get(str(incident.severity).lower(), 0):
+                incident.severity = alert['severity']
+        incident.pending += 1
+        if log_id is not None and len(incident.samples) < self.sample_ids:
+            incident.samples.append(log_id)
+
+    def count_logs(self, first_id, last_id=None):
+        """Marks logs first_id..last_id (default: just first_id) as counted; adjacent ranges merge."""
+        last_id = first_id if last_id is None else last_id
+        if self._counted and self._counted[-1][1] + 1 == first_id:
+            self._counted[-1][1] = last_id
+        else:
+            self._counted.append([first_id, last_id])
+
+    def drain(self):
+        """Rows for INCIDENT_SQL covering every alert added since the last drain."""
+        rows, self._evicted = self._evicted, []
+        closed = []
+        for key, incident in self.open.items():
+            if incident.pending:
+                rows.append(incident.row())
+                incident.pending = 0
+            if self.watermark is not None and incident.window_start + timedelta(seconds=self.window) <= self.watermark:
+                closed.append(key)
+        for key in closed:
+            del self.open[key]
+        return rows
+
+    def write(self, cursor):
+        """Writes drain() with INCIDENT_SQL and the counted log ranges. Returns the incident rows written."""
+        rows = self.drain()
+        if rows:
+            cursor.executemany(INCIDENT_SQL, rows)
+        counted, self._counted = self._counted, []
+        if counted:
+            cursor.executemany(COUNTED_SQL, [tuple(r) for r in counted])
+        return len(rows)
@@ -1,98 +1,525 @@
 import os
 import json
+import argparse
+import multiprocessing
+from collections import deque, namedtuple
+from datetime import datetime
 from ingestor import LogIngestor
-from detection.engine import run_detection_pipeline, format_alert_object
-from api.db import get_db_connection
-import mysql.connector # Added for mysql.connector.Error
+from detection.engine import run_detection_pipeline, run_stateful_detection, format_alert_object, StreamState
+from storage import get_storage, use_storage, SQLiteStorage
+from checkpoint import IngestCheckpoint, batch_hash
+from incidents import IncidentAggregator, ensure_incident_table, incident_target
+from log_follower import LogFollower
+from config import Config
 
-def ingest_direct(file_path):
+# Columns of the `logs` table that normalized logs may populate
+# Updated to handle Super-Set of 8+ Domains
+ALLOWED_COLS = [
+    "timestamp", "src_ip", "dst_ip", "src_port", "dst_port", "protocol", "service", "action",
+    "policyid", "sentbyte", "rcvdbyte", "duration", "user", "device_type", "level", "logid",
+    "qname", "raw_log", "msg", "src_country", "dst_country", "log_type", "host", "direction",
+    "auth_type", "auth_result", "failure_reason", "location", "process_name", "process_id",
+    "parent_process", "command_line", "file_path", "hash", "integrity_level",
+    "http_method", "url", "status_code", "user_agent", "request_size", "response_size", "session_id",
+    "client_ip", "asset_id", "hostname", "mac_address", "os", "os_version", "role", "criticality", "last_seen",
+    "alert_name", "detection_engine", "action_taken", "confidence", "query", "query_type", "response", "rcode",
+    "ttl", "resolver", "cloud_provider", "account_id", "api_call", "resource", "region", "result", "ip_address"
+]
+ALLOWED_COL_SET = frozenset(ALLOWED_COLS)
+
+# Column types of `logs` as declared in schema.sql / update_schema_domains.sql.
+# Used when the live schema cannot be read; other columns pass through as-is.
+DEFAULT_LOG_COLUMN_TYPES = {
+    "timestamp": "datetime", "last_seen": "datetime",
+    "src_port": "int", "dst_port": "int", "policyid": "int", "sentbyte": "bigint", "rcvdbyte": "bigint",
+    "status_code": "int", "request_size": "int", "response_size": "int", "ttl": "int",
+}
+
+def _to_int(value):
+    # Empty strings and junk become NULL instead of failing the whole batch
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+COERCERS = {
+    "tinyint": _to_int, "smallint": _to_int, "mediumint": _to_int, "int": _to_int, "integer": _to_int, "bigint": _to_int,
+    "datetime": _to_datetime, "timestamp": _to_datetime,
+}
+
+# sql: prepared INSERT text, columns: projected column order,
+# coercions: (index, coercer) pairs for the typed columns only
+InsertPlan = namedtuple("InsertPlan", ["sql", "columns", "coercions"])
+
+# Alerts are unique per (raw_log_reference, detection_type); re-detecting a log updates its alert
+ALERT_SQL = (
+    "INSERT INTO alerts (severity, detection_type, src_ip, device, timestamp, raw_log_reference, mitre_tactic, mitre_technique) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE severity = VALUES(severity), src_ip = VALUES(src_ip), device = VALUES(device), "
+    "timestamp = VALUES(timestamp), mitre_tactic = VALUES(mitre_tactic), mitre_technique = VALUES(mitre_technique)"
+)
+
+def alert_row(alert_data):
+    """ALERT_SQL parameters for a format_alert_object dictionary."""
+    return (alert_data['severity'], alert_data['detection_type'], alert_data['src_ip'], alert_data['device'], alert_data['timestamp'], alert_data['raw_log_reference'], alert_data['mitre_tactic'], alert_data['mitre_technique'])
+
+class LogBatchWriter:
+    """
+    Buffers normalized logs with their detections and writes them in batches.
+
+    Logs sharing the same column set go out as one executemany() call, which
+    mysql.connector rewrites into a single multi-row INSERT. Each batch runs
+    inside its own savepoint, so a failing batch is rolled back on its own
+    while earlier batches survive. The transaction is committed every
+    `commit_interval` batches.
+
+    INSERT text, column order and type coercers are cached per column
+    signature, so each log only costs a dict lookup and a tuple build.
+
+    With a checkpoint, every batch also records its content hash (already
+    seen batches are skipped) and advances the file watermark inside the
+    same savepoint.
+
+    The writer sees every log in arrival order, so it also runs the stateful
+    detectors (beaconing, subdomain volume, SSH bursts) through add(); callers of write_rows feed them with
+    detect_stateful() in input order first.
+
+    Alerts of written batches are collapsed into `incidents` (see
+    IncidentAggregator), whose changes and the ids of the logs they cover go
+    out with every commit. One alerts row per detection is only written with
+    Config.STORE_ALERT_ROWS.
+
+    `conn` comes from the storage backend (`storage.get_storage().connect()`);
+    SQL is written in the MySQL dialect and translated by the SQLite backend.
+    """
+
+    def __init__(self, conn, batch_size=1000, commit_interval=10, column_types=None, checkpoint=None, storage=None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.storage = storage or get_storage()
+        self.batch_size = max(1, batch_size)
+        self.commit_interval = max(1, commit_interval)
+
+        # Insert plans keyed by the frozen set of a log's keys
+        self._plans = {}
+        self._plans_by_cols = {}
+        self.table_cols = None
+        if column_types is None:
+            try:
+                self.storage.ensure_columns(self.cursor, "logs", ALLOWED_COLS, DEFAULT_LOG_COLUMN_TYPES)
+                column_types = self.storage.describe_columns(self.cursor, "logs")
+                # Only trust the live schema to restrict columns
+                self.table_cols = frozenset(column_types) or None
+            except Exception as e:
+                print(f"[!] Could not read logs schema ({e}), using defaults.")
+                column_types = DEFAULT_LOG_COLUMN_TYPES
+        self.column_types = column_types or DEFAULT_LOG_COLUMN_TYPES
+
+        self.pending = [] # (log, detections) tuples
+        self.pending_offset = None # byte offset just past the last pending log
+        self.stream_state = StreamState()
+        self.incidents = IncidentAggregator()
+        self.store_alert_rows = Config.STORE_ALERT_ROWS
+        self._batch_alerts = [] # (alert_data, target) of the batch being written
+        self._batch_ranges = [] # (first_id, last_id) of the log rows it inserted
+        try:
+            ensure_incident_table(self.storage, self.cursor)
+        except Exception as e:
+            print(f"[!] Could not create incidents table ({e}), incidents disabled.")
+            self.incidents = None
+        self.batches_since_commit = 0
+        self.checkpoint = checkpoint
+        self.last_log_id = checkpoint.last_log_id if checkpoint else None
+
+        self.logs_written = 0
+        self.alerts_written = 0
+        self.incidents_written = 0
+        self.skipped = 0
+        self.failed_batches = 0
+        self.failed_logs = 0
+        self.duplicate_batches = 0
+
+    def detect_stateful(self, log, detections):
+        """Replaces `detections` in place with the log's alerts after the stateful detectors."""
+        try:
+            detections[:] = run_stateful_detection(log, self.stream_state, detections)
+        except Exception as e:
+            print(f"[!] Stateful detection failed for log: {e}")
+
+    def add(self, log, detections, offset=None):
+        self.detect_stateful(log, detections)
+        self.pending.append((log, detections))
+        if offset is not None:
+            self.pending_offset = offset
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the pending batch inside a savepoint."""
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        offset, self.pending_offset = self.pending_offset, None
+        self._write_in_savepoint(len(batch), self._write_pending, batch, offset)
+
+    def write_rows(self, columns, rows, logs, detections):
+        """
+        Writes rows already projected onto `columns` and coerced (e.g. a CSV
+        chunk prepared column-wise), batch_size rows per savepoint.
+        logs[i] and detections[i] belong to rows[i] and are used for alerts.
+        """
+        self.flush()
+        sql = self._insert_sql(tuple(columns))
+        for start in range(0, len(rows), self.batch_size):
+            end = start + self.batch_size
+            chunk = rows[start:end]
+            self._write_in_savepoint(len(chunk), self._write_rows, sql, chunk, logs[start:end], detections[start:end])
+
+    def _write_in_savepoint(self, size, write, *args):
+        """Runs write(*args) -> (logs, alerts, last_log_id) in its own savepoint and updates the counters."""
+        self._batch_alerts = []
+        self._batch_ranges = []
+        try:
+            self.cursor.execute("SAVEPOINT log_batch")
+            logs_written, alerts_written, last_log_id = write(*args)
+            self.cursor.execute("RELEASE SAVEPOINT log_batch")
+        except Exception as e:
+            print(f"[!] Batch of {size} logs failed, rolled back: {e}")
+            self.cursor.execute("ROLLBACK TO SAVEPOINT log_batch")
+            self.failed_batches += 1
+            self.failed_logs += size
+            return
+
+        if self.incidents is not None:
+            # Only alerts of logs that were actually written count
+            for alert_data, target in self._batch_alerts:
+                self.incidents.add(alert_data, target, alert_data['raw_log_reference'])
+            for first_id, last_id in self._batch_ranges:
+                self.incidents.count_logs(first_id, last_id)
+        self._batch_alerts = []
+        self._batch_ranges = []
+
+        self.logs_written += logs_written
+        self.alerts_written += alerts_written
+        self.last_log_id = last_log_id
+        self.batches_since_commit += 1
+        if self.batches_since_commit >= self.commit_interval:
+            self.commit()
+
+    def _write_pending(self, batch, offset):
+        last_log_id = self.last_log_id
+        if self.checkpoint and not self.checkpoint.claim_batch(self.cursor, batch_hash(log for log, _ in batch), len(batch)):
+            # Same content was committed by an earlier run
+            self.duplicate_batches += 1
+            logs_written = alerts_written = 0
+        else:
+            logs_written, alerts_written, last_log_id = self._write_batch(batch)
+        if self.checkpoint and offset is not None:
+            self.checkpoint.save(self.cursor, offset, last_log_id)
+        return logs_written, alerts_written, last_log_id
+
+    def commit(self):
+        if self.incidents is not None:
+            # Incident counts are committed together with the logs they cover
+            self.incidents_written += self.incidents.write(self.cursor)
+        self.conn.commit()
+        self.batches_since_commit = 0
+
+    def close(self):
+        self.flush()
+        self.commit()
+        self.cursor.close()
+
+    def plan_for(self, log):
+        """Returns the cached InsertPlan for this log's column signature (None if nothing to insert)."""
+        key = frozenset(log)
+        plan = self._plans.get(key, False)
+        if plan is False:
+            plan = self._build_plan(key)
+            self._plans[key] = plan
+        return plan
+
+    def _build_plan(self, key):
+        cols = [c for c in ALLOWED_COLS if c in key]
+        if self.table_cols is not None:
+            cols = [c for c in cols if c in self.table_cols]
+        if not cols:
+            return None
+
+        cols = tuple(cols)
+        # Different key sets often project onto the same columns; share the plan
+        plan = self._plans_by_cols.get(cols)
+        if plan is None:
+            sql_log = self._insert_sql(cols)
+            coercions = tuple(
+                (i, COERCERS[self.column_types[c]]) for i, c in enumerate(cols)
+                if self.column_types.get(c) in COERCERS
+            )
+            plan = InsertPlan(sql_log, cols, coercions)
+            self._plans_by_cols[cols] = plan
+        return plan
+
+    @staticmethod
+    def _insert_sql(cols):
+        placeholders = ", ".join(["%s"] * len(cols))
+        return f"INSERT INTO logs ({', '.join(cols)}) VALUES ({placeholders})"
+
+    def _write_batch(self, batch):
+        # Group by insert plan so every group is a single multi-row INSERT
+        groups = {}
+        for log, detections in batch:
+            plan = self.plan_for(log)
+            if plan is None:
+                self.skipped += 1
+                continue
+            groups.setdefault(plan, []).append((log, detections))
+
+        logs_written = 0
+        last_log_id = self.last_log_id
+        alert_rows = []
+        for plan, members in groups.items():
+            rows = []
+            for log, _ in members:
+                vals = [log.get(c) for c in plan.columns]
+                for i, coerce in plan.coercions:
+                    vals[i] = coerce(vals[i])
+                rows.append(tuple(vals))
+
+            last_id = self._insert_logs(plan.sql, rows, [log for log, _ in members], [d for _, d in members], alert_rows)
+            logs_written += len(members)
+            last_log_id = max(last_log_id or 0, last_id)
+
+        if alert_rows and self.store_alert_rows:
+            self.cursor.executemany(ALERT_SQL, alert_rows)
+
+        return logs_written, len(alert_rows), last_log_id
+
+    def _write_rows(self, sql, rows, logs, detections):
+        alert_rows = []
+        last_id = self._insert_logs(sql, rows, logs, detections, alert_rows)
+        if alert_rows and self.store_alert_rows:
+            self.cursor.executemany(ALERT_SQL, alert_rows)
+        return len(rows), len(alert_rows), max(self.last_log_id or 0, last_id)
+
+    def _insert_logs(self, sql, rows, logs, detections, alert_rows):
+        """Runs one multi-row INSERT and queues alert rows for the new log ids. Returns the last id."""
+        self.cursor.executemany(sql, rows)
+        # A multi-row INSERT reports the id of its first row; the rest are consecutive
+        first_id = self.cursor.lastrowid
+        self._batch_ranges.append((first_id, first_id + len(rows) - 1))
+        for offset, (log, dets) in enumerate(zip(logs, detections)):
+            for d in dets:
+                alert_data = format_alert_object(d, log, first_id + offset)
+                alert_rows.append(alert_row(alert_data))
+                self._batch_alerts.append((alert_data, incident_target(log)))
+        return first_id + len(rows) - 1
+
+def process_log(log):
+    """
+    Runs detection on a normalized log. Returns (log, detections), or None if
+    the log could not be processed.
+    """
+    # Pre-process: Restore timestamp from timestamp_iso if needed
+    if 'timestamp' not in log and 'timestamp_iso' in log:
+        log['timestamp'] = log['timestamp_iso']
+
+    try:
+        detections = run_detection_pipeline(log)
+    except Exception as e:
+        print(f"[!] Error processing log: {e}")
+        return None
+    return log, detections
+
+# Per-process ingestor for pipeline workers
+_worker_ingestor = None
+
+def _process_chunk(raw_logs):
+    """
+    Pipeline worker: normalizes and runs detection on a chunk of
+    (raw_log, offset) pairs. Returns ([(log, detections, offset)], failed).
+    """
+    global _worker_ingestor
+    if _worker_ingestor is None:
+        _worker_ingestor = LogIngestor()
+
+    results = []
+    for raw, offset in raw_logs:
+        log = _worker_ingestor.normalize_log(raw)
+        if not log:
+            continue
+        processed = process_log(log)
+        if processed is not None:
+            results.append(processed + (offset,))
+    return results, len(raw_logs) - len(results)
+
+def _read_chunks(ingestor, file_path, chunk_size, start_offset=0):
+    chunk = []
+    try:
+        for pair in ingestor.iter_raw_logs_with_offsets(file_path, start_offset):
+            chunk.append(pair)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    except json.JSONDecodeError as e:
+        print(f"Error parsing JSON: {e}")
+    if chunk:
+        yield chunk
+
+def iter_pipeline(file_path, workers, chunk_size, start_offset=0):
+    """
+    Normalizes and runs detection on chunks of raw logs in a process pool.
+    Yields each chunk's (log, detections, offset) list in input order. At most
+    2 * workers chunks are in flight, so memory stays bounded.
+    """
+    ingestor = LogIngestor()
+    max_in_flight = workers * 2
+    failed = 0
+
+    with multiprocessing.Pool(processes=workers) as pool:
+        in_flight = deque()
+        for chunk in _read_chunks(ingestor, file_path, chunk_size, start_offset):
+            in_flight.append(pool.apply_async(_process_chunk, (chunk,)))
+            if len(in_flight) >= max_in_flight:
+                results, chunk_failed = in_flight.popleft().get()
+                failed += chunk_failed
+                yield results
+        while in_flight:
+            results, chunk_failed = in_flight.popleft().get()
+            failed += chunk_failed
+            yield results
+
+    if failed:
+        print(f"[!] {failed} logs failed normalization or detection.")
+
+def ingest_direct(file_path, batch_size=None, commit_interval=None, workers=None, chunk_size=None, use_checkpoint=True):
     print(f"[*] Starting ingestion for {file_path}")
     if not os.path.exists(file_path):
         print(f"[!] Error: {file_path} not found.")
         return
 
-    ingestor = LogIngestor()
-    normalized_logs = ingestor.parse_log_file(file_path)
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    processed_count = 0
-    alerts_generated = 0
-
-    print(f"[*] Processing {len(normalized_logs)} logs...")
-    if normalized_logs:
-        print(f"DEBUG: First normalized log keys: {list(normalized_logs[0].keys())}")
-        print(f"DEBUG: First normalized log content: {normalized_logs[0]}")
-        
-    for log in normalized_logs:
-        # Pre-process: Restore timestamp from timestamp_iso if needed
-        if 'timestamp' not in log and 'timestamp_iso' in log:
-            log['timestamp'] = log['timestamp_iso']
+    batch_size = batch_size or Config.INGEST_BATCH_SIZE
+    commit_interval = commit_interval or Config.INGEST_COMMIT_INTERVAL
+    workers = workers or Config.INGEST_WORKERS
+    chunk_size = chunk_size or Config.INGEST_CHUNK_SIZE
 
-        try:
-            # 1. Store Normalized Log
-            # Updated to handle Super-Set of 8+ Domains
-            # Prepare SQL
-            # Dynamic Columns for generic insertion
-
-            allowed_cols = [
-                "timestamp", "src_ip", "dst_ip", "src_port", "dst_port", "protocol", "service", "action", 
-                "policyid", "sentbyte", "rcvdbyte", "duration", "user", "device_type", "level", "logid",
-                "qname", "raw_log", "msg", "src_country", "dst_country", "log_type", "host", "direction",
-                "auth_type", "auth_result", "failure_reason", "location", "process_name", "process_id",
-                "parent_process", "command_line", "file_path", "hash", "integrity_level", 
-                "http_method", "url", "status_code", "user_agent", "request_size", "response_size", "session_id",
-                "client_ip", "asset_id", "hostname", "mac_address", "os", "os_version", "role", "criticality", "last_seen",
-                "alert_name", "detection_engine", "action_taken", "confidence", "query", "query_type", "response", "rcode", 
-                "ttl", "resolver", "cloud_provider", "account_id", "api_call", "resource", "region", "result", "ip_address"
-            ]
-            
-            # Filter keys that exist in both log and allowed_cols
-            cols = [k for k in log.keys() if k in allowed_cols]
-            
-            if not cols:
-                print(f"DEBUG: Skipping log with no matching columns: {log}")
-                continue
+    storage = get_storage()
+    conn = storage.connect()
 
-            placeholders = ", ".join(["%s"] * len(cols))
-            sql_log = f"INSERT INTO logs ({', '.join(cols)}) VALUES ({placeholders})"
-            
-            # Create values tuple in same order as cols
-            vals = []
-            for c in cols:
-                val = log.get(c)
-                # Ensure empty strings are None for Integers if necessary, or just rely on DB casting
-                vals.append(val)
-                
-            cursor.execute(sql_log, tuple(vals))
-            print(f"DEBUG: Executed INSERT for {log.get('log_type')}")
-            # print(f"DEBUG: SQL: {sql_log}")
-            # print(f"DEBUG: VALS: {vals}")
-            log_id = cursor.lastrowid
-
-            # 2. Detect Anomalies
-            detections = run_detection_pipeline(log)
-            
-            for d in detections:
-                alert_data = format_alert_object(d, log, log_id)
-                # 3. Store Alert
-                sql_alert = "INSERT INTO alerts (severity, detection_type, src_ip, device, timestamp, raw_log_reference, mitre_tactic, mitre_technique) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
-                cursor.execute(sql_alert, (alert_data['severity'], alert_data['detection_type'], alert_data['src_ip'], alert_data['device'], alert_data['timestamp'], log_id, alert_data['mitre_tactic'], alert_data['mitre_technique']))
-                alerts_generated += 1
-            
-            processed_count += 1
-        except Exception as e:
-            print(f"[!] Error processing log: {e}")
-            continue
-    
-    conn.commit()
-    cursor.close()
+    checkpoint = None
+    start_offset = 0
+    if use_checkpoint:
+        cursor = conn.cursor()
+        IngestCheckpoint.ensure_tables(cursor)
+        checkpoint = IngestCheckpoint(file_path)
+        start_offset = checkpoint.load(cursor)
+        cursor.close()
+        if start_offset:
+            print(f"[*] Resuming from byte {start_offset} (last committed log id {checkpoint.last_log_id})")
+
+    writer = LogBatchWriter(conn, batch_size=batch_size, commit_interval=commit_interval, checkpoint=checkpoint, storage=storage)
+
+    print(f"[*] Processing logs (batch size {batch_size}, commit every {commit_interval} batches)...")
+
+    if workers > 1:
+        # Workers normalize + detect; this process is the single ordered writer
+        print(f"[*] Pipeline mode: {workers} workers, {chunk_size} logs per chunk")
+        for results in iter_pipeline(file_path, workers, chunk_size, start_offset):
+            for log, detections, offset in results:
+                writer.add(log, detections, offset)
+    else:
+        ingestor = LogIngestor()
+        # Stream logs instead of materialising the whole file
+        for log, offset in ingestor.iter_log_file_with_offsets(file_path, start_offset):
+            processed = process_log(log)
+            if processed is not None:
+                writer.add(*processed, offset=offset)
+
+    writer.close()
     conn.close()
-    
-    print(f"[+] Ingestion complete: {processed_count} logs processed, {alerts_generated} alerts generated.")
+
+    print(f"[+] Ingestion complete: {writer.logs_written} logs processed, {writer.alerts_written} alerts generated "
+          f"({writer.incidents_written} incident updates).")
+    if writer.failed_batches or writer.skipped:
+        print(f"[!] {writer.failed_batches} batches ({writer.failed_logs} logs) failed, {writer.skipped} logs had no matching columns.")
+    if writer.duplicate_batches:
+        print(f"[*] Skipped {writer.duplicate_batches} batches already ingested by an earlier run.")
+
+def follow(file_path, from_start=False, max_batch=None, max_latency=None):
+    """
+    Continuously ingests lines appended to a JSONL or FortiGate .log file.
+    Every micro-batch goes through the usual normalize/detect/insert path
+    and is committed immediately, bounding end-to-end latency.
+    """
+    max_batch = max_batch or Config.FOLLOW_MAX_BATCH
+    max_latency = max_latency or Config.FOLLOW_MAX_LATENCY
+    print(f"[*] Following {file_path} (batch {max_batch} lines / {max_latency}s). Ctrl+C to stop.")
+
+    ingestor = LogIngestor()
+    follower = LogFollower(file_path, from_start=from_start, poll_interval=Config.FOLLOW_POLL_INTERVAL,
+                           max_batch=max_batch, max_latency=max_latency)
+    storage = get_storage()
+    conn = storage.connect()
+    # Batches are sized by the follower; the writer commits each one
+    writer = LogBatchWriter(conn, batch_size=max_batch + 1, commit_interval=1, storage=storage)
+
+    try:
+        for lines in follower.batches():
+            for line in lines:
+                raw = ingestor.parse_line(line)
+                log = ingestor.normalize_log(raw) if raw else None
+                if not log:
+                    continue
+                processed = process_log(log)
+                if processed is not None:
+                    writer.add(*processed)
+            writer.flush()
+            print(f"[*] {writer.logs_written} logs, {writer.alerts_written} alerts ingested so far.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+        conn.close()
+
+    print(f"[+] Follow stopped: {writer.logs_written} logs processed, {writer.alerts_written} alerts generated.")
 
 if __name__ == "__main__":
-    # Look for the JSON file generated by traffic_generator.py
-    log_file = "simulated_fortigate_logs.json"
-    ingest_direct(log_file)
+    parser = argparse.ArgumentParser(description="Ingest logs into the database and run detection")
+    # Defaults to the JSON file generated by traffic_generator.py
+    parser.add_argument("log_file", nargs="?", default="simulated_fortigate_logs.json", help="Path to the JSON/JSONL, FortiGate .log or .csv log file")
+    parser.add_argument("--batch_size", type=int, default=Config.INGEST_BATCH_SIZE, help="Logs per multi-row INSERT batch")
+    parser.add_argument("--commit_interval", type=int, default=Config.INGEST_COMMIT_INTERVAL, help="Commit after this many batches")
+    parser.add_argument("--workers", type=int, default=Config.INGEST_WORKERS, help="Worker processes for normalize+detect (1 = in-process)")
+    parser.add_argument("--chunk_size", type=int, default=Config.INGEST_CHUNK_SIZE, help="Raw logs handed to a worker at a time")
+    parser.add_argument("--no_checkpoint", action="store_true", help="Ignore and do not record resume checkpoints / batch hashes")
+    parser.add_argument("--follow", metavar="PATH", help="Tail a growing JSONL or FortiGate .log file and ingest new lines continuously")
+    parser.add_argument("--from_start", action="store_true", help="With --follow, ingest the existing content first instead of starting at the end")
+    parser.add_argument("--bulk", action="store_true", help="Backfill mode: load via a temporary TSV and LOAD DATA LOCAL INFILE")
+    parser.add_argument("--sqlite", metavar="DB_PATH", help="Write to this SQLite database instead of MySQL (same as STORAGE_BACKEND=sqlite)")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        use_storage(SQLiteStorage(args.sqlite))
+
+    if args.follow:
+        follow(args.follow, from_start=args.from_start)
+    elif args.log_file.lower().endswith(".csv"):
+        # Columnar exports take the vectorized pandas path
+        from csv_loader import csv_ingest
+        csv_ingest(args.log_file, batch_size=args.batch_size, commit_interval=args.commit_interval)
+    elif args.bulk:
+        from bulk_loader import bulk_ingest
+        bulk_ingest(args.log_file)
+    else:
+        ingest_direct(args.log_file, batch_size=args.batch_size, commit_interval=args.commit_interval,
+                      workers=args.workers, chunk_size=args.chunk_size, use_checkpoint=not args.no_checkpoint)
@@ -1,42 +1,172 @@
+import io
 import json
-from dateutil import parser
 from datetime import datetime
+from timestamp_parser import TimestampParser
+from fortigate_parser import parse_kv_line
+
+# Bytes pulled from disk per read when streaming a JSON array
+READ_CHUNK_SIZE = 1 << 16
 
 class LogIngestor:
     def __init__(self):
-        pass
+        self._decoder = json.JSONDecoder()
+        self.timestamps = TimestampParser()
 
     def parse_log_file(self, file_path):
         """
-        Reads a JSON log file and returns a list of normalized log dictionaries.
+        Reads a JSON, JSONL or FortiGate key=value log file and returns a list
+        of normalized log dictionaries.
+        Loads everything into memory; prefer iter_log_file() for large files.
+        """
+        try:
+            return list(self.iter_log_file(file_path))
+        except Exception as e:
+            print(f"Error reading file: {e}")
+            return []
+
+    def iter_log_file(self, file_path):
+        """
+        Generator yielding normalized logs one at a time.
+        Memory stays flat regardless of file size.
+        """
+        for normalized, _ in self.iter_log_file_with_offsets(file_path):
+            yield normalized
+
+    def iter_log_file_with_offsets(self, file_path, start_offset=0):
+        """
+        Like iter_log_file, but yields (normalized_log, end_offset) pairs where
+        end_offset is the byte offset just past the record. Passing a saved
+        offset back as start_offset resumes reading after that record.
         """
-        normalized_logs = []
+        parsed = 0
+        # Each file is its own source, learn its timestamp format afresh
+        self.timestamps = TimestampParser()
         try:
-            with open(file_path, 'r') as f:
-                # Assuming file contains one JSON object per line (JSONL) or a JSON array
-                content = f.read().strip()
-                if content.startswith('['):
-                     raw_logs = json.loads(content)
-                else: 
-                     # Handle JSONL
-                     raw_logs = [json.loads(line) for line in content.splitlines() if line.strip()]
-
-            print(f"[*] Parsed {len(raw_logs)} raw logs from JSON.")
-            for raw in raw_logs:
+            for raw, offset in self.iter_raw_logs_with_offsets(file_path, start_offset):
+                parsed += 1
                 normalized = self.normalize_log(raw)
                 if normalized:
-                    normalized_logs.append(normalized)
+                    yield normalized, offset
                 else:
                     print(f"[!] Normalization failed for a log.")
-                    
-            return normalized_logs
-
         except json.JSONDecodeError as e:
+            # Keep what was already yielded, stop at the first malformed record
             print(f"Error parsing JSON: {e}")
-            return []
-        except Exception as e:
-            print(f"Error reading file: {e}")
-            return []
+        print(f"[*] Parsed {parsed} raw logs from {file_path}.")
+        if self.timestamps.failures:
+            print(f"[!] {self.timestamps.failures} logs had unparseable timestamps (ingest time used).")
+
+    def iter_raw_logs(self, file_path):
+        """
+        Generator yielding raw (un-normalized) log dicts from a JSON array
+        (as written by LogWriter.write_json), a JSONL file, or FortiGate
+        key=value lines (as written by LogWriter.write_raw). The format is
+        detected from the first non-blank byte.
+        """
+        for raw, _ in self.iter_raw_logs_with_offsets(file_path):
+            yield raw
+
+    def iter_raw_logs_with_offsets(self, file_path, start_offset=0):
+        """
+        Generator yielding (raw_log, end_offset) pairs, end_offset being the
+        byte offset just past each record.
+        """
+        with open(file_path, 'rb') as f:
+            first = self._peek_first_byte(f)
+            f.seek(start_offset)
+            if first == b'[':
+                # newline='' keeps \r\n as two characters, so offsets stay byte offsets
+                text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+                yield from self._iter_json_array(text, start_offset, skip_open=start_offset == 0)
+            elif first == b'{':
+                offset = start_offset
+                for line in f:
+                    offset += len(line)
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line), offset
+            else:
+                offset = start_offset
+                for line in f:
+                    offset += len(line)
+                    line = line.strip()
+                    if line:
+                        yield self._parse_kv(line.decode('utf-8', errors='replace')), offset
+
+    def parse_line(self, line):
+        """
+        Parses a single line from a JSONL or FortiGate key=value log.
+        Returns the raw log dict, or None for blank/unparseable lines.
+        """
+        line = line.strip()
+        if not line:
+            return None
+        if line.startswith('{'):
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                return None
+        return self._parse_kv(line) or None
+
+    def _parse_kv(self, line):
+        raw = parse_kv_line(line)
+        # Keep the original line rather than a JSON re-encoding of it
+        if raw:
+            raw.setdefault('raw_log', line)
+        return raw
+
+    def _peek_first_byte(self, f):
+        """Returns the first non-whitespace byte and rewinds the file."""
+        while True:
+            ch = f.read(1)
+            if not ch or not ch.isspace():
+                f.seek(0)
+                return ch
+
+    def _iter_json_array(self, f, offset=0, skip_open=True):
+        """
+        Incrementally decodes the elements of a top-level JSON array,
+        holding at most one element plus one read chunk in memory.
+        Yields (element, end_offset); offset is the byte position of f.
+        """
+        buf = f.read(READ_CHUNK_SIZE)
+        pos = 0
+        if skip_open:
+            stripped = buf.lstrip()
+            offset += len(buf) - len(stripped) + 1 # whitespace and the opening '['
+            buf = stripped[1:]
+        eof = False
+        while True:
+            # Skip whitespace and element separators (all single-byte)
+            while True:
+                skip_from = pos
+                while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+                    pos += 1
+                offset += pos - skip_from
+                if pos < len(buf) or eof:
+                    break
+                buf, pos = f.read(READ_CHUNK_SIZE), 0
+                eof = not buf
+
+            if pos >= len(buf):
+                raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+            if buf[pos] == ']':
+                return
+
+            try:
+                obj, end = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Element straddles the chunk boundary, pull in more data
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+
+            offset += len(buf[pos:end].encode('utf-8'))
+            yield obj, offset
+            pos = end
 
     def normalize_log(self, raw_log):
         """
@@ -44,13 +174,9 @@ class LogIngestor:
         Standard Schema: timestamp, src_ip, dst_ip, device_type, protocol, action, dns_qname
         """
         try:
-            ts_str = raw_log.get('timestamp_iso') or raw_log.get('timestamp')
-            if not ts_str:
-                ts_str = f"{raw_log.get('date')} {raw_log.get('time')}"
-            
-            try:
-                timestamp = parser.parse(ts_str)
-            except:
+            # Format is learned once per source; failures are counted by the parser
+            timestamp = self.timestamps.parse(raw_log)
+            if timestamp is None:
                 timestamp = datetime.now()
 
             # Start with raw_log to keep all fields (e.g. log_type, auth_result, process_name)
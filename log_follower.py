@@ -0,0 +1,118 @@
+import os
+import time
+
+# Bytes read per call; a backlog (e.g. --from_start on a large file) is consumed chunk by chunk
+READ_CHUNK_SIZE = 1 << 20
+
+class LogFollower:
+    """
+    Tails a growing log file (JSONL or FortiGate key=value lines) and yields
+    micro-batches of complete lines.
+
+    A batch is emitted once it holds `max_batch` lines or its oldest line has
+    waited `max_latency` seconds, whichever comes first. Rotation (the path
+    now points at a different file) and truncation (the file shrank) are
+    detected on every poll.
+    """
+
+    def __init__(self, path, from_start=False, poll_interval=0.5, max_batch=500, max_latency=2.0):
+        self.path = path
+        self.from_start = from_start
+        self.poll_interval = poll_interval
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max_latency
+
+        self._fh = None
+        self._ino = None
+        self._partial = b""
+        self.rotations = 0
+        self.truncations = 0
+
+    def _open(self, seek_end):
+        if self._fh:
+            self._fh.close()
+        self._fh = open(self.path, 'rb')
+        st = os.fstat(self._fh.fileno())
+        self._ino = (st.st_dev, st.st_ino)
+        self._partial = b""
+        if seek_end:
+            self._fh.seek(0, os.SEEK_END)
+
+    def _check_rotation(self):
+        """Reopens the path if it was rotated or truncated. Returns True if the file changed."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotated away and not recreated yet
+            return False
+
+        if (st.st_dev, st.st_ino) != self._ino:
+            self.rotations += 1
+            print(f"[*] {self.path} was rotated, reopening.")
+            self._open(seek_end=False)
+            return True
+        if st.st_size < self._fh.tell():
+            self.truncations += 1
+            print(f"[*] {self.path} was truncated, reading from the start.")
+            self._fh.seek(0)
+            self._partial = b""
+            return True
+        return False
+
+    def _read_lines(self):
+        """
+        Returns complete lines appended since the last call, reading
+        READ_CHUNK_SIZE bytes at a time until some are found. Returns [] at
+        the end of the file; the rest of a backlog is left for later calls.
+        """
+        while True:
+            data = self._fh.read(READ_CHUNK_SIZE)
+            if not data:
+                return []
+            data = self._partial + data
+            lines = data.split(b"\n")
+            # The last element is an unfinished line (or b"" after a trailing newline)
+            self._partial = lines.pop()
+            lines = [line.decode('utf-8', errors='replace') for line in lines if line.strip()]
+            if lines:
+                return lines
+
+    def batches(self):
+        """Generator of lists of raw lines. Runs until interrupted."""
+        while self._fh is None:
+            try:
+                self._open(seek_end=not self.from_start)
+            except FileNotFoundError:
+                time.sleep(self.poll_interval)
+
+        batch = []
+        batch_started = None
+        try:
+            while True:
+                lines = self._read_lines()
+                if not lines:
+                    # Drain the old file completely before switching on rotation
+                    if self._check_rotation():
+                        continue
+
+                for line in lines:
+                    if not batch:
+                        batch_started = time.monotonic()
+                    batch.append(line)
+                    if len(batch) >= self.max_batch:
+                        yield batch
+                        batch = []
+
+                if batch and time.monotonic() - batch_started >= self.max_latency:
+                    yield batch
+                    batch = []
+
+                if not lines:
+                    time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            # Hand over what we have so the caller can write it before exiting
+            if batch:
+                yield batch
+        finally:
+            if self._fh:
+                self._fh.close()
@@ -31,7 +31,35 @@ CREATE TABLE IF NOT EXISTS alerts (
     mitre_tactic VARCHAR(100),
     mitre_technique VARCHAR(100),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (raw_log_reference) REFERENCES logs(id)
+    FOREIGN KEY (raw_log_reference) REFERENCES logs(id),
+    UNIQUE KEY uq_alerts_log_type (raw_log_reference, detection_type)
+);
+
+-- One row per (detection_type, src_ip, target) and time window; target is the queried domain or dst_ip
+CREATE TABLE IF NOT EXISTS incidents (
+    incident_id INT AUTO_INCREMENT PRIMARY KEY,
+    detection_type VARCHAR(100) NOT NULL,
+    src_ip VARCHAR(45) NOT NULL,
+    target VARCHAR(255) NOT NULL DEFAULT '',
+    window_start DATETIME NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    device VARCHAR(100),
+    mitre_tactic VARCHAR(100),
+    mitre_technique VARCHAR(100),
+    alert_count INT NOT NULL DEFAULT 0,
+    first_seen DATETIME NOT NULL,
+    last_seen DATETIME NOT NULL,
+    sample_log_ids VARCHAR(255),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_incidents_window (detection_type, src_ip, target, window_start),
+    INDEX idx_incidents_last_seen (last_seen)
+);
+
+CREATE TABLE IF NOT EXISTS incident_counted_logs (
+    first_log_id INT NOT NULL,
+    last_log_id INT NOT NULL,
+    PRIMARY KEY (first_log_id, last_log_id),
+    INDEX idx_counted_last_log_id (last_log_id)
 );
 
 CREATE TABLE IF NOT EXISTS devices (
@@ -52,3 +80,19 @@ CREATE TABLE IF NOT EXISTS users (
     managed_by INT,
     FOREIGN KEY (managed_by) REFERENCES users(id) ON DELETE SET NULL
 );
+
+CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+    fingerprint CHAR(40) PRIMARY KEY,
+    file_path TEXT,
+    byte_offset BIGINT NOT NULL DEFAULT 0,
+    last_log_id INT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ingest_batches (
+    fingerprint CHAR(40) NOT NULL,
+    batch_hash CHAR(40) NOT NULL,
+    log_count INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (fingerprint, batch_hash)
+);
@@ -0,0 +1,318 @@
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from config import Config
+
+# SQLite version of schema.sql. src_ip/dst_ip are nullable, matching the
+# live MySQL schema after relax_constraints.py; the extra domain columns of
+# `logs` are added on demand through ensure_columns().
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp DATETIME NOT NULL,
+    src_ip VARCHAR(45),
+    dst_ip VARCHAR(45),
+    src_port INT,
+    dst_port INT,
+    service VARCHAR(50),
+    device_type VARCHAR(100),
+    protocol VARCHAR(20),
+    action VARCHAR(50),
+    policyid INT,
+    sentbyte BIGINT DEFAULT 0,
+    rcvdbyte BIGINT DEFAULT 0,
+    user VARCHAR(100) DEFAULT 'N/A',
+    raw_log TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    alert_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    severity VARCHAR(20) NOT NULL,
+    detection_type VARCHAR(100) NOT NULL,
+    src_ip VARCHAR(45) NOT NULL,
+    device VARCHAR(100),
+    timestamp DATETIME NOT NULL,
+    raw_log_reference INT,
+    mitre_tactic VARCHAR(100),
+    mitre_technique VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (raw_log_reference) REFERENCES logs(id),
+    UNIQUE (raw_log_reference, detection_type)
+);
+
+CREATE TABLE IF NOT EXISTS incidents (
+    incident_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    detection_type VARCHAR(100) NOT NULL,
+    src_ip VARCHAR(45) NOT NULL,
+    target VARCHAR(255) NOT NULL DEFAULT '',
+    window_start DATETIME NOT NULL,
+    severity VARCHAR(20) NOT NULL,
+    device VARCHAR(100),
+    mitre_tactic VARCHAR(100),
+    mitre_technique VARCHAR(100),
+    alert_count INT NOT NULL DEFAULT 0,
+    first_seen DATETIME NOT NULL,
+    last_seen DATETIME NOT NULL,
+    sample_log_ids VARCHAR(255),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (detection_type, src_ip, target, window_start)
+);
+
+CREATE TABLE IF NOT EXISTS incident_counted_logs (
+    first_log_id INT NOT NULL,
+    last_log_id INT NOT NULL,
+    PRIMARY KEY (first_log_id, last_log_id)
+);
+
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device_name VARCHAR(100),
+    mac_address VARCHAR(17),
+    ip_address VARCHAR(45),
+    known_type VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    role VARCHAR(20) DEFAULT 'user',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    managed_by INT,
+    FOREIGN KEY (managed_by) REFERENCES users(id) ON DELETE SET NULL
+);
+"""
+
+# MySQL data types -> SQLite column declarations for ensure_columns()
+_SQLITE_TYPES = {"int": "INT", "bigint": "BIGINT", "datetime": "DATETIME", "timestamp": "DATETIME"}
+
+# Statements that must run inside the explicit transaction
+_WRITE_STATEMENT = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE|SAVEPOINT|CREATE|ALTER|DROP)\b", re.IGNORECASE)
+_ON_DUPLICATE = re.compile(r"\bON DUPLICATE KEY UPDATE\b", re.IGNORECASE)
+_VALUES_REF = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+
+# Store datetimes the way MySQL prints them (the stdlib default adapter is deprecated)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+
+@lru_cache(maxsize=256)
+def translate_sql(sql):
+    """
+    Rewrites the MySQL dialect used across the project into SQLite:
+    %s placeholders, INSERT IGNORE, ON DUPLICATE KEY UPDATE ... VALUES(col),
+    LEAST / GREATEST, AUTO_INCREMENT keys and ON UPDATE CURRENT_TIMESTAMP
+    defaults.
+    """
+    sql = sql.replace("%s", "?")
+    sql = re.sub(r"\bINSERT IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+    match = _ON_DUPLICATE.search(sql)
+    if match:
+        head, updates = sql[:match.start()], sql[match.end():]
+        sql = head + "ON CONFLICT DO UPDATE SET" + _VALUES_REF.sub(r"excluded.\1", updates)
+    sql = re.sub(r"\bLEAST\(", "MIN(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bGREATEST\(", "MAX(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bINT AUTO_INCREMENT PRIMARY KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\s+ON UPDATE CURRENT_TIMESTAMP\b", "", sql, flags=re.IGNORECASE)
+    return sql
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+class SQLiteCursor:
+    """mysql.connector-style cursor over sqlite3 (dictionary rows, first-row lastrowid)."""
+
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._cur = conn.raw.cursor()
+        if dictionary:
+            self._cur.row_factory = _dict_row
+        self.lastrowid = None
+
+    def execute(self, sql, params=()):
+        self._conn.begin_if_needed(sql)
+        self._cur.execute(translate_sql(sql), params or ())
+        self.lastrowid = self._cur.lastrowid
+
+    def executemany(self, sql, rows):
+        self._conn.begin_if_needed(sql)
+        self._cur.executemany(translate_sql(sql), rows)
+        # Like a multi-row MySQL INSERT, report the id of the first new row.
+        # Rowids are consecutive because the writer holds the database lock.
+        if self._cur.rowcount > 0:
+            last_id = self._conn.raw.execute("SELECT last_insert_rowid()").fetchone()[0]
+            self.lastrowid = last_id - self._cur.rowcount + 1
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def close(self):
+        self._cur.close()
+
+class SQLiteConnection:
+    """
+    Wraps a sqlite3 connection in autocommit mode and opens transactions
+    explicitly, so savepoints nest inside one long transaction and nothing
+    is written to disk until commit() - the same model as MySQL/InnoDB.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def begin_if_needed(self, sql):
+        if not self.raw.in_transaction and _WRITE_STATEMENT.match(sql):
+            self.raw.execute("BEGIN")
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def close(self):
+        self.rollback()
+        self.raw.close()
+
+class MySQLStorage:
+    """Default backend: pooled mysql.connector connections from api.db."""
+    name = "mysql"
+
+    def __init__(self):
+        import mysql.connector
+        from api import db
+        self._db = db
+        self.Error = mysql.connector.Error
+
+    def connect(self, **options):
+        return self._db.get_db_connection(**options)
+
+    def cursor(self, commit=False, **cursor_options):
+        return self._db.db_cursor(commit=commit, **cursor_options)
+
+    def describe_columns(self, cursor, table):
+        """Reads {column: data_type} for a table from the live schema."""
+        cursor.execute(
+            "SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,)
+        )
+        return {name: data_type.lower() for name, data_type in cursor.fetchall()}
+
+    def ensure_columns(self, cursor, table, columns, column_types=None):
+        # The MySQL schema is managed by schema.sql / update_schema_domains.sql
+        pass
+
+    def ensure_index(self, cursor, table, name, columns, unique=False):
+        """Creates the index unless one with that name exists (MySQL has no CREATE INDEX IF NOT EXISTS)."""
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+            (table, name)
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})")
+
+class SQLiteStorage:
+    """
+    Embedded backend for single-node deployments and benchmarks. The
+    database runs in WAL mode with synchronous=NORMAL, so batched commits
+    from LogBatchWriter are not each forced to disk and readers (the
+    dashboard) never block the ingest writer.
+    """
+    name = "sqlite"
+    Error = sqlite3.Error
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def connect(self, **options):
+        # Connector options such as allow_local_infile have no SQLite meaning
+        raw = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False,
+                              timeout=Config.SQLITE_BUSY_TIMEOUT)
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute("PRAGMA temp_store=MEMORY")
+        raw.execute(f"PRAGMA cache_size=-{Config.SQLITE_CACHE_KB}")
+        if not self._schema_ready:
+            with self._lock:
+                if not self._schema_ready:
+                    # journal_mode is persistent, so it only needs setting once per file
+                    raw.execute("PRAGMA journal_mode=WAL")
+                    raw.executescript(SQLITE_SCHEMA)
+                    self._schema_ready = True
+        return SQLiteConnection(raw)
+
+    @contextmanager
+    def cursor(self, commit=False, **cursor_options):
+        conn = self.connect()
+        cursor = conn.cursor(**cursor_options)
+        try:
+            yield cursor
+            if commit:
+                conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def describe_columns(self, cursor, table):
+        cursor.execute(f"PRAGMA table_info({table})")
+        # Declared types like VARCHAR(45) reduce to their MySQL base name
+        return {row[1]: row[2].split("(")[0].strip().lower() for row in cursor.fetchall()}
+
+    def ensure_columns(self, cursor, table, columns, column_types=None):
+        """Adds any of `columns` missing from `table` (SQLite has no ADD COLUMN IF NOT EXISTS)."""
+        column_types = column_types or {}
+        existing = self.describe_columns(cursor, table)
+        for col in columns:
+            if col not in existing:
+                decl = _SQLITE_TYPES.get(column_types.get(col), "TEXT")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
+
+    def ensure_index(self, cursor, table, name, columns, unique=False):
+        cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+def create_storage(backend=None, sqlite_path=None):
+    backend = (backend or Config.STORAGE_BACKEND).lower()
+    if backend == "sqlite":
+        return SQLiteStorage(sqlite_path or Config.SQLITE_PATH)
+    if backend == "mysql":
+        return MySQLStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+_storage = None
+
+def get_storage():
+    """Returns the process-wide backend selected by Config.STORAGE_BACKEND."""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+def use_storage(storage):
+    """Overrides the process-wide backend (e.g. from a --sqlite command line flag)."""
+    global _storage
+    _storage = storage
+    return storage
@@ -0,0 +1,123 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+import contextlib
+import storage
+from storage import SQLiteStorage, use_storage
+from config import Config
+from detect_backfill import detect_backfill
+from ingest_logs import ingest_direct
+
+class TestDetectBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.previous = storage._storage
+        self.store_alert_rows = Config.STORE_ALERT_ROWS
+        Config.STORE_ALERT_ROWS = True
+        self.storage = use_storage(SQLiteStorage(os.path.join(self.tmp.name, "test.db")))
+        with self.storage.cursor(commit=True) as cursor:
+            self.storage.ensure_columns(cursor, "logs", ["qname"])
+            for i in range(10):
+                # Every other log is a tunneling-looking DNS query
+                qname = f"a9x{i}q7zk2m4v8w1p6t3r5y0u.exfil.example" if i % 2 else "www.google.com"
+                cursor.execute(
+                    "INSERT INTO logs (timestamp, src_ip, dst_ip, protocol, dst_port, qname) VALUES (%s, %s, %s, %s, %s, %s)",
+                    (f"2024-01-01 00:00:{i:02d}", "10.0.0.5", "8.8.8.8", "17", 53, qname)
+                )
+
+    def tearDown(self):
+        use_storage(self.previous)
+        Config.STORE_ALERT_ROWS = self.store_alert_rows
+        self.tmp.cleanup()
+
+    def _backfill(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return detect_backfill(chunk_rows=3, workers=1, **kwargs)
+
+    def _alerts(self):
+        with self.storage.cursor() as cursor:
+            cursor.execute("SELECT raw_log_reference, detection_type FROM alerts ORDER BY raw_log_reference")
+            return cursor.fetchall()
+
+    def _incident_counts(self):
+        with self.storage.cursor() as cursor:
+            cursor.execute("SELECT detection_type, alert_count FROM incidents ORDER BY detection_type")
+            return cursor.fetchall()
+
+    def test_backfill_is_idempotent(self):
+        progress = self._backfill()
+        self.assertEqual(progress.logs_scanned, 10)
+        self.assertEqual(progress.last_log_id, 10)
+        alerts = self._alerts()
+        self.assertEqual(sorted({row[0] for row in alerts}), [2, 4, 6, 8, 10])
+
+        incidents = self._incident_counts()
+        self.assertEqual(sum(count for _, count in incidents), len(alerts))
+
+        # A finished job does nothing; a restarted one upserts the same alerts and counts none twice
+        self.assertEqual(self._backfill().logs_scanned, 10)
+        self._backfill(restart=True)
+        self.assertEqual(self._alerts(), alerts)
+        self.assertEqual(self._incident_counts(), incidents)
+
+    def test_resumes_after_watermark(self):
+        self._backfill(until_id=4)
+        first = self._alerts()
+        self.assertEqual(sorted({row[0] for row in first}), [2, 4])
+        progress = self._backfill(until_id=10)
+        self.assertEqual(progress.logs_scanned, 10)
+        alerts = self._alerts()
+        self.assertEqual(sorted({row[0] for row in alerts}), [2, 4, 6, 8, 10])
+        self.assertEqual(len(alerts), len(set(alerts)))
+        self.assertTrue(set(first) <= set(alerts))
+        self.assertEqual(sum(count for _, count in self._incident_counts()), len(alerts))
+
+    def test_without_alert_rows_counts_incidents_once_per_log(self):
+        Config.STORE_ALERT_ROWS = False
+        self._backfill(until_id=4)
+        progress = self._backfill(until_id=10)
+        self.assertEqual(self._alerts(), [])
+        self.assertGreater(progress.alerts_found, 0)
+        incidents = self._incident_counts()
+        self.assertEqual(sum(count for _, count in incidents), progress.alerts_found)
+
+        # Restarts and overlapping ranges find the logs already counted
+        self._backfill(restart=True)
+        self._backfill(job="overlap", from_id=3)
+        self.assertEqual(self._incident_counts(), incidents)
+
+    def test_backfill_after_ingestion_leaves_incidents_unchanged(self):
+        Config.STORE_ALERT_ROWS = False
+        self._backfill()
+        path = os.path.join(self.tmp.name, "logs.jsonl")
+        with open(path, "w") as f:
+            for i in range(20):
+                qname = f"z{i}k7q2m9v4w8p1t6r3y5u0x.tunnel.example" if i % 2 else "www.example.com"
+                f.write(json.dumps({"timestamp_iso": f"2024-01-01T00:01:{i:02d}", "srcip": "10.0.0.6", "dstip": "8.8.4.4",
+                                    "proto": 17, "dstport": 53, "qname": qname}) + "\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingest_direct(path, batch_size=7, commit_interval=1)
+        incidents = self._incident_counts()
+        self.assertEqual(sum(count for kind, count in incidents if kind == "DNS Tunneling"), 15)
+
+        self._backfill(restart=True)
+        self._backfill(job="rescore", from_id=5)
+        self.assertEqual(self._incident_counts(), incidents)
+
+    def test_resumed_job_warms_stateful_detectors(self):
+        with self.storage.cursor(commit=True) as cursor:
+            for i in range(12):
+                cursor.execute(
+                    "INSERT INTO logs (timestamp, src_ip, dst_ip, protocol, dst_port, device_type, action) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    (f"2024-01-01 00:01:{i:02d}", "10.0.0.9", "10.0.0.1", "6", 22, "server", "deny")
+                )
+        # The 10th attempt (log 20) completes the burst, after the job stopped at log 15
+        self._backfill(until_id=15)
+        self._backfill(until_id=22)
+        self.assertIn((20, "SSH Brute Force"), self._alerts())
+
+if __name__ == '__main__':
+    unittest.main()
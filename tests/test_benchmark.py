@@ -0,0 +1,34 @@
+import unittest
+
+try:
+    from benchmark_detection import build_corpus, benchmark_corpus, compare_results
+except ImportError: # numpy / PyYAML missing
+    build_corpus = None
+
+@unittest.skipIf(build_corpus is None, "benchmark dependencies not installed")
+class TestDetectionBenchmark(unittest.TestCase):
+
+    def test_corpus_is_seeded_and_mixed(self):
+        corpus = build_corpus(400, seed=7)
+        self.assertEqual(len(corpus), 400)
+        self.assertEqual(corpus, build_corpus(400, seed=7))
+        self.assertNotEqual(corpus, build_corpus(400, seed=8))
+        # Every generator contributes, in time order
+        self.assertTrue(any(log.get('log_type') == 'dns' for log in corpus))
+        self.assertTrue(any(str(log.get('qname', '')).endswith('evil.cc') for log in corpus))
+        self.assertEqual([log['timestamp'] for log in corpus], sorted(log['timestamp'] for log in corpus))
+
+        results = benchmark_corpus(corpus, warmup=10)
+        self.assertEqual(results["pipeline"]["logs"], 400)
+        self.assertGreater(results["pipeline"]["logs_per_sec"], 0)
+        self.assertIn("web_attacks", results)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {"10000": {"pipeline": {"logs": 10000, "logs_per_sec": 20000, "p50_us": 40, "p99_us": 100}}}}
+        same = {"results": {"10000": {"pipeline": {"logs": 10000, "logs_per_sec": 19000, "p50_us": 42, "p99_us": 140}}}}
+        slow = {"results": {"10000": {"pipeline": {"logs": 10000, "logs_per_sec": 12000, "p50_us": 70, "p99_us": 100}}}}
+        self.assertEqual(compare_results(same, baseline, 0.25), [])
+        self.assertEqual(len(compare_results(slow, baseline, 0.25)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+import contextlib
+import storage
+from storage import SQLiteStorage, use_storage
+from config import Config
+from incidents import IncidentAggregator, ensure_incident_table
+from bulk_loader import SQLiteBulkTarget, _load_chunk, bulk_ingest, read_tsv, write_tsv
+
+class TestTsv(unittest.TestCase):
+
+    def test_escapes_round_trip(self):
+        values = ["plain", "tab\there", "line\nbreak\r", "back\\slash", "nul\0", "\\N", None, ""]
+        cols = [f"c{i}" for i in range(len(values))]
+        fh = io.StringIO()
+        write_tsv([dict(zip(cols, values))], cols, fh)
+        self.assertEqual(fh.getvalue().count("\n"), 1)
+        fh.seek(0)
+        self.assertEqual(list(read_tsv(fh)), [tuple(values)])
+
+    def test_coerces_typed_columns(self):
+        fh = io.StringIO()
+        log = {"timestamp": "2024-01-01T00:00:05", "dst_port": "443", "src_port": "oops", "src_ip": "10.0.0.1"}
+        write_tsv([log], ["timestamp", "dst_port", "src_port", "src_ip"], fh,
+                  {"timestamp": "datetime", "dst_port": "int", "src_port": "int"})
+        fh.seek(0)
+        self.assertEqual(list(read_tsv(fh)), [("2024-01-01 00:00:05", "443", None, "10.0.0.1")])
+
+class _ConcurrentWriterTarget(SQLiteBulkTarget):
+    """Another writer inserts a log between the chunk's start and its load."""
+
+    def load(self, tsv_path, cols):
+        self.cursor.execute("INSERT INTO logs (timestamp, src_ip) VALUES (%s, %s)", ("2024-01-01 00:00:00", "other"))
+        return super().load(tsv_path, cols)
+
+class TestBulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.previous = storage._storage
+        self.store_alert_rows = Config.STORE_ALERT_ROWS
+        Config.STORE_ALERT_ROWS = True
+        self.storage = use_storage(SQLiteStorage(os.path.join(self.tmp.name, "test.db")))
+        with self.storage.cursor(commit=True) as cursor:
+            ensure_incident_table(self.storage, cursor)
+            cursor.execute("INSERT INTO logs (timestamp, src_ip) VALUES (%s, %s)", ("2024-01-01 00:00:00", "existing"))
+
+    def tearDown(self):
+        use_storage(self.previous)
+        Config.STORE_ALERT_ROWS = self.store_alert_rows
+        self.tmp.cleanup()
+
+    def _query(self, sql):
+        with self.storage.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def test_alerts_reference_the_loaded_logs(self):
+        target = _ConcurrentWriterTarget(self.storage)
+        detection = {"type": "DNS Tunneling", "severity": "High"}
+        chunk = [({"timestamp": f"2024-01-01 00:00:0{i}", "src_ip": f"10.0.0.{i}"}, [detection] if i % 2 else [])
+                 for i in range(4)]
+        try:
+            self.assertEqual(_load_chunk(target, chunk, IncidentAggregator()), (4, 2))
+        finally:
+            target.close()
+
+        alerts = self._query("SELECT l.src_ip FROM alerts a JOIN logs l ON l.id = a.raw_log_reference ORDER BY l.id")
+        self.assertEqual(alerts, [("10.0.0.1",), ("10.0.0.3",)])
+        # Only the loaded logs (after the existing one and the concurrent insert) are counted
+        self.assertEqual(self._query("SELECT first_log_id, last_log_id FROM incident_counted_logs"), [(3, 6)])
+
+    def test_bulk_ingest_matches_detections_to_logs(self):
+        path = os.path.join(self.tmp.name, "logs.jsonl")
+        with open(path, "w") as f:
+            for i in range(12):
+                qname = f"q{i}x7k2m9v4w8p1t6r3y5u0z.exfil.example" if i % 3 == 0 else "www.example.com"
+                f.write(json.dumps({"timestamp_iso": f"2024-01-01T00:00:{i:02d}", "srcip": "10.0.0.5", "dstip": "8.8.8.8",
+                                    "proto": 17, "dstport": "53", "qname": qname}) + "\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            bulk_ingest(path, chunk_rows=5)
+
+        tunneling = self._query("SELECT l.qname FROM alerts a JOIN logs l ON l.id = a.raw_log_reference "
+                                "WHERE a.detection_type = 'DNS Tunneling' ORDER BY l.id")
+        self.assertEqual([q for q, in tunneling], [f"q{i}x7k2m9v4w8p1t6r3y5u0z.exfil.example" for i in range(0, 12, 3)])
+        self.assertEqual(self._query("SELECT DISTINCT typeof(dst_port) FROM logs WHERE id > 1"), [("integer",)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from datetime import datetime
+
+try:
+    import pandas as pd
+    from csv_loader import prepare_chunk, _to_python
+except ImportError: # pandas is optional outside the dashboard / CSV mode
+    pd = None
+
+@unittest.skipIf(pd is None, "pandas not installed")
+class TestCsvLoader(unittest.TestCase):
+
+    def test_prepare_chunk_is_columnwise_normalize(self):
+        frame = pd.DataFrame({
+            "date": ["2026-01-06", "2026-01-06"],
+            "time": ["03:20:57", "03:20:58"],
+            "srcip": ["10.0.0.1", "10.0.0.2"],
+            "src_ip": ["192.168.1.5", None],
+            "dstport": ["22", "oops"],
+        })
+        out, unparsed = prepare_chunk(frame, {"dst_port": "int", "timestamp": "datetime"})
+
+        self.assertEqual(unparsed, 0)
+        self.assertNotIn("srcip", out.columns)
+        # The internal column wins, the vendor alias fills its gaps
+        self.assertEqual(list(out["src_ip"]), ["192.168.1.5", "10.0.0.2"])
+
+        rows = _to_python(out[["timestamp", "dst_port"]]).values.tolist()
+        self.assertEqual(rows[0], [datetime(2026, 1, 6, 3, 20, 57), 22])
+        self.assertEqual(rows[1][1], None)
+        self.assertIn("raw_log", out.columns)
+
+    def test_timestamp_from_embedded_raw_log(self):
+        frame = pd.DataFrame({"raw_log": ['{"timestamp": "2026-01-06 03:20:57.786595", "src_ip": "1.1.1.1"}', "no time"]})
+        out, unparsed = prepare_chunk(frame, {})
+        self.assertEqual(out["timestamp"].iloc[0], pd.Timestamp("2026-01-06 03:20:57.786595"))
+        self.assertEqual(unparsed, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,26 @@
+import os
+import json
+import shutil
+import tempfile
 import unittest
 from datetime import datetime, timedelta
-from detection.dns import detect_dns_tunneling
-from detection.ssh import detect_ssh_abuse
-from detection.beacon import detect_beaconing
+from detection.dns import detect_dns_tunneling, calculate_entropy, calculate_entropies, analyze_subdomain_volume, SubdomainVolumeTracker
+from detection.domains import parse_domain, SuffixTrie
+from detection.hll import HyperLogLog
+from detection.ssh import detect_ssh_abuse, SSHBruteForceTracker
+from detection.beacon import detect_beaconing, BeaconTracker
+from detection.engine import DetectionConfig
+from detection.signatures import detect_web_attacks
+from detection.sigma import load_rule_pack
+from detection.engine import run_detection_pipeline, run_stateful_detection, StreamState, DETECTORS, register_detector
+from detection.registry import Detector, DetectorRegistry, Route
+from config import Config
+
+try:
+    import pandas as pd
+    from detection.batch import detect_batch, run_detection_batch
+except ImportError:
+    pd = None
 
 class TestDetectionEngine(unittest.TestCase):
     
@@ -17,6 +35,11 @@ class TestDetectionEngine(unittest.TestCase):
         self.assertEqual(alert['type'], "DNS Tunneling")
         self.assertIn("High query length", str(alert['indicators']))
 
+    def test_entropy_batch_matches_scalar(self):
+        names = ["google.com", "", "a", "aaaa", "x7k2q9zv1m.tunnel.example", "ünïcode.example", "google.com"]
+        self.assertEqual(calculate_entropies(names), [calculate_entropy(n) for n in names])
+        self.assertEqual(calculate_entropy("aabb"), 1.0)
+
     def test_ssh_abuse(self):
         # Test normal
         normal_log = {"protocol": "ssh", "device_type": "laptop", "action": "login_success"}
@@ -48,5 +71,302 @@ class TestDetectionEngine(unittest.TestCase):
         irregular = [base_time, base_time + timedelta(seconds=10), base_time + timedelta(seconds=45), base_time + timedelta(seconds=48)]
         self.assertIsNone(detect_beaconing(irregular))
 
+    def test_streaming_beaconing(self):
+        tracker = BeaconTracker()
+        base_time = datetime(2026, 1, 1)
+        flow = ("10.0.0.5", "198.51.100.55", 443)
+        alerts = [tracker.observe(flow, base_time + timedelta(seconds=10*x)) for x in range(10)]
+        # Raised once, on the 4th event, with the same statistics as detect_beaconing
+        self.assertEqual([i for i, a in enumerate(alerts) if a], [3])
+        expected = detect_beaconing([base_time + timedelta(seconds=10*x) for x in range(4)])
+        self.assertAlmostEqual(alerts[3]['average_interval'], expected['average_interval'])
+        self.assertEqual(alerts[3]['events_count'], 4)
+
+        irregular = [0, 1, 15, 16, 40, 41]
+        other = ("10.0.0.6", "198.51.100.55", 443)
+        self.assertFalse(any(tracker.observe(other, base_time + timedelta(seconds=x)) for x in irregular))
+
+        # Idle flows expire and the flow table stays bounded
+        config = {"flow_ttl": 60, "max_flows": 2}
+        tracker.observe(("10.0.0.7", "1.1.1.1", 53), base_time + timedelta(seconds=500), config)
+        self.assertEqual(list(tracker.flows), [("10.0.0.7", "1.1.1.1", 53)])
+
+    def test_subdomain_volume_window(self):
+        sketch = HyperLogLog()
+        for i in range(5000):
+            sketch.add(f"{i}.example.com")
+        self.assertAlmostEqual(sketch.estimate(), 5000, delta=5000 * 0.1)
+
+        tracker = SubdomainVolumeTracker()
+        config = {"volume_threshold": 10, "volume_window": 60, "volume_buckets": 6}
+        base_time = datetime(2026, 1, 1)
+        alerts = [tracker.observe(f"q{i}.exfil.example", base_time + timedelta(seconds=i), config) for i in range(30)]
+        # One alert per burst, on the 11th unique name
+        self.assertEqual([i for i, a in enumerate(alerts) if a], [10])
+        self.assertEqual(alerts[10]['domain'], "exfil.example")
+        # Repeated names and quiet parents never alert
+        self.assertFalse(any(tracker.observe("www.google.com", base_time + timedelta(seconds=i), config) for i in range(30)))
+        # Once the burst has left the window the parent re-arms
+        later = base_time + timedelta(seconds=600)
+        self.assertIsNone(tracker.observe("q0.exfil.example", later, config))
+        self.assertTrue(any(tracker.observe(f"r{i}.exfil.example", later + timedelta(seconds=i), config) for i in range(15)))
+
+    def test_subdomain_volume_uses_public_suffixes(self):
+        # Users of a shared suffix are separate parents; one busy one alerts alone
+        logs = [{"dns_qname": f"q{i}.alice.github.io"} for i in range(11)]
+        logs += [{"dns_qname": f"www.user{i}.github.io"} for i in range(11)]
+        logs += [{"dns_qname": f"x{i}.shop.co.uk"} for i in range(5)]
+        self.assertEqual([a['domain'] for a in analyze_subdomain_volume(logs)], ["alice.github.io"])
+
+        tracker = SubdomainVolumeTracker()
+        base_time = datetime(2026, 1, 1)
+        alerts = [tracker.observe(f"n{i}.user{i}.github.io", base_time, {"volume_threshold": 10}) for i in range(20)]
+        self.assertFalse(any(alerts))
+
+    def test_ssh_bruteforce_bursts(self):
+        tracker = SSHBruteForceTracker()
+        config = {"bruteforce_threshold": 5, "bruteforce_window": 60}
+        base_time = datetime(2026, 1, 1)
+        per_log = {"type": "SSH Abuse", "severity": "Medium", "indicators": ["SSH Authentication Failure"]}
+
+        def attempt(seconds, src="10.0.0.5"):
+            log = {"src_ip": src, "dst_ip": "203.0.113.7", "timestamp": base_time + timedelta(seconds=seconds)}
+            return tracker.observe(log, per_log, config)
+
+        alerts = [attempt(i * 0.1) for i in range(600)]
+        raised = [(i, a['severity']) for i, a in enumerate(alerts) if a]
+        # Threshold, then 10x and 100x the threshold
+        self.assertEqual(raised, [(4, "Medium"), (49, "High"), (499, "Critical")])
+        self.assertEqual(alerts[4]['type'], "SSH Brute Force")
+        self.assertIn("SSH Authentication Failure", alerts[4]['indicators'])
+
+        # Sparse attempts never fill the window; a new burst starts after a quiet window
+        self.assertFalse(any(attempt(i * 30, src="10.0.0.6") for i in range(10)))
+        self.assertTrue(any(attempt(1000 + i) for i in range(5)))
+
+    def test_iot_ssh_exposure_survives_burst_counting(self):
+        iot_log = {"protocol": "6", "service": "SSH", "dst_port": 22, "device_type": "iot_camera", "action": "accept",
+                   "src_ip": "10.0.0.5", "dst_ip": "203.0.113.7", "timestamp": datetime(2026, 1, 1)}
+        detections = run_detection_pipeline(iot_log)
+        self.assertEqual([a['type'] for a in detections], ["SSH Abuse"])
+        self.assertEqual(run_stateful_detection(iot_log, StreamState(), detections), detections)
+
+        # An IoT device failing auth: the exposure is reported now, the failure counts toward a burst
+        failed = dict(iot_log, action="deny")
+        alerts = run_stateful_detection(failed, StreamState(), run_detection_pipeline(failed))
+        self.assertEqual([a['type'] for a in alerts], ["SSH Abuse"])
+        self.assertEqual(alerts[0]['indicators'], ["Unexpected SSH traffic from IoT device type: iot_camera"])
+        server = dict(failed, device_type="server")
+        self.assertEqual(run_stateful_detection(server, StreamState(), run_detection_pipeline(server)), [])
+
+    def test_detector_routing(self):
+        calls = []
+        def run(name):
+            return lambda log, config, content: calls.append((name, content)) or [{"type": name}]
+        registry = DetectorRegistry([
+            Detector("https", run("https"), routes=[Route(protocols={'tcp', '6'}, ports={'443'})]),
+            Detector("dns", run("dns"), routes=[Route(services=('dns',))], requires=('qname',)),
+            Detector("all", run("all"), uses_content=True),
+        ])
+        self.assertEqual(registry.run({"protocol": "TCP", "dst_port": 443, "msg": "hi", "raw_log": "x"}, None),
+                         [{"type": "https"}, {"type": "all"}])
+        self.assertEqual(calls, [("https", "hi x"), ("all", "hi x")])
+        self.assertEqual(registry.run({"protocol": "UDP", "service": "DNS", "dst_port": 53}, None), [{"type": "all"}])
+        self.assertEqual([d.name for d in registry.route({"service": "Remote-DNS", "qname": "a.b"})[0]], ["dns", "all"])
+
+class TestDomainParsing(unittest.TestCase):
+
+    def test_public_suffix_rules(self):
+        parts = parse_domain("A.b.Example.co.uk.")
+        self.assertEqual((parts.registered_domain, parts.public_suffix, parts.subdomain), ("example.co.uk", "co.uk", "a.b"))
+        self.assertEqual((parts.labels, parts.subdomain_labels, parts.longest_label, parts.length), (5, 2, 7, 17))
+        self.assertEqual(parse_domain("evil.github.io").registered_domain, "evil.github.io")
+        self.assertIsNone(parse_domain("co.uk").registered_domain)
+        self.assertIsNone(parse_domain(""))
+
+        # Wildcards, exceptions and unlisted TLDs
+        trie = SuffixTrie(["uk", "co.uk", "*.ck", "!www.ck"])
+        self.assertEqual(trie.suffix_length(["a", "b", "co", "uk"]), 2)
+        self.assertEqual(trie.suffix_length(["a", "foo", "ck"]), 2)
+        self.assertEqual(trie.suffix_length(["www", "ck"]), 1)
+        self.assertEqual(trie.suffix_length(["a", "b", "internal"]), 1)
+
+class TestWebSignatures(unittest.TestCase):
+
+    def test_reports_every_matching_category(self):
+        content = "GET /?q=1 UNION   SELECT * FROM users&x=../../etc/shadow <ScRiPt>"
+        types = [alert['type'] for alert in detect_web_attacks(content)]
+        self.assertEqual(types, ["SQL Injection Attempt", "Cross-Site Scripting (XSS)", "Directory Traversal"])
+
+    def test_adjacent_matches_and_case_sensitive_traversal(self):
+        # The XSS match starts right where the SQL one ends
+        self.assertEqual(len(detect_web_attacks("delete fromonclick=1")), 2)
+        self.assertEqual(detect_web_attacks("cat /ETC/PASSWD"), [])
+        self.assertEqual(detect_web_attacks("action=accept service=HTTPS"), [])
+
+SIGMA_RULES = {
+    "web/union.yml": """Union rule
+
+title: UNION SQL Injection
+id: test-union
+level: critical
+tags:
+  - attack.initial-access
+  - attack.t1190
+detection:
+  selection:
+    cs-method: GET
+    request_uri|contains:
+      - "UNION SELECT"
+      - "union+select"
+  filter:
+    src_ip|startswith: "10."
+  condition: selection and not filter
+""",
+    "web/keywords.yaml": """rule:
+  id: test-keywords
+  name: Router Shutdown
+  severity: medium
+  detection:
+    keywords:
+      - shutdown
+    condition: keywords
+""",
+    "net/flood.yml": """title: Flood
+detection:
+  selection:
+    protocol: UDP
+  condition: selection | count(src_ip) > 100 within 10s
+""",
+}
+
+class TestSigmaRules(unittest.TestCase):
+
+    def setUp(self):
+        self.rules_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.rules_dir)
+        for name, text in SIGMA_RULES.items():
+            path = os.path.join(self.rules_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text)
+        self.cache_path = os.path.join(self.rules_dir, "cache.json")
+
+    def test_compiles_and_matches_rules(self):
+        pack = load_rule_pack(self.rules_dir, self.cache_path)
+        self.assertEqual(sorted(r["id"] for r in pack.rules), ["test-keywords", "test-union"])
+        self.assertEqual([source for source, _ in pack.skipped], [os.path.join("net", "flood.yml")])
+
+        attack = {"http_method": "get", "url": "/q?id=1 union SELECT pass", "src_ip": "192.168.1.5"}
+        self.assertEqual([r["id"] for r in pack.match(attack)], ["test-union"])
+        self.assertEqual(pack.match(dict(attack, src_ip="10.0.0.9")), [])
+        self.assertEqual(pack.match(dict(attack, http_method="POST")), [])
+        self.assertEqual([r["id"] for r in pack.match({"msg": "Router SHUTDOWN requested"})], ["test-keywords"])
+
+        union = next(r for r in pack.rules if r["id"] == "test-union")
+        self.assertEqual((union["mitre_tactic"], union["mitre_technique"]), ("Initial Access", "T1190"))
+
+    def test_query_field_is_the_log_query_column(self):
+        pack = load_rule_pack(Config.SIGMA_RULES_DIR, self.cache_path)
+        encoded = "QWxhZGRpbjpvcGVuIHNlc2FtZQ" * 3
+        ids = [r["id"] for r in pack.match({"query": encoded})]
+        self.assertIn("e92d3f77-3d91-4e1a-9a70-51b1e4f0a004", ids)
+        self.assertEqual(pack.match({"qname": encoded}), [])
+
+    def test_cache_is_reused_until_rules_change(self):
+        load_rule_pack(self.rules_dir, self.cache_path)
+        with open(self.cache_path) as f:
+            fingerprint = json.load(f)["fingerprint"]
+        self.assertEqual(len(load_rule_pack(self.rules_dir, self.cache_path).rules), 2)
+
+        with open(os.path.join(self.rules_dir, "web", "keywords.yaml"), "w") as f:
+            f.write(SIGMA_RULES["web/keywords.yaml"].replace("- shutdown", "- shutdown\n      - reload"))
+        pack = load_rule_pack(self.rules_dir, self.cache_path)
+        with open(self.cache_path) as f:
+            self.assertNotEqual(json.load(f)["fingerprint"], fingerprint)
+        self.assertEqual(len(pack.match({"msg": "config reload"})), 1)
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class TestDetectionBatch(unittest.TestCase):
+
+    LOGS = [
+        {"protocol": "UDP", "service": "DNS", "dst_port": 53, "qname": "a" * 60 + ".example.com", "msg": "query"},
+        {"protocol": "17", "qname": "google.com", "msg": "query"},
+        {"protocol": "TCP", "service": "SSH", "dst_port": 22, "device_type": "camera", "action": "accept",
+         "src_ip": "10.0.0.5", "dst_ip": "10.0.0.9", "msg": "login"},
+        {"protocol": "6", "dst_port": 22, "action": "deny", "src_ip": "10.0.0.6", "msg": "auth failed"},
+        {"protocol": "TCP", "service": "HTTP", "dst_port": 80, "msg": "GET /?q=1 UNION SELECT pass",
+         "raw_log": "<script>alert(1)</script> ../../etc/passwd"},
+        {"protocol": "TCP", "service": "HTTP", "dst_port": 80, "msg": "GET /index.html", "raw_log": None},
+        {"protocol": "TCP", "service": "HTTP", "dst_port": 80, "msg": "GET /?q=1 UNION SELECT pass",
+         "raw_log": "<script>alert(1)</script> ../../etc/passwd"},
+    ]
+
+    def test_matches_per_log_pipeline(self):
+        # Keys a log lacks become NaN, which makes dst_port a float64 column
+        frame = pd.DataFrame(self.LOGS)
+        self.assertEqual(frame['dst_port'].dtype, float)
+        expected = [run_detection_pipeline(dict(log)) for log in self.LOGS]
+        self.assertTrue(all(expected[i] for i in (0, 2, 3, 4, 6)))
+        self.assertEqual(detect_batch(frame), expected)
+        self.assertEqual(detect_batch(frame, [dict(log) for log in self.LOGS]), expected)
+
+    def test_runs_registered_detectors(self):
+        def telnet(log, config, content):
+            return [{"type": "Telnet", "severity": "Low", "indicators": [log.get('src_ip'), content]}]
+        register_detector(Detector("telnet", telnet, routes=[Route(ports={'23'})], requires=('src_ip',), uses_content=True))
+        try:
+            logs = self.LOGS + [{"protocol": "TCP", "dst_port": 23, "src_ip": "10.0.0.7", "msg": "open"},
+                                {"protocol": "TCP", "dst_port": 23, "msg": "no source"}]
+            expected = [run_detection_pipeline(dict(log)) for log in logs]
+            self.assertEqual(expected[-2][-1]['indicators'], ["10.0.0.7", "open "])
+            self.assertEqual(detect_batch(pd.DataFrame(logs)), expected)
+        finally:
+            DETECTORS.detectors.pop()
+            DETECTORS._index = {}
+
+        # Rows as the CSV loader builds them: every column present, None when missing
+        columns = sorted({key for log in self.LOGS for key in log})
+        logs = [{col: log.get(col) for col in columns} for log in self.LOGS]
+        frame = pd.DataFrame([[log[col] for col in columns] for log in logs], columns=columns, dtype=object)
+        expected = [run_detection_pipeline(dict(log)) for log in logs]
+        self.assertEqual(detect_batch(frame), expected)
+        self.assertEqual(detect_batch(frame, logs), expected)
+
+        alerts = run_detection_batch(frame)
+        self.assertEqual(len(alerts), sum(len(found) for found in expected))
+        self.assertEqual(list(alerts.columns[:3]), ["row", "type", "severity"])
+
+class TestDetectionConfig(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def write(self, rules):
+        with open(self.path, "w") as f:
+            json.dump({"detection_rules": rules}, f)
+
+    def test_resolves_defaults_and_reloads_on_change(self):
+        self.write({"dns": {"entropy_threshold": 3.7}})
+        config = DetectionConfig(self.path, check_interval=0).current()
+        self.assertEqual(config.dns["entropy_threshold"], 3.7)
+        self.assertEqual(config.dns["max_length"], 50)
+        self.assertTrue(config.ssh["check_iot_types"])
+
+        # Different size, so the change is seen even within one mtime tick
+        self.write({"dns": {"entropy_threshold": 4.25}, "ssh": {"check_iot_types": False}})
+        config.current()
+        self.assertEqual(config.dns["entropy_threshold"], 4.25)
+        self.assertFalse(config.ssh["check_iot_types"])
+
+    def test_keeps_last_good_rules_on_invalid_file(self):
+        self.write({"dns": {"max_length": 41}})
+        config = DetectionConfig(self.path, check_interval=0).current()
+        with open(self.path, "w") as f:
+            f.write('{"detection_rules": {')
+        self.assertEqual(config.current().dns["max_length"], 41)
+
 if __name__ == '__main__':
     unittest.main()
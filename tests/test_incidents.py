@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from incidents import IncidentAggregator, INCIDENT_SQL, ensure_incident_table, incident_target
+from storage import SQLiteStorage
+
+def _alert(ts, severity="High", detection_type="DNS Tunneling", src_ip="10.0.0.5"):
+    return {"detection_type": detection_type, "severity": severity, "src_ip": src_ip, "device": "laptop",
+            "timestamp": ts, "mitre_tactic": "Exfiltration", "mitre_technique": "T1048"}
+
+class TestIncidentAggregator(unittest.TestCase):
+
+    def test_collapses_alerts_per_window(self):
+        agg = IncidentAggregator(window=300, sample_ids=2, max_open=100)
+        for i in range(10):
+            agg.add(_alert(f"2024-01-01 00:0{i // 3}:{i:02d}", "Critical" if i == 4 else "High"), "exfil.example", i + 1)
+        agg.add(_alert("2024-01-01 00:06:00"), "exfil.example", 11)
+        agg.add(_alert("2024-01-01 00:06:00", detection_type="Beaconing Detected"), "exfil.example", 11)
+
+        rows = sorted(agg.drain(), key=lambda r: (r[3], r[0]))
+        self.assertEqual(len(rows), 3)
+        first = rows[0]
+        self.assertEqual(first[:4], ("DNS Tunneling", "10.0.0.5", "exfil.example", datetime(2024, 1, 1, 0, 0)))
+        self.assertEqual(first[4], "Critical")
+        self.assertEqual(first[8:], (10, datetime(2024, 1, 1, 0, 0, 0), datetime(2024, 1, 1, 0, 3, 9), "1,2"))
+        self.assertEqual(rows[1][3], datetime(2024, 1, 1, 0, 5))
+
+        # The first window ended before the newest alert and is forgotten; nothing new to write
+        self.assertEqual(len(agg.open), 2)
+        self.assertEqual(agg.drain(), [])
+        agg.add(_alert("2024-01-01 00:07:00"), "exfil.example", 12)
+        self.assertEqual([r[8] for r in agg.drain()], [1])
+
+    def test_evicts_oldest_beyond_max_open(self):
+        agg = IncidentAggregator(window=300, max_open=2)
+        for i, src in enumerate(["10.0.0.1", "10.0.0.2", "10.0.0.3"]):
+            agg.add(_alert("2024-01-01 00:00:00", src_ip=src), "", i)
+        self.assertEqual(len(agg.open), 2)
+        self.assertEqual(sorted(r[1] for r in agg.drain()), ["10.0.0.1", "10.0.0.2", "10.0.0.3"])
+
+    def test_target(self):
+        self.assertEqual(incident_target({"qname": "a1b2.Exfil.Example.", "dst_ip": "8.8.8.8"}), "exfil.example")
+        self.assertEqual(incident_target({"dst_ip": "203.0.113.7"}), "203.0.113.7")
+        self.assertEqual(incident_target({}), "")
+
+    def test_partial_flushes_add_up(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = SQLiteStorage(os.path.join(tmp, "test.db"))
+            agg = IncidentAggregator(window=300)
+            with storage.cursor(commit=True) as cursor:
+                ensure_incident_table(storage, cursor)
+                agg.add(_alert("2024-01-01 00:01:00"), "exfil.example", 1)
+                agg.add(_alert("2024-01-01 00:02:00"), "exfil.example", 2)
+                cursor.executemany(INCIDENT_SQL, agg.drain())
+                agg.add(_alert("2024-01-01 00:00:30"), "exfil.example", 3)
+                cursor.executemany(INCIDENT_SQL, agg.drain())
+                # A resumed run (fresh aggregator) with a lower severity and fewer samples
+                resumed = IncidentAggregator(window=300)
+                resumed.add(_alert("2024-01-01 00:03:00", "Low"), "exfil.example", 4)
+                cursor.executemany(INCIDENT_SQL, resumed.drain())
+                cursor.execute("SELECT alert_count, first_seen, last_seen, severity, sample_log_ids FROM incidents")
+                self.assertEqual(cursor.fetchall(), [(4, "2024-01-01 00:00:30", "2024-01-01 00:03:00", "High", "1,2,3")])
+
+                resumed.add(_alert("2024-01-01 00:04:00", "critical"), "exfil.example", 5)
+                cursor.executemany(INCIDENT_SQL, resumed.drain())
+                cursor.execute("SELECT alert_count, severity, sample_log_ids FROM incidents")
+                self.assertEqual(cursor.fetchall(), [(5, "critical", "1,2,3")])
+
+if __name__ == '__main__':
+    unittest.main()
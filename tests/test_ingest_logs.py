@@ -0,0 +1,181 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+import storage
+from storage import SQLiteStorage, use_storage
+from checkpoint import IngestCheckpoint, batch_hash
+from ingest_logs import COERCERS, LogBatchWriter, ingest_direct, iter_pipeline, process_log
+
+def _write_jsonl(path, numbers):
+    with open(path, "w") as f:
+        for i in numbers:
+            qname = f"q{i}x7k2m9v4w8p1t6r3y5u0z.exfil.example" if i % 4 == 0 else f"host{i}.example.com"
+            f.write(json.dumps({"timestamp_iso": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}", "srcip": f"10.0.0.{i % 5}",
+                                "dstip": "8.8.8.8", "proto": 17, "dstport": 53, "qname": qname}) + "\n")
+
+def _log(i, **extra):
+    return dict({"timestamp": f"2024-01-01 00:00:{i:02d}", "src_ip": f"10.0.0.{i}", "raw_log": f"log {i}"}, **extra)
+
+class TestLogBatchWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.previous = storage._storage
+        self.storage = use_storage(SQLiteStorage(os.path.join(self.tmp.name, "test.db")))
+        self.path = os.path.join(self.tmp.name, "logs.jsonl")
+        with open(self.path, "w") as f:
+            f.write("{}\n" * 8)
+
+    def tearDown(self):
+        use_storage(self.previous)
+        self.tmp.cleanup()
+
+    def _query(self, sql):
+        with self.storage.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def test_failing_batch_rolls_back_to_its_savepoint(self):
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        IngestCheckpoint.ensure_tables(cursor)
+        checkpoint = IngestCheckpoint(self.path)
+        writer = LogBatchWriter(conn, batch_size=2, commit_interval=10, checkpoint=checkpoint)
+        good = [_log(1), _log(2)]
+        # A list cannot be bound as a column value, so the second batch fails on insert
+        bad = [_log(3), _log(4, src_ip=["not", "a", "value"])]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, log in enumerate(good + bad, 1):
+                writer.add(log, [], offset=i * 3)
+            writer.close()
+        conn.close()
+
+        self.assertEqual((writer.logs_written, writer.failed_batches, writer.failed_logs), (2, 1, 2))
+        # The first batch, its claim and its watermark were committed; nothing of the second
+        self.assertEqual(self._query("SELECT src_ip FROM logs ORDER BY id"), [("10.0.0.1",), ("10.0.0.2",)])
+        self.assertEqual(self._query("SELECT batch_hash FROM ingest_batches"), [(batch_hash(good),)])
+        self.assertEqual(self._query("SELECT byte_offset, last_log_id FROM ingest_checkpoints"), [(6, 2)])
+
+    def test_insert_plans_are_cached_per_column_set(self):
+        conn = self.storage.connect()
+        writer = LogBatchWriter(conn)
+        plan = writer.plan_for({"src_ip": "10.0.0.1", "dst_port": "22"})
+        self.assertEqual(plan.columns, ("src_ip", "dst_port"))
+        self.assertEqual(plan.sql, "INSERT INTO logs (src_ip, dst_port) VALUES (%s, %s)")
+        self.assertEqual([i for i, _ in plan.coercions], [1])
+
+        # Same keys in another order hit the cache
+        self.assertIs(writer.plan_for({"dst_port": 53, "src_ip": "10.0.0.2"}), plan)
+        # Other keys projecting onto the same columns share the plan
+        self.assertIs(writer.plan_for({"src_ip": "10.0.0.3", "dst_port": 80, "not_a_column": "x"}), plan)
+        self.assertEqual((len(writer._plans), len(writer._plans_by_cols)), (2, 1))
+
+        other = writer.plan_for({"src_ip": "10.0.0.4", "protocol": "6"})
+        self.assertEqual(other.columns, ("src_ip", "protocol"))
+        self.assertEqual(other.coercions, ())
+        self.assertIsNone(writer.plan_for({"not_a_column": "x"}))
+        self.assertEqual((len(writer._plans), len(writer._plans_by_cols)), (4, 2))
+        writer.close()
+        conn.close()
+
+    def test_coerces_string_ports_and_protocols(self):
+        to_int = COERCERS["int"]
+        self.assertEqual([to_int(v) for v in ("22", " 443 ", 53, "", "ssh", None)], [22, 443, 53, None, None, None])
+
+        conn = self.storage.connect()
+        writer = LogBatchWriter(conn)
+        with contextlib.redirect_stdout(io.StringIO()):
+            writer.add(_log(1, dst_port="22", src_port="ssh", protocol="6"), [])
+            writer.add(_log(2, dst_port=53, src_port="", protocol=17), [])
+            writer.close()
+        conn.close()
+        self.assertEqual(writer.failed_batches, 0)
+        # Typed columns get ints or NULL; protocol is a text column and keeps its value
+        rows = self._query("SELECT dst_port, typeof(dst_port), src_port, protocol FROM logs ORDER BY id")
+        self.assertEqual(rows, [(22, "integer", None, "6"), (53, "integer", None, "17")])
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.previous = storage._storage
+        self.path = os.path.join(self.tmp.name, "logs.jsonl")
+        _write_jsonl(self.path, range(60))
+
+    def tearDown(self):
+        use_storage(self.previous)
+        self.tmp.cleanup()
+
+    def _ingest(self, name, path=None, batch_size=8, commit_interval=2, **kwargs):
+        db = use_storage(SQLiteStorage(os.path.join(self.tmp.name, name)))
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingest_direct(path or self.path, batch_size=batch_size, commit_interval=commit_interval, **kwargs)
+        return self._contents(db)
+
+    def _contents(self, db):
+        with db.cursor() as cursor:
+            cursor.execute("SELECT id, timestamp, src_ip, qname FROM logs ORDER BY id")
+            logs = cursor.fetchall()
+            cursor.execute("SELECT detection_type, src_ip, target, alert_count, sample_log_ids FROM incidents ORDER BY incident_id")
+            return logs, cursor.fetchall()
+
+    def test_chunks_come_back_in_input_order(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            chunks = list(iter_pipeline(self.path, workers=3, chunk_size=7))
+        offsets = [offset for results in chunks for _, _, offset in results]
+        self.assertEqual(len(offsets), 60)
+        self.assertEqual(offsets, sorted(offsets))
+
+    def test_workers_match_serial_ingestion(self):
+        serial = self._ingest("serial.db", workers=1)
+        parallel = self._ingest("parallel.db", workers=3, chunk_size=7)
+        self.assertEqual(len(serial[0]), 60)
+        self.assertTrue(serial[1])
+        self.assertEqual(parallel, serial)
+
+    def test_interrupted_ingestion_resumes_without_duplicates(self):
+        db = use_storage(SQLiteStorage(os.path.join(self.tmp.name, "resumed.db")))
+        connections = []
+        connect = db.connect
+        def tracked_connect(**options):
+            connections.append(connect(**options))
+            return connections[-1]
+        processed = []
+        def crash_after_20(log):
+            if len(processed) == 20:
+                raise KeyboardInterrupt
+            processed.append(log)
+            return process_log(log)
+
+        with mock.patch.object(db, "connect", tracked_connect), mock.patch("ingest_logs.process_log", crash_after_20):
+            with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(KeyboardInterrupt):
+                ingest_direct(self.path, batch_size=3, commit_interval=2)
+        # The process dies with its last batches uncommitted
+        for conn in connections:
+            conn.close()
+        self.assertEqual(len(self._contents(db)[0]), 18)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingest_direct(self.path, batch_size=3, commit_interval=2)
+        logs, incidents = self._contents(db)
+        serial_logs, serial_incidents = self._ingest("serial.db", batch_size=3, commit_interval=2)
+        self.assertEqual(logs, serial_logs)
+        # Stateless detections are counted exactly once across the crash
+        def tunneling(rows):
+            return sorted(row[:4] for row in rows if row[0] == "DNS Tunneling")
+        self.assertEqual(tunneling(incidents), tunneling(serial_incidents))
+
+    def test_equal_batches_of_different_files_are_both_ingested(self):
+        other = os.path.join(self.tmp.name, "other.jsonl")
+        _write_jsonl(other, [100, 101, 102] + list(range(3, 6)))
+        self._ingest("shared.db", batch_size=3)
+        # Its second batch has the same content as the first file's second batch
+        logs, _ = self._ingest("shared.db", path=other, batch_size=3)
+        self.assertEqual(len(logs), 66)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+import ingestor
+from ingestor import LogIngestor
+from timestamp_parser import TimestampParser, FORMAT_ISO, FORMAT_FORTIGATE, FORMAT_EPOCH
+from fortigate_parser import parse_kv_line
+
+class TestLogIngestor(unittest.TestCase):
+
+    def setUp(self):
+        self.logs = [
+            {"timestamp_iso": "2026-01-06T01:47:00.050353", "src_ip": "192.168.1.66", "msg": "brace } and bracket ]"},
+            {"timestamp_iso": "2026-01-06T01:48:00", "srcip": "10.0.0.1", "dstip": "8.8.8.8", "dstport": 53},
+        ]
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_streams_json_array_across_chunks(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.logs * 20, f, indent=2)
+
+        old_chunk = ingestor.READ_CHUNK_SIZE
+        ingestor.READ_CHUNK_SIZE = 16 # force records to straddle reads
+        try:
+            raw = list(LogIngestor().iter_raw_logs(self.path))
+        finally:
+            ingestor.READ_CHUNK_SIZE = old_chunk
+        self.assertEqual(raw, self.logs * 20)
+
+    def test_streams_jsonl_and_normalizes(self):
+        with open(self.path, 'w') as f:
+            f.write("\n".join(json.dumps(l) for l in self.logs) + "\n\n")
+
+        logs = list(LogIngestor().iter_log_file(self.path))
+        self.assertEqual(len(logs), 2)
+        self.assertEqual(logs[0]['timestamp'], datetime(2026, 1, 6, 1, 47, 0, 50353))
+        self.assertEqual(logs[1]['src_ip'], "10.0.0.1")
+        self.assertEqual(logs[1]['dst_port'], 53)
+
+    def _assert_resumes_everywhere(self, expected):
+        """Resuming from every saved offset yields exactly the remaining records."""
+        ing = LogIngestor()
+        pairs = list(ing.iter_raw_logs_with_offsets(self.path))
+        self.assertEqual([raw for raw, _ in pairs], expected)
+        for i, (_, offset) in enumerate(pairs):
+            rest = [raw for raw, _ in ing.iter_raw_logs_with_offsets(self.path, offset)]
+            self.assertEqual(rest, expected[i + 1:])
+
+    def test_resume_json_array_crlf(self):
+        with open(self.path, 'w', newline='\r\n') as f:
+            json.dump(self.logs * 3, f, indent=2)
+        old_chunk = ingestor.READ_CHUNK_SIZE
+        ingestor.READ_CHUNK_SIZE = 16
+        try:
+            self._assert_resumes_everywhere(self.logs * 3)
+        finally:
+            ingestor.READ_CHUNK_SIZE = old_chunk
+
+    def test_resume_json_array_lf(self):
+        with open(self.path, 'w', newline='\n') as f:
+            json.dump(self.logs * 3, f, indent=2)
+        self._assert_resumes_everywhere(self.logs * 3)
+
+    def test_resume_jsonl(self):
+        with open(self.path, 'w', newline='\r\n') as f:
+            f.write("\n".join(json.dumps(l) for l in self.logs * 3) + "\n")
+        self._assert_resumes_everywhere(self.logs * 3)
+
+    def test_malformed_tail_keeps_earlier_logs(self):
+        with open(self.path, 'w') as f:
+            f.write(json.dumps(self.logs)[:-1] + ', {"src_ip": ')
+
+        logs = list(LogIngestor().iter_log_file(self.path))
+        self.assertEqual(len(logs), 2)
+
+    def test_detects_fortigate_kv_file(self):
+        with open(self.path, 'w') as f:
+            f.write('date=2026-01-06 time=03:20:57 srcip=10.0.0.1 dstip=8.8.8.8 dstport=53 proto=17 msg="dns query"\n')
+            f.write('date=2026-01-06 time=03:20:58 srcip=10.0.0.2 dstip=8.8.4.4 dstport=53 proto=17\n')
+
+        logs = list(LogIngestor().iter_log_file(self.path))
+        self.assertEqual(len(logs), 2)
+        self.assertEqual(logs[0]['timestamp'], datetime(2026, 1, 6, 3, 20, 57))
+        self.assertEqual(logs[0]['src_ip'], "10.0.0.1")
+        self.assertEqual(logs[0]['protocol'], "17")
+        self.assertTrue(logs[1]['raw_log'].startswith("date=2026-01-06"))
+
+class TestFortiGateParser(unittest.TestCase):
+
+    def test_quoted_values_and_field_mapping(self):
+        raw = parse_kv_line('devname="FGT-60F" srcip=10.0.0.1 type="traffic" msg="login failed for admin" empty= dstport=22')
+        self.assertEqual(raw, {
+            "devname": "FGT-60F", "src_ip": "10.0.0.1", "log_type": "traffic",
+            "msg": "login failed for admin", "empty": "", "dst_port": "22",
+        })
+
+    def test_embedded_quotes_stay_in_value(self):
+        # FortiLogBuilder.format_kv_string quotes JSON without escaping it
+        line = 'srcip=10.0.0.1 raw_log="{"a": "x y", "b": 1}" action=deny'
+        raw = parse_kv_line(line)
+        self.assertEqual(raw['raw_log'], '{"a": "x y", "b": 1}')
+        self.assertEqual(raw['action'], "deny")
+
+    def test_internal_name_wins_over_alias(self):
+        self.assertEqual(parse_kv_line('type=traffic log_type=network')['log_type'], "network")
+        self.assertEqual(parse_kv_line('log_type=network type=traffic')['log_type'], "network")
+
+class TestTimestampParser(unittest.TestCase):
+
+    def test_iso(self):
+        p = TimestampParser()
+        self.assertEqual(p.parse({"timestamp_iso": "2026-01-06T01:47:00Z"}).hour, 1)
+        self.assertEqual(p.parse({"timestamp": "2026-01-06 03:20:57.786595"}), datetime(2026, 1, 6, 3, 20, 57, 786595))
+        self.assertEqual(p.format, FORMAT_ISO)
+
+    def test_fortigate_date_time(self):
+        p = TimestampParser()
+        log = {"date": "2026-01-06", "time": "03:20:57"}
+        self.assertEqual(p.parse(log), datetime(2026, 1, 6, 3, 20, 57))
+        self.assertEqual(p.parse(dict(log)), datetime(2026, 1, 6, 3, 20, 57))
+        self.assertEqual(p.format, FORMAT_FORTIGATE)
+
+    def test_epoch(self):
+        p = TimestampParser()
+        self.assertEqual(p.parse({"timestamp": 1767662457}), datetime.fromtimestamp(1767662457))
+        self.assertEqual(p.parse({"timestamp": "1767662457000"}), datetime.fromtimestamp(1767662457))
+        self.assertEqual(p.format, FORMAT_EPOCH)
+
+    def test_failures_are_counted(self):
+        p = TimestampParser()
+        self.assertIsNotNone(p.parse({"timestamp_iso": "2026-01-06T01:47:00"}))
+        self.assertIsNone(p.parse({"timestamp_iso": "yesterday"}))
+        self.assertIsNone(p.parse({"msg": "no time at all"}))
+        # A record in another layout still parses without relearning
+        self.assertIsNotNone(p.parse({"date": "2026-01-06", "time": "03:20:57"}))
+        self.assertEqual(p.failures, 2)
+        self.assertEqual(p.parsed, 2)
+        self.assertEqual(p.format, FORMAT_ISO)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import io
+import tempfile
+import unittest
+import contextlib
+import log_follower
+from log_follower import LogFollower
+
+class TestLogFollower(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "fw.log")
+        with open(self.path, "w") as f:
+            f.write("old 1\nold 2\n")
+        self.follower = LogFollower(self.path, from_start=True, poll_interval=0.01, max_batch=1000, max_latency=0)
+        self.batches = self.follower.batches()
+
+    def tearDown(self):
+        self.batches.close()
+        self.tmp.cleanup()
+
+    def _append(self, text, path=None):
+        with open(path or self.path, "a") as f:
+            f.write(text)
+
+    def _next(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return next(self.batches)
+
+    def test_partial_trailing_line_waits_for_newline(self):
+        self.assertEqual(self._next(), ["old 1", "old 2"])
+        self._append("half")
+        self._append(" done\nnext\n")
+        self.assertEqual(self._next(), ["half done", "next"])
+
+    def test_reads_backlog_in_bounded_chunks(self):
+        old_chunk = log_follower.READ_CHUNK_SIZE
+        log_follower.READ_CHUNK_SIZE = 4
+        try:
+            self._append("a much longer line\n")
+            lines = []
+            while len(lines) < 3:
+                lines.extend(self._next())
+        finally:
+            log_follower.READ_CHUNK_SIZE = old_chunk
+        self.assertEqual(lines, ["old 1", "old 2", "a much longer line"])
+
+    def test_rotation_drains_old_file_then_reopens(self):
+        self.assertEqual(self._next(), ["old 1", "old 2"])
+        self._append("old 3\n")
+        os.rename(self.path, self.path + ".1")
+        self._append("new 1\n")
+        self.assertEqual(self._next(), ["old 3"])
+        self.assertEqual(self._next(), ["new 1"])
+        self.assertEqual(self.follower.rotations, 1)
+
+    def test_truncation_reads_from_start(self):
+        self.assertEqual(self._next(), ["old 1", "old 2"])
+        with open(self.path, "w") as f:
+            f.write("x\n")
+        self.assertEqual(self._next(), ["x"])
+        self.assertEqual(self.follower.truncations, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from storage import SQLiteStorage, translate_sql
+
+class TestSQLiteStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorage(os.path.join(self.tmp.name, "test.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_translate_sql(self):
+        self.assertEqual(translate_sql("INSERT IGNORE INTO t (a) VALUES (%s)"), "INSERT OR IGNORE INTO t (a) VALUES (?)")
+        upsert = translate_sql("INSERT INTO t (k, v) VALUES (%s, %s) ON DUPLICATE KEY UPDATE v = VALUES(v)")
+        self.assertEqual(upsert, "INSERT INTO t (k, v) VALUES (?, ?) ON CONFLICT DO UPDATE SET v = excluded.v")
+
+    def test_executemany_reports_first_row_id(self):
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO logs (timestamp, src_ip) VALUES (%s, %s)", (datetime(2024, 1, 1), "10.0.0.1"))
+        cursor.executemany("INSERT INTO logs (timestamp, src_ip) VALUES (%s, %s)",
+                           [(datetime(2024, 1, 1), f"10.0.0.{i}") for i in range(2, 5)])
+        self.assertEqual(cursor.lastrowid, 2)
+        conn.commit()
+        conn.close()
+
+    def test_savepoint_rollback_keeps_earlier_batches(self):
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        cursor.execute("SAVEPOINT log_batch")
+        cursor.execute("INSERT INTO logs (timestamp, src_ip) VALUES (%s, %s)", ("2024-01-01 00:00:00", "a"))
+        cursor.execute("RELEASE SAVEPOINT log_batch")
+        cursor.execute("SAVEPOINT log_batch")
+        cursor.execute("INSERT INTO logs (timestamp, src_ip) VALUES (%s, %s)", ("2024-01-01 00:00:00", "b"))
+        cursor.execute("ROLLBACK TO SAVEPOINT log_batch")
+        # Released savepoints must not have committed anything yet
+        self.assertTrue(conn.raw.in_transaction)
+        conn.commit()
+        conn.close()
+
+        with self.storage.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT src_ip FROM logs")
+            self.assertEqual(cursor.fetchall(), [{"src_ip": "a"}])
+
+    def test_ensure_columns(self):
+        with self.storage.cursor(commit=True) as cursor:
+            self.storage.ensure_columns(cursor, "logs", ["qname", "ttl"], {"ttl": "int"})
+            columns = self.storage.describe_columns(cursor, "logs")
+        self.assertEqual(columns["ttl"], "int")
+        self.assertEqual(columns["qname"], "text")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+FORMAT_ISO = "iso"             # timestamp_iso / timestamp strings
+FORMAT_FORTIGATE = "fortigate" # separate date + time fields
+FORMAT_EPOCH = "epoch"         # numeric seconds (or milliseconds) since 1970
+
+# Values above this are treated as epoch milliseconds
+_EPOCH_MS_THRESHOLD = 1e11
+
+class TimestampParser:
+    """
+    Learns the timestamp layout of a log source from its first record and
+    parses every following record through a compiled fast path instead of
+    guessing the format each time.
+
+    Unparseable values are counted in `failures` rather than silently
+    replaced, so callers can report them.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.format = None
+        self.parsed = 0
+        self.failures = 0
+        self.cache_size = cache_size
+        # FortiGate logs only have second resolution, so many rows share a key
+        self._fgt_cache = {}
+        self._parsers = {
+            FORMAT_ISO: self._parse_iso,
+            FORMAT_FORTIGATE: self._parse_fortigate,
+            FORMAT_EPOCH: self._parse_epoch,
+        }
+
+    def parse(self, raw_log):
+        """Returns a datetime for the record, or None if it cannot be parsed."""
+        if self.format is None:
+            self.format = self.detect_format(raw_log)
+
+        ts = self._try(self.format, raw_log)
+        if ts is None:
+            # Mixed sources: try this record's own layout without relearning
+            fmt = self.detect_format(raw_log)
+            if fmt != self.format:
+                ts = self._try(fmt, raw_log)
+
+        if ts is None:
+            self.failures += 1
+        else:
+            self.parsed += 1
+        return ts
+
+    def detect_format(self, raw_log):
+        value = raw_log.get('timestamp_iso') or raw_log.get('timestamp')
+        if value is None:
+            if raw_log.get('date') and raw_log.get('time'):
+                return FORMAT_FORTIGATE
+            return None
+        if isinstance(value, (int, float)) or (isinstance(value, str) and _is_number(value)):
+            return FORMAT_EPOCH
+        return FORMAT_ISO
+
+    def _try(self, fmt, raw_log):
+        if fmt is None:
+            return None
+        try:
+            return self._parsers[fmt](raw_log)
+        except (AttributeError, KeyError, TypeError, ValueError, OverflowError, OSError):
+            return None
+
+    def _parse_iso(self, raw_log):
+        value = raw_log.get('timestamp_iso') or raw_log.get('timestamp')
+        if isinstance(value, datetime):
+            return value
+        if value.endswith('Z'):
+            # fromisoformat only understands 'Z' from Python 3.11 on
+            value = value[:-1] + '+00:00'
+        return datetime.fromisoformat(value)
+
+    def _parse_fortigate(self, raw_log):
+        key = f"{raw_log['date']} {raw_log['time']}"
+        ts = self._fgt_cache.get(key)
+        if ts is None:
+            ts = datetime.fromisoformat(key)
+            if len(self._fgt_cache) >= self.cache_size:
+                self._fgt_cache.clear()
+            self._fgt_cache[key] = ts
+        return ts
+
+    def _parse_epoch(self, raw_log):
+        value = float(raw_log.get('timestamp_iso') or raw_log.get('timestamp'))
+        if value > _EPOCH_MS_THRESHOLD:
+            value /= 1000.0
+        return datetime.fromtimestamp(value)
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False